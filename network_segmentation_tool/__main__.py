@@ -0,0 +1,11 @@
+# __main__.py
+# Запуск пакетного режима: python -m network_segmentation_tool analyze scenarios/
+import os
+import sys
+
+# Модули проекта импортируются по плоским именам (from validation import ...)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main  # noqa: E402
+
+sys.exit(main())
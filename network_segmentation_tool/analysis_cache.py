@@ -0,0 +1,241 @@
+# analysis_cache.py
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+
+from report_generator import generate_report, generate_risk_report, generate_summary_report
+from risk_analyzer import analyze_risks, analyze_risks_by_check
+from validation import validate_rules, validate_subnets, validate_user_rules
+
+CACHE_DIR = "scenario_cache"  # рядом с каталогом scenarios/
+DEFAULT_MEMORY_ITEMS = 64
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+# Версия формата записей кэша; вместе с хешем исходного кода входит в ключ
+CACHE_FORMAT = 1
+
+# Поля сценария, от которых зависят результаты анализа (saved_at и т.п. не входят)
+SCENARIO_FIELDS = ("segments", "subnets", "global_rules", "user_rules", "segment_equipment")
+
+
+def normalize_scenario(scenario_data):
+    """
+    Приводит сценарий к каноническому виду: только значимые поля,
+    правила — списками, оборудование без нулевых количеств.
+    Порядок сегментов и правил сохраняется: от него зависят отчёты.
+    """
+    equipment = {}
+    for seg, eq in (scenario_data.get("segment_equipment") or {}).items():
+        eq = {name: count for name, count in eq.items() if count}
+        if eq:
+            equipment[seg] = eq
+    return {
+        "segments": list(scenario_data.get("segments") or []),
+        "subnets": {seg: cidr for seg, cidr in (scenario_data.get("subnets") or {}).items() if cidr},
+        "global_rules": [list(rule) for rule in scenario_data.get("global_rules") or []],
+        "user_rules": [list(rule) for rule in scenario_data.get("user_rules") or []],
+        "segment_equipment": equipment,
+    }
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """
+    Хеш исходного кода модулей пакета и CACHE_FORMAT: после изменения
+    анализа или формата отчётов старые записи кэша перестают находиться.
+    """
+    digest = hashlib.sha256(str(CACHE_FORMAT).encode("ascii"))
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(package_dir, name), "rb") as f:
+                digest.update(name.encode("utf-8"))
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def scenario_hash(scenario_data):
+    """SHA-256 канонического JSON нормализованного сценария."""
+    canonical = json.dumps(normalize_scenario(scenario_data), ensure_ascii=False, sort_keys=True,
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Двухуровневый кэш результатов: LRU в памяти и файлы в каталоге
+    directory. Значения — строки, списки строк (JSON) или bytes
+    (изображения). Каталог ограничен по размеру: при превышении
+    удаляются давно не использованные файлы.
+    """
+
+    def __init__(self, directory=CACHE_DIR, memory_items=DEFAULT_MEMORY_ITEMS, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, binary):
+        return os.path.join(self.directory, key + (".bin" if binary else ".json"))
+
+    def get(self, key, default=None):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+        if self.directory:
+            for binary in (False, True):
+                path = self._path(key, binary)
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                if binary:
+                    value = data
+                else:
+                    try:
+                        value = json.loads(data.decode("utf-8"))
+                    except ValueError:  # обрезанная или повреждённая запись — промах
+                        self._remove(path)
+                        continue
+                os.utime(path)  # время доступа для вытеснения
+                self._remember(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if not self.directory:
+            return
+        binary = isinstance(value, bytes)
+        data = value if binary else json.dumps(value, ensure_ascii=False).encode("utf-8")
+        path = self._path(key, binary)
+        # Уникальный временный файл: процессы пула могут записывать один и тот же ключ одновременно
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        self._evict_disk()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith((".json", ".bin")):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory:
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith((".json", ".bin")):
+                    os.remove(entry.path)
+
+    def memoize(self, operation, scenario_data, compute, *params):
+        """
+        Возвращает результат operation для сценария из кэша или вычисляет
+        его через compute(). params — дополнительные входные данные
+        (политика, ошибки валидации), сериализуемые в JSON.
+        """
+        key_source = json.dumps([code_version(), operation, scenario_hash(scenario_data), params],
+                                ensure_ascii=False, sort_keys=True)
+        key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # --- Обёртки над функциями анализа ---
+
+    def validate(self, scenario_data):
+        """Ошибки validate_subnets, validate_rules и validate_user_rules одним списком."""
+        s = normalize_scenario(scenario_data)
+        return self.memoize("validate", s, lambda: (
+            validate_subnets(s["subnets"])
+            + validate_rules(s["global_rules"], s["segments"])
+            + validate_user_rules(s["user_rules"], s["segments"], s["global_rules"])
+        ))
+
+    def analyze_risks(self, scenario_data, policy=None):
+        s = normalize_scenario(scenario_data)
+        return self.memoize("analyze_risks", s, lambda: analyze_risks(
+            s["segments"], s["global_rules"], s["user_rules"], s["segment_equipment"], policy), policy)
+
+    def analyze_risks_by_check(self, scenario_data, policy=None):
+        s = normalize_scenario(scenario_data)
+        return self.memoize("analyze_risks_by_check", s, lambda: analyze_risks_by_check(
+            s["segments"], s["global_rules"], s["user_rules"], s["segment_equipment"], policy), policy)
+
+    def generate_report(self, scenario_data, validation_errors=None):
+        s = normalize_scenario(scenario_data)
+        return self.memoize("generate_report", s, lambda: generate_report(
+            s["segments"], s["subnets"], s["global_rules"], s["user_rules"], s["segment_equipment"],
+            validation_errors), validation_errors)
+
+    def generate_summary_report(self, scenario_data, validation_errors=None, **options):
+        """Сводный отчёт; options — top_n, details, page, page_size."""
+        s = normalize_scenario(scenario_data)
+        return self.memoize("generate_summary_report", s, lambda: generate_summary_report(
+            s["segments"], s["subnets"], s["global_rules"], s["user_rules"], s["segment_equipment"],
+            validation_errors, **options), validation_errors, options)
+
+    def generate_risk_report(self, scenario_data, policy=None):
+        s = normalize_scenario(scenario_data)
+        return self.memoize("generate_risk_report", s, lambda: generate_risk_report(
+            s["segments"], s["global_rules"], s["user_rules"], s["segment_equipment"], policy), policy)
+
+    def render(self, scenario_data, file_path):
+        """Рисует схему в file_path; изображение берётся из кэша, если сценарий не менялся."""
+        s = normalize_scenario(scenario_data)
+        extension = os.path.splitext(file_path)[1].lower()
+
+        def draw():
+            from visualizer import draw_and_save_network
+            draw_and_save_network(s["segments"], s["global_rules"], s["user_rules"], s["segment_equipment"],
+                                  file_path=file_path)
+            with open(file_path, "rb") as f:
+                return f.read()
+
+        data = self.memoize("render", s, draw, extension)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
@@ -0,0 +1,135 @@
+# attack_paths.py
+import time
+from collections import deque, namedtuple
+
+# segments — сегменты пути от источника до цели;
+# services — для каждого перехода кортеж сервисов, по которым он возможен
+AttackPath = namedtuple("AttackPath", ["segments", "services"])
+
+# Причины, по которым перебор остановлен раньше времени
+STOP_PATHS = "max_paths"
+STOP_TIME = "time_budget"
+
+_TIME_CHECK_EVERY = 256  # проверять часы раз в столько раскрытий вершин
+
+
+class AttackGraph:
+    """
+    Граф переходов между сегментами по правилам. Глобальные правила
+    доступны всем; из правил пользователей берутся все (fio=None) или
+    только правила указанного пользователя.
+    """
+
+    def __init__(self, global_rules, user_rules=(), fio=None):
+        self.edges = {}  # источник -> {назначение: [сервисы]}
+        self.stopped = None
+        for _, src, dst, svc in global_rules:
+            self.add_edge(src, dst, svc)
+        for seg, user, _, target, svc in user_rules:
+            if fio is None or user == fio:
+                self.add_edge(seg, target, svc)
+
+    def add_edge(self, src, dst, svc):
+        if src == dst:
+            return
+        services = self.edges.setdefault(src, {}).setdefault(dst, [])
+        if svc not in services:
+            services.append(svc)
+
+    def distances_to(self, targets, limit):
+        """Число переходов до ближайшей цели (обратный BFS, не дальше limit)."""
+        reverse = {}
+        for src, dsts in self.edges.items():
+            for dst in dsts:
+                reverse.setdefault(dst, []).append(src)
+        dist = {t: 0 for t in targets}
+        queue = deque(targets)
+        while queue:
+            node = queue.popleft()
+            if dist[node] >= limit:
+                continue
+            for prev in reverse.get(node, ()):
+                if prev not in dist:
+                    dist[prev] = dist[node] + 1
+                    queue.append(prev)
+        return dist
+
+    def iter_paths(self, sources, targets, max_depth=4, max_paths=None, time_budget=None):
+        """
+        Выдаёт простые пути из sources в targets по возрастанию длины
+        (сначала кратчайшие) до max_depth переходов. Путь заканчивается
+        на первой достигнутой цели. Ветви, из которых цель недостижима
+        за оставшееся число переходов, отсекаются заранее, поэтому общие
+        префиксы тупиковых путей не перебираются. Перебор прекращается
+        после max_paths путей или по истечении time_budget секунд;
+        причина сохраняется в self.stopped.
+        """
+        if isinstance(sources, str):
+            sources = [sources]
+        targets = set(targets)
+        self.stopped = None
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        dist = self.distances_to(targets, max_depth)
+        sources = [s for s in dict.fromkeys(sources) if s in dist and s not in targets]
+        found = 0
+        expanded = 0
+
+        for length in range(1, max_depth + 1):
+            for source in sources:
+                if dist[source] > length:
+                    continue
+                path = [source]
+                stack = [iter(self.edges.get(source, ()))]
+                while stack:
+                    nxt = next(stack[-1], None)
+                    if nxt is None:
+                        stack.pop()
+                        path.pop()
+                        continue
+                    remaining = length - len(path)
+                    if nxt in path or dist.get(nxt, max_depth + 1) > remaining:
+                        continue
+                    if remaining == 0:
+                        path.append(nxt)
+                        yield self._attack_path(path)
+                        path.pop()
+                        found += 1
+                        if max_paths is not None and found >= max_paths:
+                            self.stopped = STOP_PATHS
+                            return
+                        continue
+                    if nxt in targets:
+                        continue  # цель достигнута раньше — такой путь уже выдан короче
+                    expanded += 1
+                    if deadline is not None and expanded % _TIME_CHECK_EVERY == 0 \
+                            and time.perf_counter() > deadline:
+                        self.stopped = STOP_TIME
+                        return
+                    path.append(nxt)
+                    stack.append(iter(self.edges.get(nxt, ())))
+
+    def _attack_path(self, path):
+        services = tuple(tuple(self.edges[a][b]) for a, b in zip(path, path[1:]))
+        return AttackPath(tuple(path), services)
+
+
+def untrusted_segments(segments, guest_marker="guest"):
+    marker = guest_marker.lower()
+    return [seg for seg in segments if marker in seg.lower()]
+
+
+def user_attack_graph(global_rules, user_rules, fio):
+    """
+    Граф и исходные сегменты пользователя fio: он начинает из своих
+    сегментов и проходит по глобальным правилам и собственным правилам доступа.
+    """
+    own = [rule for rule in user_rules if rule[1] == fio]
+    return AttackGraph(global_rules, own), list(dict.fromkeys(rule[0] for rule in own))
+
+
+def format_attack_path(attack_path):
+    """'Guest → IT (HTTPS) → Finance (SMB, SSH)'"""
+    parts = [attack_path.segments[0]]
+    for seg, services in zip(attack_path.segments[1:], attack_path.services):
+        parts.append(f"{seg} ({', '.join(services)})")
+    return " → ".join(parts)
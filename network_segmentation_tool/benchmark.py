@@ -0,0 +1,190 @@
+# benchmark.py
+"""
+Нагрузочные замеры на синтетических сценариях.
+
+Пример:
+    python benchmark.py --segments 50 500 --user-rules 1000 100000 -o bench.json
+    python benchmark.py --segments 500 -o new.json --compare bench.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+from example_data import STANDARD_EQUIPMENT, STANDARD_SERVICES
+from report_generator import generate_report, generate_risk_report
+from risk_analyzer import analyze_risks
+from subnet_allocator import SubnetAllocator
+from validation import validate_rules, validate_subnets, validate_user_rules
+
+POSITIONS = ["Инженер", "Бухгалтер", "Администратор", "Менеджер", "Аналитик"]
+
+
+def generate_scenario(segments=20, global_rules=100, user_rules=100, equipment=50, seed=0):
+    """
+    Генерирует сценарий в формате ScenarioManager: сегменты с подсетями,
+    глобальные правила, правила пользователей и оборудование. Объём каждой
+    части задаётся независимо; при одинаковом seed результат повторяется.
+    """
+    rnd = random.Random(seed)
+    names = ["Guest"] + [f"Seg{i}" for i in range(1, segments)]
+
+    # Подсети раздаются из 10.0.0.0/8 блоками, достаточными для всех сегментов
+    prefixlen = min(30, max(24, 8 + max(segments - 1, 1).bit_length()))
+    allocator = SubnetAllocator("10.0.0.0/8")
+    subnets = {name: str(allocator.allocate(prefixlen)) for name in names}
+
+    services = list(STANDARD_SERVICES)
+    rules = [
+        [f"R{i}", rnd.choice(names), rnd.choice(names), rnd.choice(services)]
+        for i in range(global_rules)
+    ]
+    people = max(1, user_rules // 4)
+    users = []
+    for i in range(user_rules):
+        person = rnd.randrange(people)
+        rnd_person = random.Random(person)
+        users.append([names[rnd_person.randrange(segments)], f"Сотрудник {person}",
+                      rnd_person.choice(POSITIONS), rnd.choice(names), rnd.choice(services)])
+
+    segment_equipment = {name: {} for name in names}
+    for _ in range(equipment):
+        eq = segment_equipment[rnd.choice(names)]
+        eq_type = rnd.choice(STANDARD_EQUIPMENT)
+        eq[eq_type] = eq.get(eq_type, 0) + rnd.randint(1, 50)
+
+    return {
+        "segments": names,
+        "subnets": subnets,
+        "global_rules": rules,
+        "user_rules": users,
+        "segment_equipment": segment_equipment,
+        "base_network": "10.0.0.0/16",
+    }
+
+
+def _build_graph(scenario):
+    # Импорт здесь: визуализатор тянет matplotlib и networkx
+    from visualizer import build_network_graph
+    return build_network_graph(scenario["segments"], scenario["global_rules"],
+                               scenario["user_rules"], scenario["segment_equipment"])
+
+
+STAGES = {
+    "validate_subnets": lambda s: validate_subnets(s["subnets"]),
+    "validate_rules": lambda s: validate_rules(s["global_rules"], s["segments"]),
+    "validate_user_rules": lambda s: validate_user_rules(s["user_rules"], s["segments"], s["global_rules"]),
+    "analyze_risks": lambda s: analyze_risks(s["segments"], s["global_rules"], s["user_rules"],
+                                             s["segment_equipment"]),
+    "generate_report": lambda s: generate_report(s["segments"], s["subnets"], s["global_rules"],
+                                                 s["user_rules"], s["segment_equipment"]),
+    "generate_risk_report": lambda s: generate_risk_report(s["segments"], s["global_rules"], s["user_rules"],
+                                                           s["segment_equipment"]),
+    "build_network_graph": _build_graph,
+}
+
+
+def time_stage(func, scenario, repeat=3):
+    """Возвращает минимальное и медианное время выполнения в секундах."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(scenario)
+        samples.append(time.perf_counter() - start)
+    return {"min": min(samples), "median": statistics.median(samples)}
+
+
+def run_benchmarks(configs, repeat=3, stages=None, seed=0):
+    """
+    Прогоняет выбранные этапы на каждой конфигурации. configs — список
+    словарей с ключами segments, global_rules, user_rules, equipment.
+    """
+    results = []
+    for params in configs:
+        scenario = generate_scenario(seed=seed, **params)
+        timings = {}
+        for name in stages or STAGES:
+            timings[name] = time_stage(STAGES[name], scenario, repeat)
+        results.append({"params": dict(params), "timings": timings})
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(old, new):
+    """
+    Сравнивает два файла результатов: для совпадающих конфигураций
+    возвращает отношения медиан (новое / старое) по этапам.
+    """
+    def key(entry):
+        return tuple(sorted(entry["params"].items()))
+
+    old_by_params = {key(entry): entry for entry in old["results"]}
+    comparison = []
+    for entry in new["results"]:
+        before = old_by_params.get(key(entry))
+        if before is None:
+            continue
+        ratios = {}
+        for stage, timing in entry["timings"].items():
+            if stage in before["timings"] and before["timings"][stage]["median"] > 0:
+                ratios[stage] = timing["median"] / before["timings"][stage]["median"]
+        comparison.append({"params": entry["params"], "ratios": ratios})
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических сценариях")
+    parser.add_argument("--segments", type=int, nargs="+", default=[20])
+    parser.add_argument("--global-rules", type=int, nargs="+", default=[1000])
+    parser.add_argument("--user-rules", type=int, nargs="+", default=[1000])
+    parser.add_argument("--equipment", type=int, nargs="+", default=[100])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="файл с предыдущими результатами для сравнения")
+    args = parser.parse_args(argv)
+
+    configs = [
+        {"segments": s, "global_rules": g, "user_rules": u, "equipment": e}
+        for s, g, u, e in itertools.product(args.segments, args.global_rules, args.user_rules, args.equipment)
+    ]
+    data = {
+        "revision": _git_revision(),
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": run_benchmarks(configs, args.repeat, args.stages, args.seed),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    for entry in data["results"]:
+        print(entry["params"])
+        for stage, timing in entry["timings"].items():
+            print(f"  {stage:<22} {timing['median'] * 1000:10.2f} мс")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print("\nСравнение с", args.compare, f"(ревизия {old.get('revision')}):")
+        for entry in compare_results(old, data):
+            print(entry["params"])
+            for stage, ratio in entry["ratios"].items():
+                print(f"  {stage:<22} x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# cli.py
+"""
+Пакетный режим без графического интерфейса (tkinter не импортируется).
+
+    python cli.py validate scenarios/
+    python cli.py analyze office.json branch.json --format json
+    python cli.py report scenarios/ --output-dir reports
+    python cli.py report huge.json --summary --page 2
+    python cli.py report scenarios/ --html --output-dir reports
+    python cli.py render scenarios/ --output-dir diagrams
+    python cli.py diff old.json new.json
+    python cli.py fleet scenarios/ --jobs 8
+    python cli.py export scenarios/ --output-dir exports --export-format csv
+
+Коды завершения: 0 — проблем нет, 1 — найдены ошибки валидации
+(для analyze и fleet — также риски, для diff — новые риски), 2 — сценарий не удалось загрузить
+или неверные аргументы.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from analysis_cache import AnalysisCache
+from fleet import analyze_fleet, format_fleet_report, summarize_fleet
+from report_export import EXPORT_FORMATS, export_scenario
+from report_generator import (DEFAULT_PAGE_SIZE, write_full_report, write_html_report, write_risk_report,
+                              write_summary_report)
+from risk_analyzer import NO_RISKS, load_policy
+from scenario_diff import delta_risks, diff_scenarios, format_diff_report, load_scenario_ref
+from scenario_manager import load_scenario_file
+from validation import iter_validation_errors
+
+EXIT_OK = 0
+EXIT_FINDINGS = 1
+EXIT_ERROR = 2
+
+COMMANDS = ("analyze", "validate", "render", "report", "export", "diff", "fleet")
+
+# Параметры обработки сценария (process_scenario, run)
+DEFAULT_OPTIONS = {
+    "output_dir": ".",         # каталог для отчётов, схем и выгрузок
+    "max_errors": None,        # предел числа ошибок валидации
+    "policy": None,            # политика проверок рисков
+    "cache_dir": None,         # каталог дискового кэша результатов (None — без записи на диск)
+    "export_format": "jsonl",  # формат выгрузки команды export (jsonl или csv)
+    "summary": None,           # параметры сводного отчёта (top_n, details, page, page_size); None — полный
+    "report_format": "text",   # text или html
+    "diagram": True,           # встраивать ли схему в HTML-отчёт
+}
+
+
+def collect_scenario_files(paths):
+    """Раскрывает каталоги в отсортированный список *.json; файлы оставляет как есть."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".json")))
+        else:
+            files.append(path)
+    return files
+
+
+def _issue_record(issue):
+    return {"code": issue.code, "segment": issue.segment, "rule_index": issue.rule_index,
+            "message": issue.message}
+
+
+def _output_path(output_dir, scenario_path, extension):
+    name = os.path.splitext(os.path.basename(scenario_path))[0]
+    return os.path.join(output_dir, name + extension)
+
+
+def _render_png(cache, scenario):
+    """Схема сценария в PNG (байты) без дисплея."""
+    import matplotlib
+    matplotlib.use("Agg")
+    fd, tmp_path = tempfile.mkstemp(suffix=".png")
+    os.close(fd)
+    try:
+        cache.render(scenario, tmp_path)
+        with open(tmp_path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(tmp_path)
+
+
+def merge_options(options):
+    """Накладывает options на DEFAULT_OPTIONS; неизвестный параметр — ValueError."""
+    unknown = set(options or {}) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры обработки: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_OPTIONS, **(options or {})}
+
+
+def process_scenario(command, path, options=None):
+    """
+    Выполняет команду для одного сценария и возвращает словарь результата
+    (сериализуется в JSON). Вызывается в процессах пула, поэтому
+    исключения не пробрасываются, а попадают в поле error.
+    options — параметры обработки (см. DEFAULT_OPTIONS).
+    """
+    options = merge_options(options)
+    result = {"scenario": path, "command": command}
+    try:
+        scenario = load_scenario_file(path)
+    except (OSError, ValueError) as e:
+        result.update(status="error", error=f"Не удалось загрузить сценарий: {e}")
+        return result
+    try:
+        _execute(command, path, scenario, result, options)
+    except Exception as e:  # некорректные данные одного сценария не должны обрывать весь пакет
+        result.update(status="error", error=f"Не удалось обработать сценарий: {type(e).__name__}: {e}")
+    return result
+
+
+def _execute(command, path, scenario, result, options):
+    """Выполняет команду для загруженного сценария и заполняет result."""
+    output_dir, max_errors, policy = options["output_dir"], options["max_errors"], options["policy"]
+    cache_dir, summary, report_format = options["cache_dir"], options["summary"], options["report_format"]
+    errors = list(iter_validation_errors(scenario["segments"], scenario["subnets"], scenario["global_rules"],
+                                         scenario["user_rules"], max_errors=max_errors))
+    result["errors"] = [_issue_record(e) for e in errors]
+    findings = bool(errors)
+
+    cache = AnalysisCache(cache_dir)
+    if command == "analyze":
+        risks = cache.analyze_risks(scenario, policy)
+        result["risks"] = [] if risks == [NO_RISKS] else risks
+        findings = findings or bool(result["risks"])
+    elif command == "report":
+        output = _output_path(output_dir, path, ".html" if report_format == "html" else ".txt")
+        with open(output, "w", encoding="utf-8") as f:
+            if report_format == "html":
+                write_html_report(f, scenario["segments"], scenario["subnets"], scenario["global_rules"],
+                                  scenario["user_rules"], scenario["segment_equipment"],
+                                  [e.message for e in errors], policy,
+                                  _render_png(cache, scenario) if options["diagram"] else None)
+            elif summary is not None:
+                # Сводка вместо построчных списков, отчёт о рисках — как обычно
+                write_summary_report(f, scenario["segments"], scenario["subnets"], scenario["global_rules"],
+                                     scenario["user_rules"], scenario["segment_equipment"],
+                                     [e.message for e in errors], **summary)
+                f.write("\n\n")
+                write_risk_report(f, scenario["segments"], scenario["global_rules"], scenario["user_rules"],
+                                  scenario["segment_equipment"], policy)
+            elif cache_dir:
+                f.write(cache.generate_report(scenario, [e.message for e in errors]))
+                f.write("\n\n")
+                f.write(cache.generate_risk_report(scenario, policy))
+            else:
+                # Без кэша отчёт пишется в файл по мере формирования, целиком в памяти не держится
+                write_full_report(f, scenario["segments"], scenario["subnets"], scenario["global_rules"],
+                                  scenario["user_rules"], scenario["segment_equipment"],
+                                  [e.message for e in errors], policy)
+        result["output"] = output
+    elif command == "export":
+        risks = cache.analyze_risks_by_check(scenario, policy)
+        outputs = export_scenario(_output_path(output_dir, path, ".jsonl"), options["export_format"],
+                                  scenario["segments"], scenario["subnets"], scenario["global_rules"],
+                                  scenario["user_rules"], scenario["segment_equipment"], errors, risks)
+        result["output"] = ", ".join(outputs)
+    elif command == "render":
+        # Отрисовка без дисплея: backend Agg выбирается до импорта pyplot
+        import matplotlib
+        matplotlib.use("Agg")
+        result["output"] = cache.render(scenario, _output_path(output_dir, path, ".png"))
+
+    result["status"] = "findings" if findings else "ok"
+
+
+def run(command, paths, jobs=None, **options):
+    """
+    Обрабатывает сценарии (файлы и каталоги) и возвращает список
+    результатов в порядке файлов. При нескольких сценариях и jobs != 1
+    используется пул процессов. options — параметры обработки
+    (см. DEFAULT_OPTIONS).
+    """
+    options = merge_options(options)
+    files = collect_scenario_files(paths)
+    if command in ("report", "render", "export"):
+        os.makedirs(options["output_dir"], exist_ok=True)
+    process = partial(process_scenario, command, options=options)
+    if jobs == 1 or len(files) < 2:
+        return [process(path) for path in files]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(process, files))
+
+
+def exit_code(results):
+    if any(r["status"] == "error" for r in results):
+        return EXIT_ERROR
+    if any(r["status"] == "findings" for r in results):
+        return EXIT_FINDINGS
+    return EXIT_OK
+
+
+def format_text(results):
+    lines = []
+    for r in results:
+        lines.append(f"[{r['status'].upper()}] {r['scenario']}")
+        if "error" in r:
+            lines.append(f"  {r['error']}")
+            continue
+        for e in r["errors"]:
+            lines.append(f"  ошибка: {e['message']}")
+        for risk in r.get("risks", []):
+            lines.append(f"  риск: {risk.strip()}")
+        if r.get("output"):
+            lines.append(f"  сохранено: {r['output']}")
+    return "\n".join(lines)
+
+
+def run_diff(old_ref, new_ref, output_format="text", policy=None):
+    """Сравнивает два сценария (файлы или имена в ScenarioManager) и печатает отчёт."""
+    try:
+        old, new = load_scenario_ref(old_ref), load_scenario_ref(new_ref)
+    except (OSError, ValueError) as e:
+        print(f"Не удалось загрузить сценарий: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    diff = diff_scenarios(old, new)
+    new_risks, resolved_risks = delta_risks(old, new, diff, policy)
+    code = EXIT_FINDINGS if new_risks else EXIT_OK
+    if output_format == "json":
+        fields = {name: value for name, value in vars(diff).items() if name != "affected_segments"}
+        print(json.dumps({"command": "diff", "exit_code": code, "old": old_ref, "new": new_ref, **fields,
+                          "new_risks": new_risks, "resolved_risks": resolved_risks},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(format_diff_report(diff, new_risks, resolved_risks))
+    return code
+
+
+def run_fleet(paths, jobs=None, output_format="text", policy=None, cache_dir=None):
+    """Анализ рисков всех сценариев с общей сводкой по парку."""
+    files = collect_scenario_files(paths)
+    if not files:
+        print("Сценарии не найдены", file=sys.stderr)
+        return EXIT_ERROR
+    start = time.perf_counter()
+    results = analyze_fleet(files, jobs, policy, cache_dir=cache_dir)
+    summary = summarize_fleet(results, wall_time=time.perf_counter() - start)
+    code = exit_code(results)
+    if output_format == "json":
+        print(json.dumps({"command": "fleet", "exit_code": code, "summary": summary, "results": results},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(format_fleet_report(summary, results))
+    return code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная проверка и анализ сценариев сегментации")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("paths", nargs="+", help="файлы сценариев JSON или каталоги с ними")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="число процессов (по умолчанию — по числу CPU)")
+    parser.add_argument("-o", "--output-dir", default=".", help="каталог для отчётов и схем")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    parser.add_argument("--max-errors", type=int, default=None)
+    parser.add_argument("--policy", help="JSON-файл политики проверок рисков")
+    parser.add_argument("--cache", metavar="DIR", help="каталог кэша результатов (например, scenario_cache)")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, default="jsonl",
+                        help="формат выгрузки команды export")
+    report_kind = parser.add_mutually_exclusive_group()
+    report_kind.add_argument("--summary", action="store_true", help="сводный отчёт (report) вместо построчного")
+    parser.add_argument("--top", type=int, default=10, help="размер топ-списков сводного отчёта")
+    parser.add_argument("--page", type=int, default=None,
+                        help="добавить в сводный отчёт страницу списков правил с этим номером")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    report_kind.add_argument("--html", action="store_true", help="отчёт (report) в виде самодостаточного HTML")
+    parser.add_argument("--no-diagram", action="store_true", help="не встраивать схему сети в HTML-отчёт")
+    args = parser.parse_args(argv)
+
+    policy = None
+    if args.policy:
+        try:
+            policy = load_policy(args.policy)
+        except (OSError, ValueError) as e:
+            print(f"Не удалось загрузить политику: {e}", file=sys.stderr)
+            return EXIT_ERROR
+    if args.command == "diff":
+        if len(args.paths) != 2:
+            parser.error("для diff нужны ровно два сценария")
+        return run_diff(args.paths[0], args.paths[1], args.format, policy)
+    if args.command == "fleet":
+        return run_fleet(args.paths, args.jobs, args.format, policy, args.cache)
+    summary = None
+    if args.summary:
+        summary = {"top_n": args.top, "details": args.page is not None, "page": args.page or 1,
+                   "page_size": args.page_size}
+    results = run(args.command, args.paths, args.jobs, output_dir=args.output_dir, max_errors=args.max_errors,
+                  policy=policy, cache_dir=args.cache, export_format=args.export_format, summary=summary,
+                  report_format="html" if args.html else "text", diagram=not args.no_diagram)
+    if not results:
+        print("Сценарии не найдены", file=sys.stderr)
+        return EXIT_ERROR
+    code = exit_code(results)
+    if args.format == "json":
+        print(json.dumps({"command": args.command, "exit_code": code, "results": results},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(format_text(results))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
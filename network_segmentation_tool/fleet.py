@@ -0,0 +1,171 @@
+# fleet.py
+"""
+Анализ рисков по всем сценариям сразу (один сценарий — одна площадка):
+валидация, analyze_risks и score_risks для каждого файла в пуле
+процессов и сводка по всему парку.
+
+    python cli.py fleet scenarios/ --jobs 8
+"""
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis_cache import AnalysisCache
+from risk_analyzer import merge_policy, score_risks
+from scenario_manager import load_scenario_file
+from validation import iter_validation_errors
+
+TIMING_STAGES = ("load", "validate", "analyze", "score")
+
+
+def analyze_scenario(path, policy=None, top_n=10, cache_dir=None):
+    """
+    Анализирует один сценарий и возвращает словарь результата (JSON):
+    ошибки валидации по кодам, риски по проверкам, самые рискованные
+    сегменты и время каждого этапа. Исключения не пробрасываются.
+    """
+    result = {"scenario": path, "timings": {}}
+    timings = result["timings"]
+    start = stage_start = time.perf_counter()
+
+    def lap(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = now - stage_start
+        stage_start = now
+
+    try:
+        scenario = load_scenario_file(path)
+    except (OSError, ValueError) as e:
+        result.update(status="error", error=f"Не удалось загрузить сценарий: {e}")
+        return result
+    try:
+        _analyze_loaded(scenario, result, lap, policy, top_n, cache_dir)
+    except Exception as e:  # некорректные данные одного сценария не должны обрывать весь прогон
+        result.update(status="error", error=f"Не удалось обработать сценарий: {type(e).__name__}: {e}")
+        return result
+    timings["total"] = time.perf_counter() - start
+    return result
+
+
+def _analyze_loaded(scenario, result, lap, policy, top_n, cache_dir):
+    """Этапы анализа загруженного сценария; lap(stage) отмечает конец этапа."""
+    result["rules"] = len(scenario["global_rules"]) + len(scenario["user_rules"])
+    lap("load")
+
+    errors = Counter(issue.code for issue in iter_validation_errors(
+        scenario["segments"], scenario["subnets"], scenario["global_rules"], scenario["user_rules"]))
+    result["errors"] = dict(errors)
+    lap("validate")
+
+    risks = AnalysisCache(cache_dir).analyze_risks_by_check(scenario, policy)
+    result["risks"] = {name: warnings for name, warnings in risks.items() if warnings}
+    lap("analyze")
+
+    scores = score_risks(scenario["segments"], scenario["global_rules"], scenario["user_rules"],
+                         scenario["segment_equipment"], policy)
+    result["top_segments"] = scores.top_segments(top_n)
+    lap("score")
+    result["status"] = "findings" if errors or result["risks"] else "ok"
+
+
+def _estimated_cost(path):
+    """Оценка трудоёмкости сценария для распределения по процессам — размер файла."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def analyze_fleet(files, jobs=None, policy=None, top_n=10, cache_dir=None):
+    """
+    Анализирует сценарии в пуле процессов и возвращает результаты в
+    порядке files. Задачи отправляются по одной, начиная с самых больших
+    файлов: крупные сценарии стартуют первыми, мелкие заполняют
+    освободившиеся процессы, и время всего прогона близко к времени
+    самого долгого сценария.
+    """
+    policy = merge_policy(policy)
+    if jobs == 1 or len(files) < 2:
+        return [analyze_scenario(path, policy, top_n, cache_dir) for path in files]
+    order = sorted(range(len(files)), key=lambda i: -_estimated_cost(files[i]))
+    results = [None] * len(files)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(analyze_scenario, files[i], policy, top_n, cache_dir): i for i in order}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+
+def summarize_fleet(results, top_n=10, wall_time=None):
+    """
+    Сводка по парку: число сценариев по статусам, самые частые типы
+    рисков и ошибок валидации (предупреждений и затронутых сценариев),
+    самые рискованные сегменты всех площадок и самые долгие сценарии.
+    """
+    statuses = Counter(r["status"] for r in results)
+    risk_warnings, risk_scenarios = Counter(), Counter()
+    error_counts, error_scenarios = Counter(), Counter()
+    segments = []
+    stage_totals = dict.fromkeys(TIMING_STAGES, 0.0)
+    for r in results:
+        if r["status"] == "error":
+            continue
+        for name, warnings in r["risks"].items():
+            risk_warnings[name] += len(warnings)
+            risk_scenarios[name] += 1
+        for code, count in r["errors"].items():
+            error_counts[code] += count
+            error_scenarios[code] += 1
+        segments.extend((score, r["scenario"], seg) for seg, score in r["top_segments"])
+        for stage in TIMING_STAGES:
+            stage_totals[stage] += r["timings"].get(stage, 0.0)
+    segments.sort(key=lambda item: -item[0])
+    timed = sorted((r for r in results if "total" in r["timings"]), key=lambda r: -r["timings"]["total"])
+    return {
+        "scenarios": len(results),
+        "statuses": dict(statuses),
+        "risk_types": [(name, count, risk_scenarios[name]) for name, count in risk_warnings.most_common()],
+        "validation_errors": [(code, count, error_scenarios[code]) for code, count in error_counts.most_common()],
+        "worst_segments": [(scenario, seg, score) for score, scenario, seg in segments[:top_n]],
+        "stage_times": stage_totals,
+        "cpu_time": sum(r["timings"]["total"] for r in timed),
+        "wall_time": wall_time,
+        "slowest": [(r["scenario"], r["timings"]["total"]) for r in timed[:top_n]],
+    }
+
+
+def format_fleet_report(summary, results):
+    """Текстовая сводка по парку и таблица времени по сценариям."""
+    statuses = summary["statuses"]
+    lines = ["=== Сводка рисков по всем сценариям ===", "",
+             f"Сценариев: {summary['scenarios']} (без замечаний: {statuses.get('ok', 0)}, "
+             f"с замечаниями: {statuses.get('findings', 0)}, ошибок загрузки: {statuses.get('error', 0)})"]
+
+    def section(title, rows):
+        lines.extend(["", f"{title}:"])
+        lines.extend(rows or [" - нет"])
+
+    section("Самые частые типы рисков (предупреждений / сценариев)",
+            [f" - {name}: {count} / {scenarios}" for name, count, scenarios in summary["risk_types"]])
+    section("Самые частые ошибки валидации (ошибок / сценариев)",
+            [f" - {code}: {count} / {scenarios}" for code, count, scenarios in summary["validation_errors"]])
+    section("Наиболее рискованные сегменты",
+            [f" - {os.path.basename(scenario)}: {seg} — {score:.1f}"
+             for scenario, seg, score in summary["worst_segments"]])
+
+    stage_times = ", ".join(f"{stage} {seconds:.2f} с" for stage, seconds in summary["stage_times"].items())
+    lines.extend(["", f"Время анализа: {summary['cpu_time']:.2f} с суммарно ({stage_times})"])
+    if summary["wall_time"] is not None:
+        lines.append(f"Время прогона: {summary['wall_time']:.2f} с")
+
+    lines.extend(["", "Время по сценариям:"])
+    for r in results:
+        name = os.path.basename(r["scenario"])
+        if r["status"] == "error":
+            lines.append(f" - {name}: {r['error']}")
+            continue
+        stages = ", ".join(f"{stage} {r['timings'][stage] * 1000:.0f}" for stage in TIMING_STAGES)
+        lines.append(f" - {name}: {r['timings']['total'] * 1000:.0f} мс ({stages}; правил: {r['rules']})")
+    return "\n".join(lines)
@@ -0,0 +1,67 @@
+# ip_utils.py
+import ipaddress
+import re
+
+IPV4_BITS = 32
+IPV6_BITS = 128
+
+_IPV4_CIDR_RE = re.compile(
+    r"(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})/(\d{1,2})"
+)
+_IPV4_ADDRESS_RE = re.compile(
+    r"(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})"
+)
+
+
+def _parse_ipv4_fast(cidr):
+    """
+    Быстрый разбор записи вида 'a.b.c.d/p' без создания объектов ipaddress.
+    Возвращает (start, end) или None, если запись не в каноническом виде.
+    """
+    match = _IPV4_CIDR_RE.fullmatch(cidr)
+    if match is None:
+        return None
+    a, b, c, d, prefixlen = map(int, match.groups())
+    if a > 255 or b > 255 or c > 255 or d > 255 or prefixlen > IPV4_BITS:
+        return None
+    host_bits = IPV4_BITS - prefixlen
+    start = ((a << 24 | b << 16 | c << 8 | d) >> host_bits) << host_bits
+    return start, start | ((1 << host_bits) - 1)
+
+
+def parse_cidr(cidr):
+    """
+    Разбирает CIDR так же, как ipaddress.ip_network(cidr, strict=False),
+    но возвращает целые числа: (версия, первый адрес, последний адрес).
+    При некорректной записи выбрасывает ValueError.
+    """
+    if isinstance(cidr, str):
+        bounds = _parse_ipv4_fast(cidr)
+        if bounds is not None:
+            return 4, bounds[0], bounds[1]
+    net = ipaddress.ip_network(cidr, strict=False)
+    start = int(net.network_address)
+    return net.version, start, start + net.num_addresses - 1
+
+
+def parse_address(address):
+    """
+    Разбирает IP-адрес (строку, ip_address или целое число) в пару
+    (версия, целое значение). Целые числа меньше 2**32 считаются IPv4.
+    При некорректной записи выбрасывает ValueError.
+    """
+    if isinstance(address, int):
+        return (4 if address < 1 << IPV4_BITS else 6), address
+    if isinstance(address, str):
+        match = _IPV4_ADDRESS_RE.fullmatch(address)
+        if match is not None:
+            a, b, c, d = map(int, match.groups())
+            if a <= 255 and b <= 255 and c <= 255 and d <= 255:
+                return 4, a << 24 | b << 16 | c << 8 | d
+    addr = ipaddress.ip_address(address)
+    return addr.version, int(addr)
+
+
+def address_bits(version):
+    """Разрядность адреса для версии протокола."""
+    return IPV4_BITS if version == 4 else IPV6_BITS
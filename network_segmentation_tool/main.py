@@ -2,10 +2,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from example_data import STANDARD_SEGMENTS, STANDARD_SERVICES, STANDARD_EQUIPMENT
-from validation import validate_subnets, validate_rules, validate_user_rules
-from report_generator import generate_report, generate_risk_report
+from validation import iter_validation_errors
+from validation_session import ValidationSession
+from analysis_cache import AnalysisCache
+from report_export import export_scenario
+from report_generator import write_full_report, write_html_report, write_risk_report, write_summary_report
+from report_viewer import ReportBuffer, ReportView
 from visualizer import draw_and_save_network
 from scenario_manager import ScenarioManager
+from subnet_allocator import SubnetAllocator
+from subnet_planner import plan_subnets
 import ipaddress
 import platform
 import subprocess
@@ -29,6 +35,8 @@ class NetworkSegmentationApp:
         self.root.title("Автоматизация сегментации ЛВС")
         self.root.geometry("1050x700")  # Изменено: уменьшена высота
         self.manager = ScenarioManager()
+        # Отчёты и схемы по неизменённым сценариям берутся из кэша
+        self.analysis_cache = AnalysisCache()
         self.current_scenario = None
         # --- НОВОЕ: доступные диапазоны ---
         self.available_networks = {
@@ -112,10 +120,12 @@ class NetworkSegmentationApp:
         self.bottom_button_frame = ttk.Frame(self.root)
         self.bottom_button_frame.pack(pady=10)
         ttk.Button(self.bottom_button_frame, text="Сохранить отчёт", command=self.save_report).pack(side='left', padx=5)
+        ttk.Button(self.bottom_button_frame, text="Экспорт данных", command=self.export_data).pack(side='left', padx=5)
         ttk.Button(self.bottom_button_frame, text="Назад", command=self.show_welcome_screen).pack(side='left', padx=5)
 
-        self.output_text = tk.Text(self.root, height=6, wrap='word')  # Изменено: уменьшена высота
-        self.output_text.pack(fill='both', padx=10, pady=5, expand=True)  # Изменено: уменьшено расстояние сверху
+        # Отчёт показывается окном видимых строк: размер отчёта не влияет на отзывчивость
+        self.report_view = ReportView(self.root, height=6)
+        self.report_view.pack(fill='both', padx=10, pady=5, expand=True)
 
     def setup_data(self):
         self.segments = []
@@ -124,8 +134,14 @@ class NetworkSegmentationApp:
         self.user_rules = []
         self.segment_equipment = {}
         self.equipment_rows = []
-        # --- НОВОЕ: список использованных подсетей ---
-        self.used_subnets = set()
+        # Распределитель свободных подсетей базового диапазона
+        self.subnet_allocator = SubnetAllocator(self.base_network)
+        # Сеанс валидации: между запусками анализа перепроверяется только изменившееся
+        self.validation_session = ValidationSession()
+        # Сводный отчёт (счётчики вместо построчных списков) — для больших моделей
+        self.summary_var = tk.BooleanVar(value=False)
+        # Данные последнего анализа (сценарий, ошибки): по ним сохраняется HTML-отчёт
+        self.report_inputs = None
 
     def build_segments_tab(self):
         scrollable = self.create_scrollable_frame(self.tab_segments)
@@ -171,9 +187,14 @@ class NetworkSegmentationApp:
         selected_key = self.base_network_combo.get()
         if selected_key in self.available_networks:
             self.base_network = self.available_networks[selected_key]
+            self.subnet_allocator = SubnetAllocator(self.base_network)
             # Пересчитываем подсети только если уже есть сегменты
             if self.segments:
                 self.recalculate_all_subnets()
+            else:
+                # Подсети существующих строк, попавшие в новый диапазон, считаем занятыми
+                for _, _, cidr_ent in self.segment_rows:
+                    self.subnet_allocator.reserve(cidr_ent.get().strip())
 
     def add_segment_row(self, auto_assign_subnet=True):
         row_frame = ttk.Frame(self.segment_container)
@@ -194,36 +215,27 @@ class NetworkSegmentationApp:
             next_subnet = self.get_next_available_subnet()
             if next_subnet:
                 cidr_entry.insert(0, next_subnet)
-                self.used_subnets.add(next_subnet)
             else:
                 messagebox.showwarning("Предупреждение", "Нет свободных подсетей в выбранном диапазоне")
 
     def remove_segment_row(self, frame):
-        # Найти и удалить соответствующую подсеть из used_subnets
+        # Найти и вернуть распределителю соответствующую подсеть
         for row_frame, _, cidr_ent in self.segment_rows:
             if row_frame == frame:
-                subnet_to_remove = cidr_ent.get().strip()
-                if subnet_to_remove in self.used_subnets:
-                    self.used_subnets.remove(subnet_to_remove)
+                self.subnet_allocator.release(cidr_ent.get().strip())
                 break
         frame.destroy()
         self.segment_rows = [(f, n, c) for f, n, c in self.segment_rows if f != frame]
 
     def get_next_available_subnet(self):
-        """Возвращает следующую незанятую подсеть /24 из текущего базового диапазона."""
-        # Генерируем все возможные /24 подсети в базовом диапазоне
-        all_possible = list(self.base_network.subnets(new_prefix=24))
-        used = set(self.used_subnets)
-        for net in all_possible:
-            str_net = str(net)
-            if str_net not in used:
-                return str_net
-        return None
+        """Занимает и возвращает следующую свободную подсеть /24 из текущего базового диапазона."""
+        net = self.subnet_allocator.allocate(24)
+        return str(net) if net else None
 
     def recalculate_all_subnets(self):
         """Пересчитывает подсети для всех текущих сегментов на основе выбранного базового диапазона."""
-        # Сначала очищаем список использованных подсетей
-        self.used_subnets.clear()
+        # Сначала освобождаем все подсети базового диапазона
+        self.subnet_allocator.reset()
 
         # Собираем текущие имена сегментов
         current_names = []
@@ -249,8 +261,8 @@ class NetworkSegmentationApp:
             frame.destroy()
         self.segment_rows.clear()
 
-        # Очищаем использованные подсети
-        self.used_subnets.clear()
+        # Освобождаем все подсети базового диапазона
+        self.subnet_allocator.reset()
 
         # Добавляем стандартные сегменты, подсети назначаются автоматически
         for seg in STANDARD_SEGMENTS:
@@ -335,9 +347,11 @@ class NetworkSegmentationApp:
         new_btn_frame = ttk.Frame(self.root)
         new_btn_frame.pack(pady=10)
         ttk.Button(new_btn_frame, text="Анализ и отчёт", command=self.analyze).pack(side='left', padx=5)
+        ttk.Checkbutton(new_btn_frame, text="Сводка", variable=self.summary_var).pack(side='left', padx=5)
         ttk.Button(new_btn_frame, text="Сохранить рисунок сети", command=self.save_diagram).pack(side='left', padx=5)
         ttk.Button(new_btn_frame, text="Просмотреть схему", command=self.view_diagram).pack(side='left', padx=5)
         ttk.Button(new_btn_frame, text="Сохранить отчёт", command=self.save_report).pack(side='left', padx=5)
+        ttk.Button(new_btn_frame, text="Экспорт данных", command=self.export_data).pack(side='left', padx=5)
         ttk.Button(new_btn_frame, text="Сохранить сценарий", command=self.save_current_scenario).pack(side='left', padx=5)
         ttk.Button(new_btn_frame, text="Назад", command=self.show_welcome_screen).pack(side='left', padx=5)
 
@@ -443,6 +457,8 @@ class NetworkSegmentationApp:
 
         add_btn = ttk.Button(scrollable, text="+ Добавить оборудование", command=self.add_equipment_row)
         add_btn.pack(pady=5)
+        plan_btn = ttk.Button(scrollable, text="Подобрать подсети по оборудованию", command=self.plan_subnets_from_equipment)
+        plan_btn.pack(pady=5)
 
         self.equipment_container = ttk.Frame(scrollable)
         self.equipment_container.pack(fill='both', expand=True, pady=5)
@@ -471,6 +487,25 @@ class NetworkSegmentationApp:
         frame.destroy()
         self.equipment_rows = [(f, s, e, c) for f, s, e, c in self.equipment_rows if f != frame]
 
+    def plan_subnets_from_equipment(self):
+        """Назначает сегментам подсети минимального размера по количеству оборудования."""
+        self.collect_data_for_analysis()
+        planned, errors = plan_subnets(self.segments, self.segment_equipment, self.base_network)
+        if errors:
+            msg = "Не удалось разместить сегменты:\n" + "\n".join(f" - {e}" for e in errors)
+            messagebox.showerror("Ошибка планирования", msg)
+            return
+
+        self.subnet_allocator.reset()
+        for _, name_ent, cidr_ent in self.segment_rows:
+            name = name_ent.get().strip()
+            if name in planned:
+                cidr_ent.delete(0, tk.END)
+                cidr_ent.insert(0, planned[name])
+            self.subnet_allocator.reserve(cidr_ent.get().strip())
+        self.subnets.update(planned)
+        messagebox.showinfo("Готово", f"Подсети назначены для сегментов: {len(planned)}")
+
     def build_instructions_tab(self):
         text = """ИНСТРУКЦИЯ ПО ИСПОЛЬЗОВАНИЮ
 
@@ -491,11 +526,17 @@ class NetworkSegmentationApp:
 4. Вкладка "4. Оборудование":
    - Привяжите оборудование к конкретному сегменту.
    - Укажите количество устройств.
+   - "Подобрать подсети по оборудованию" — назначить сегментам подсети
+     минимального размера с запасом на рост.
 
 5. Кнопки внизу окна:
    - "Анализ и отчёт" — проверка модели и генерация текстового отчёта.
+   - "Сводка" — вместо построчных списков правил показать счётчики по сегментам
+     и сервисам, самых широких пользователей и матрицу сервисов между сегментами.
    - "Сохранить рисунок сети" — экспорт схемы в PNG или PDF.
-   - "Сохранить отчёт" — сохранение текстового отчёта в файл.
+   - "Сохранить отчёт" — сохранение отчёта в файл: .txt — текст,
+     .html — отчёт для браузера со схемой сети и сворачиваемыми таблицами.
+   - "Экспорт данных" — выгрузка модели, ошибок и рисков в JSON Lines или CSV.
    - "Сохранить сценарий" — сохранение текущего сценария в json файл.
    - "Загрузить сценарий" — загрузка сценария из файла.
    - "Сохранить сценарий как..." — сохранение с новым именем.
@@ -517,16 +558,19 @@ class NetworkSegmentationApp:
 
     def collect_data_for_analysis(self):
         self.global_rules = []
-        for _, name_ent, src_cb, dst_cb, svc_cb in self.global_rule_rows:
+        self.global_rule_keys = []  # идентификаторы строк, из которых взяты правила
+        for row_frame, name_ent, src_cb, dst_cb, svc_cb in self.global_rule_rows:
             name = name_ent.get().strip()
             src = src_cb.get().strip()
             dst = dst_cb.get().strip()
             svc = svc_cb.get().strip()
             if name and src and dst and svc:
                 self.global_rules.append((name, src, dst, svc))
+                self.global_rule_keys.append(str(row_frame))
 
         self.user_rules = []
-        for _, seg_cb, fio_ent, pos_ent, target_cb, svc_cb in self.user_rule_rows:
+        self.user_rule_keys = []
+        for row_frame, seg_cb, fio_ent, pos_ent, target_cb, svc_cb in self.user_rule_rows:
             seg = seg_cb.get().strip()
             fio = fio_ent.get().strip()
             pos = pos_ent.get().strip()
@@ -534,6 +578,7 @@ class NetworkSegmentationApp:
             svc = svc_cb.get().strip()
             if seg and fio and target and svc:
                 self.user_rules.append((seg, fio, pos, target, svc))
+                self.user_rule_keys.append(str(row_frame))
 
         self.segment_equipment = {seg: {} for seg in self.segments}
         for _, seg_cb, eq_cb, count_var in self.equipment_rows:
@@ -545,35 +590,48 @@ class NetworkSegmentationApp:
                     self.segment_equipment[seg][eq] = 0
                 self.segment_equipment[seg][eq] += cnt
 
-    def analyze(self):
+    def _analysis_inputs(self):
+        """Собирает данные из формы и возвращает (сценарий, ошибки валидации)."""
         self.collect_data_for_analysis()
 
-        all_rules = [(name, src, dst, svc) for name, src, dst, svc in self.global_rules]
-        for seg, fio, pos, target, svc in self.user_rules:
-            all_rules.append((f"User:{fio}", seg, target, svc))
+        # Сеанс перепроверяет только строки, изменившиеся с прошлого анализа;
+        # правила адресуются идентификаторами строк, а не позициями
+        self.validation_session.sync(
+            self.segments, self.subnets,
+            dict(zip(self.global_rule_keys, self.global_rules)),
+            dict(zip(self.user_rule_keys, self.user_rules)),
+        )
+        errors = self.validation_session.validate()
 
-        subnet_errors = validate_subnets(self.subnets)
-        rule_errors = validate_rules(all_rules, self.segments)
-        user_errors = validate_user_rules(self.user_rules, self.segments)
+        scenario_data = {
+            "segments": self.segments,
+            "subnets": self.subnets,
+            "global_rules": self.global_rules,
+            "user_rules": self.user_rules,
+            "segment_equipment": self.segment_equipment,
+        }
+        return scenario_data, errors
 
-        errors = []
-        if subnet_errors:
-            errors.extend(subnet_errors)
-        if rule_errors:
-            errors.extend(rule_errors)
-        if user_errors:
-            errors.extend(user_errors)
-
-        main_report = generate_report(
-            self.segments, self.subnets, self.global_rules, self.user_rules, self.segment_equipment, errors
-        )
-        risk_report = generate_risk_report(
-            self.segments, self.global_rules, self.user_rules, self.segment_equipment
-        )
+    def analyze(self):
+        scenario_data, errors = self._analysis_inputs()
+        summary = self.summary_var.get()
+
+        segments, subnets = self.segments, self.subnets
+        global_rules, user_rules, equipment = self.global_rules, self.user_rules, self.segment_equipment
+
+        def write(out):
+            # Отчёт пишется частями прямо во временный файл буфера
+            if summary:
+                write_summary_report(out, segments, subnets, global_rules, user_rules, equipment, errors)
+                out.write("\n\n")
+                write_risk_report(out, segments, global_rules, user_rules, equipment)
+            else:
+                write_full_report(out, segments, subnets, global_rules, user_rules, equipment, errors)
 
-        full_report = main_report + "\n\n" + risk_report
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.insert(tk.END, full_report)
+        self.report_view.set_buffer(ReportBuffer.from_writer(write))
+        # Для HTML: правила и оборудование собираются заново при каждом анализе,
+        # подсети планировщик меняет на месте — их достаточно скопировать поверхностно
+        self.report_inputs = (dict(scenario_data, segments=list(self.segments), subnets=dict(self.subnets)), errors)
 
         if errors:
             messagebox.showwarning("Внимание", f"Обнаружено ошибок: {len(errors)}. Отчёт содержит предупреждения.")
@@ -602,44 +660,72 @@ class NetworkSegmentationApp:
             with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
                 temp_path = tmp.name
 
-            import tkinter.filedialog
-            original_asksave = tkinter.filedialog.asksaveasfilename
-            tkinter.filedialog.asksaveasfilename = lambda **kw: temp_path
-
-            try:
-                img_path = draw_and_save_network(
-                    self.segments,
-                    self.global_rules,
-                    self.user_rules,
-                    self.segment_equipment,
-                    self.root,
-                    show_legend=True
-                )
-                if img_path and os.path.exists(img_path):
-                    open_image_file(img_path)
-                else:
-                    messagebox.showwarning("Ошибка", "Не удалось создать схему")
-            finally:
-                tkinter.filedialog.asksaveasfilename = original_asksave
+            img_path = self.analysis_cache.render(self.get_current_data(), temp_path)
+            if img_path and os.path.exists(img_path):
+                open_image_file(img_path)
+            else:
+                messagebox.showwarning("Ошибка", "Не удалось создать схему")
 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось отобразить схему:\n{str(e)}")
 
     def save_report(self):
-        content = self.output_text.get(1.0, tk.END).strip()
-        if not content:
+        if self.report_view.is_empty():
             messagebox.showwarning("Ошибка", "Нет данных для сохранения")
             return
 
         path = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            filetypes=[("Text files", "*.txt"), ("HTML", "*.html"), ("All files", "*.*")]
         )
         if path:
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            if path.lower().endswith((".html", ".htm")):
+                # HTML строится по данным последнего анализа, а не по текущему состоянию формы
+                scenario_data, errors = self.report_inputs
+                with open(path, 'w', encoding='utf-8') as f:
+                    write_html_report(f, scenario_data["segments"], scenario_data["subnets"],
+                                      scenario_data["global_rules"], scenario_data["user_rules"],
+                                      scenario_data["segment_equipment"], errors,
+                                      diagram_png=self._diagram_png(scenario_data))
+            else:
+                # Сохраняется ровно показанный отчёт, частями из буфера
+                with open(path, 'wb') as f:
+                    self.report_view.buffer.write_to(f)
             messagebox.showinfo("Сохранено", f"Отчёт сохранён:\n{path}")
 
+    def _diagram_png(self, scenario_data):
+        """Схема сети в PNG (байты) для HTML-отчёта; пустые байты, если нарисовать не удалось."""
+        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
+            temp_path = tmp.name
+        try:
+            self.analysis_cache.render(scenario_data, temp_path)
+            with open(temp_path, "rb") as f:
+                return f.read()
+        except Exception:
+            return b""
+        finally:
+            os.remove(temp_path)
+
+    def export_data(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV (файл на таблицу)", "*.csv")]
+        )
+        if not path:
+            return
+        scenario_data, _ = self._analysis_inputs()
+        # Ключи сеанса — идентификаторы строк формы; в выгрузке нужны позиции, как в CLI
+        issues = list(iter_validation_errors(self.segments, self.subnets, self.global_rules, self.user_rules))
+        risks = self.analysis_cache.analyze_risks_by_check(scenario_data)
+        export_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+        try:
+            paths = export_scenario(path, export_format, self.segments, self.subnets, self.global_rules,
+                                    self.user_rules, self.segment_equipment, issues, risks)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось выгрузить данные:\n{e}")
+            return
+        messagebox.showinfo("Сохранено", "Данные выгружены:\n" + "\n".join(paths))
+
     # --- Новые методы для сценариев ---
     def load_scenario(self):
         scenarios = self.manager.list_scenarios()
@@ -708,7 +794,6 @@ class NetworkSegmentationApp:
         for frame, _, _ in self.segment_rows:
             frame.destroy()
         self.segment_rows.clear()
-        self.used_subnets.clear()  # Очищаем использованные подсети
 
         # Загружаем базовый диапазон
         base_network_key = scenario_data.get("base_network", "10.0.0.0/16")
@@ -720,6 +805,7 @@ class NetworkSegmentationApp:
             default_key = list(self.available_networks.keys())[0]
             self.base_network = self.available_networks[default_key]
             self.base_network_combo.set(default_key)
+        self.subnet_allocator = SubnetAllocator(self.base_network)
 
         # Загружаем сегменты и подсети
         self.segments = scenario_data.get("segments", [])
@@ -728,8 +814,8 @@ class NetworkSegmentationApp:
             self.add_segment_row(auto_assign_subnet=False)  # Не назначать автоматически
             self.segment_rows[-1][1].insert(0, seg)
             self.segment_rows[-1][2].insert(0, cidr)
-            # Добавляем загруженную подсеть в список использованных
-            self.used_subnets.add(cidr)
+            # Помечаем загруженную подсеть как занятую
+            self.subnet_allocator.reserve(cidr)
 
         # Обновляем вкладки, если они уже созданы
         if self.tabs_created:
@@ -0,0 +1,170 @@
+# model.py
+import sys
+from array import array
+
+
+class Interner:
+    """
+    Таблица интернирования: каждой уникальной строке (имени сегмента,
+    сервиса, ФИО) сопоставляется небольшой целый идентификатор.
+    Строки очищаются от пробелов один раз — при добавлении.
+    """
+    __slots__ = ("names", "ids")
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name):
+        name = name.strip()
+        ident = self.ids.get(name)
+        if ident is None:
+            ident = len(self.names)
+            name = sys.intern(name)
+            self.names.append(name)
+            self.ids[name] = ident
+        return ident
+
+    def get(self, name, default=None):
+        return self.ids.get(name, default)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+
+class GlobalRuleTable:
+    """
+    Глобальные правила в столбцах: имена правил списком, сегменты и
+    сервисы — массивами целых идентификаторов. При итерации выдаёт
+    привычные кортежи (name, src, dst, svc), поэтому принимается везде,
+    где ожидается список глобальных правил.
+    """
+    __slots__ = ("segments", "services", "names", "src", "dst", "svc")
+
+    def __init__(self, segments, services, rules=()):
+        self.segments = segments
+        self.services = services
+        self.names = []
+        self.src = array("i")
+        self.dst = array("i")
+        self.svc = array("i")
+        for rule in rules:
+            self.append(*rule)
+
+    def append(self, name, src, dst, svc):
+        self.names.append(sys.intern(name.strip()))
+        self.src.append(self.segments.intern(src))
+        self.dst.append(self.segments.intern(dst))
+        self.svc.append(self.services.intern(svc))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        seg = self.segments.names
+        return self.names[i], seg[self.src[i]], seg[self.dst[i]], self.services.names[self.svc[i]]
+
+    def __iter__(self):
+        seg = self.segments.names
+        svc = self.services.names
+        for name, s, d, v in zip(self.names, self.src, self.dst, self.svc):
+            yield name, seg[s], seg[d], svc[v]
+
+
+class UserRuleTable:
+    """
+    Правила пользователей в столбцах. ФИО и должности интернируются
+    отдельно: у одного пользователя обычно много правил. При итерации
+    выдаёт кортежи (seg, fio, pos, target, svc).
+    """
+    __slots__ = ("segments", "services", "people", "positions", "seg", "fio", "pos", "target", "svc")
+
+    def __init__(self, segments, services, rules=()):
+        self.segments = segments
+        self.services = services
+        self.people = Interner()
+        self.positions = Interner()
+        self.seg = array("i")
+        self.fio = array("i")
+        self.pos = array("i")
+        self.target = array("i")
+        self.svc = array("i")
+        for rule in rules:
+            self.append(*rule)
+
+    def append(self, seg, fio, pos, target, svc):
+        self.seg.append(self.segments.intern(seg))
+        self.fio.append(self.people.intern(fio))
+        self.pos.append(self.positions.intern(pos))
+        self.target.append(self.segments.intern(target))
+        self.svc.append(self.services.intern(svc))
+
+    def __len__(self):
+        return len(self.seg)
+
+    def __getitem__(self, i):
+        seg = self.segments.names
+        return (seg[self.seg[i]], self.people.names[self.fio[i]], self.positions.names[self.pos[i]],
+                seg[self.target[i]], self.services.names[self.svc[i]])
+
+    def __iter__(self):
+        seg = self.segments.names
+        fio = self.people.names
+        pos = self.positions.names
+        svc = self.services.names
+        for s, f, p, t, v in zip(self.seg, self.fio, self.pos, self.target, self.svc):
+            yield seg[s], fio[f], pos[p], seg[t], svc[v]
+
+
+class NetworkModel:
+    """
+    Компактная модель сценария. Атрибуты совпадают по смыслу с
+    аргументами validate_*, analyze_risks, generate_report и
+    draw_and_save_network, поэтому модель можно передавать по частям:
+    analyze_risks(m.segments, m.global_rules, m.user_rules, m.segment_equipment).
+
+    Сегменты, встречающиеся только в правилах, тоже получают
+    идентификаторы, но в segments (объявленные) не входят.
+    """
+    __slots__ = ("segment_ids", "service_ids", "segments", "declared", "subnets",
+                 "global_rules", "user_rules", "segment_equipment")
+
+    def __init__(self, segments=(), subnets=None, global_rules=(), user_rules=(), segment_equipment=None):
+        self.segment_ids = Interner()
+        self.service_ids = Interner()
+        self.segments = []
+        self.declared = bytearray()  # declared[id] == 1 для объявленных сегментов
+        for seg in segments:
+            self.declare_segment(seg)
+        self.subnets = dict(subnets or {})
+        self.global_rules = GlobalRuleTable(self.segment_ids, self.service_ids, global_rules)
+        self.user_rules = UserRuleTable(self.segment_ids, self.service_ids, user_rules)
+        self.segment_equipment = dict(segment_equipment or {})
+
+    def declare_segment(self, name):
+        ident = self.segment_ids.intern(name)
+        if len(self.declared) <= ident:
+            self.declared.extend(bytes(ident + 1 - len(self.declared)))
+        if not self.declared[ident]:
+            self.declared[ident] = 1
+            self.segments.append(self.segment_ids.names[ident])
+        return ident
+
+    def is_declared(self, ident):
+        return ident < len(self.declared) and self.declared[ident] == 1
+
+    @classmethod
+    def from_scenario(cls, scenario_data):
+        """Строит модель из словаря в формате ScenarioManager."""
+        return cls(
+            scenario_data.get("segments", []),
+            scenario_data.get("subnets", {}),
+            scenario_data.get("global_rules", []),
+            scenario_data.get("user_rules", []),
+            scenario_data.get("segment_equipment", {}),
+        )
@@ -0,0 +1,106 @@
+# permissions.py
+from collections import Counter
+
+
+class PermissionIndex:
+    """
+    Эффективные права доступа: для каждого пользователя — множество пар
+    (сегмент, сервис), доступных ему по собственным правилам и по
+    глобальным правилам из сегментов, где он находится; для каждого
+    сегмента — доступ по глобальным правилам.
+
+    Правила учитываются счётчиками, поэтому их можно добавлять и удалять
+    по одному. Множество пользователя собирается при первом запросе и
+    сбрасывается только при изменении правил, которые его затрагивают.
+    """
+
+    def __init__(self, global_rules=(), user_rules=()):
+        self._segment_access = {}  # сегмент -> Counter((цель, сервис))
+        self._user_access = {}     # ФИО -> Counter((цель, сервис)) по личным правилам
+        self._user_segments = {}   # ФИО -> Counter(сегмент)
+        self._segment_users = {}   # сегмент -> множество ФИО
+        self._effective = {}       # ФИО -> frozenset, кэш
+        for rule in global_rules:
+            self.add_global_rule(rule)
+        for rule in user_rules:
+            self.add_user_rule(rule)
+
+    def add_global_rule(self, rule):
+        _, src, dst, svc = rule
+        self._segment_access.setdefault(src, Counter())[(dst, svc)] += 1
+        self._invalidate_segment(src)
+
+    def remove_global_rule(self, rule):
+        _, src, dst, svc = rule
+        if _decrement(self._segment_access, src, (dst, svc)):
+            self._invalidate_segment(src)
+
+    def add_user_rule(self, rule):
+        seg, fio, _, target, svc = rule
+        self._user_access.setdefault(fio, Counter())[(target, svc)] += 1
+        self._user_segments.setdefault(fio, Counter())[seg] += 1
+        self._segment_users.setdefault(seg, set()).add(fio)
+        self._effective.pop(fio, None)
+
+    def remove_user_rule(self, rule):
+        seg, fio, _, target, svc = rule
+        if not _decrement(self._user_access, fio, (target, svc)):
+            return
+        if _decrement(self._user_segments, fio, seg) and seg not in self._user_segments.get(fio, ()):
+            self._segment_users[seg].discard(fio)
+        self._effective.pop(fio, None)
+
+    def _invalidate_segment(self, seg):
+        for fio in self._segment_users.get(seg, ()):
+            self._effective.pop(fio, None)
+
+    def users(self):
+        return list(self._user_access)
+
+    def user_segments(self, fio):
+        """Сегменты, в которых находится пользователь."""
+        return list(self._user_segments.get(fio, ()))
+
+    def segment_access(self, seg):
+        """Пары (сегмент, сервис), открытые глобальными правилами из seg."""
+        return frozenset(self._segment_access.get(seg, ()))
+
+    def user_access(self, fio):
+        """Пары (сегмент, сервис), доступные пользователю (пустое множество для неизвестного)."""
+        access = self._effective.get(fio)
+        if access is None:
+            if fio not in self._user_access:
+                return frozenset()
+            access = set(self._user_access[fio])
+            for seg in self._user_segments[fio]:
+                access.update(self._segment_access.get(seg, ()))
+            access = self._effective[fio] = frozenset(access)
+        return access
+
+    def can_access(self, fio, segment, svc):
+        return (segment, svc) in self.user_access(fio)
+
+    def services_to(self, fio, segment):
+        """Сервисы, по которым пользователь может обращаться к сегменту."""
+        return sorted(svc for target, svc in self.user_access(fio) if target == segment)
+
+
+def _decrement(counters, key, item):
+    """Уменьшает счётчик item; возвращает False, если такой записи не было."""
+    counter = counters.get(key)
+    if not counter or not counter[item]:
+        return False
+    counter[item] -= 1
+    if not counter[item]:
+        del counter[item]
+    if not counter:
+        del counters[key]
+    return True
+
+
+def format_user_access(index, fio):
+    """'Finance: SMB; IT: HTTPS, SSH'"""
+    by_segment = {}
+    for target, svc in sorted(index.user_access(fio)):
+        by_segment.setdefault(target, []).append(svc)
+    return "; ".join(f"{target}: {', '.join(services)}" for target, services in by_segment.items())
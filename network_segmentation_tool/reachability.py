@@ -0,0 +1,269 @@
+# reachability.py
+import numpy as np
+
+from example_data import STANDARD_SERVICES
+from rule_analyzer import service_key
+from services import ServiceSpec, spec_contains
+
+ANY_SERVICE = None  # класс «любой сервис»: рёбра всех правил вместе
+
+
+def _packed_matrix(n, edges):
+    """Булева матрица смежности n×n, упакованная по 64 бита в строке."""
+    matrix = np.zeros((n, (n + 63) >> 6), dtype=np.uint64)
+    if edges:
+        src, dst = np.array(edges, dtype=np.int64).T
+        np.bitwise_or.at(matrix, (src, dst >> 6), np.left_shift(np.uint64(1), (dst & 63).astype(np.uint64)))
+    return matrix
+
+
+def _transitive_closure(matrix):
+    """
+    Замыкание Уоршелла над битовыми строками: для каждой промежуточной
+    вершины k все строки, достигающие k, объединяются со строкой k.
+    Одна итерация — одна векторная операция над матрицей.
+    """
+    closure = matrix.copy()
+    for k in range(closure.shape[0]):
+        bit = np.uint64(1 << (k & 63))
+        mask = (closure[:, k >> 6] & bit) != 0
+        if mask.any():
+            closure[mask] |= closure[k]
+    return closure
+
+
+def _add_edge_to_closure(closure, u, v):
+    """Новое ребро u → v: все строки, достигающие u (и сама u), получают v и всё, что достижимо из v."""
+    mask = (closure[:, u >> 6] & np.uint64(1 << (u & 63))) != 0
+    mask[u] = True
+    gained = closure[v].copy()
+    gained[v >> 6] |= np.uint64(1 << (v & 63))
+    closure[mask] |= gained
+
+
+def _remove_edge_from_closure(adjacency, closure, u):
+    """
+    После удаления ребра из u пересчитываются только строки вершин, достигавших u.
+    Строки остальных вершин не изменились и не ведут в такие вершины,
+    поэтому сначала к пересчитываемым строкам добавляются замыкания их
+    прямых соседей вне этого множества, а затем выполняется Уоршелл
+    только по пересчитываемым вершинам.
+    """
+    mask = (closure[:, u >> 6] & np.uint64(1 << (u & 63))) != 0
+    mask[u] = True
+    affected = np.flatnonzero(mask)
+    rows = adjacency[affected]
+    column_mask = np.zeros(closure.shape[1] * 64, dtype=bool)
+    column_mask[:len(mask)] = mask
+    column_mask = np.packbits(column_mask, bitorder="little").view(np.uint64)
+    exits = np.bitwise_or.reduce(rows & ~column_mask, axis=0)
+    for w in _bits(exits, closure.shape[0]):
+        has_w = (rows[:, w >> 6] & np.uint64(1 << (int(w) & 63))) != 0
+        rows[has_w] |= closure[w]
+    for index, k in enumerate(affected):
+        has_k = (rows[:, k >> 6] & np.uint64(1 << (int(k) & 63))) != 0
+        if has_k.any():
+            rows[has_k] |= rows[index]
+    closure[affected] = rows
+
+
+def _has_bit(row, j):
+    return bool(row[j >> 6] & np.uint64(1 << (j & 63)))
+
+
+def _bits(row, n):
+    """Номера установленных битов строки по возрастанию."""
+    bits = np.unpackbits(row.view(np.uint8), bitorder="little")[:n]
+    return np.flatnonzero(bits)
+
+
+class ReachabilityIndex:
+    """
+    Транзитивная достижимость между сегментами по правилам (глобальным и
+    пользовательским). Для каждого класса сервисов (одинаковый порт —
+    один класс) и для всех правил вместе хранится своя матрица;
+    матрицы и замыкания строятся по первому запросу.
+
+    Правила можно добавлять и удалять после построения: уже посчитанные
+    замыкания обновляются на месте, затрагиваются только строки
+    сегментов, достигающих источника изменённого ребра. Появление нового
+    сегмента меняет размер матриц, и они строятся заново.
+
+    Правило с диапазоном TCP-портов ('TCP 1-1024') входит и в свой
+    класс, и в классы всех портов диапазона.
+    """
+
+    def __init__(self, segments, global_rules, user_rules=(), services=STANDARD_SERVICES):
+        self.services = services
+        self.segments = []
+        self.ids = {}
+        self._adjacency = {}
+        self._closure = {}
+        for seg in segments:
+            self.add_segment(seg)
+        self.labels = {}  # ключ сервиса -> имя сервиса из первого правила
+        self._edges = {ANY_SERVICE: {}}  # ключ сервиса -> {(src, dst): число правил}
+        self._ranges = []  # ключи классов с диапазонами TCP-портов
+        # (ключ сервиса, ребро) -> число правил именно с этим ключом; ведётся только
+        # при наличии диапазонов, без них совпадает со счётчиками классов
+        self._rule_counts = None
+        for _, src, dst, svc in global_rules:
+            self.add_rule(src, dst, svc)
+        for seg, _, _, target, svc in user_rules:
+            self.add_rule(seg, target, svc)
+
+    def add_segment(self, seg):
+        ident = self.ids.get(seg)
+        if ident is None:
+            ident = self.ids[seg] = len(self.segments)
+            self.segments.append(seg)
+            if self._adjacency:
+                self._adjacency.clear()
+                self._closure.clear()
+        return ident
+
+    def add_rule(self, src, dst, svc):
+        """Добавляет ребро src → dst по сервису svc."""
+        if src == dst:
+            return
+        edge = (self.add_segment(src), self.add_segment(dst))
+        key = service_key(svc, self.services)
+        if key not in self.labels:
+            self.labels[key] = svc
+            self._class_edges(key)
+            if isinstance(key, ServiceSpec) and key.protocol == "TCP":
+                if self._rule_counts is None:
+                    self._rule_counts = {(k, e): count for k, edges in self._edges.items() if k is not ANY_SERVICE
+                                         for e, count in edges.items()}
+                self._ranges.append(key)
+        if self._rule_counts is not None:
+            self._rule_counts[(key, edge)] = self._rule_counts.get((key, edge), 0) + 1
+        for k in self._rule_keys(key):
+            edges = self._edges[k]
+            count = edges.get(edge, 0)
+            edges[edge] = count + 1
+            if not count and k in self._adjacency:
+                u, v = edge
+                self._adjacency[k][u, v >> 6] |= np.uint64(1 << (v & 63))
+                if k in self._closure:
+                    _add_edge_to_closure(self._closure[k], u, v)
+
+    def remove_rule(self, src, dst, svc):
+        """Удаляет одно правило src → dst по svc; ребро исчезает вместе с последним таким правилом."""
+        if src == dst or src not in self.ids or dst not in self.ids:
+            return
+        edge = (self.ids[src], self.ids[dst])
+        key = service_key(svc, self.services)
+        if self._rule_counts is None:
+            if not self._edges.get(key, {}).get(edge):
+                return
+        else:
+            count = self._rule_counts.get((key, edge))
+            if not count:
+                return
+            if count == 1:
+                del self._rule_counts[(key, edge)]
+            else:
+                self._rule_counts[(key, edge)] = count - 1
+        for k in self._rule_keys(key):
+            edges = self._edges[k]
+            edges[edge] -= 1
+            if edges[edge]:
+                continue
+            del edges[edge]
+            if k in self._adjacency:
+                u, v = edge
+                self._adjacency[k][u, v >> 6] &= ~np.uint64(1 << (v & 63))
+                if k in self._closure:
+                    _remove_edge_from_closure(self._adjacency[k], self._closure[k], u)
+
+    def _key(self, svc):
+        return ANY_SERVICE if svc is None else service_key(svc, self.services)
+
+    @staticmethod
+    def _covers(range_key, port):
+        return spec_contains(range_key, ServiceSpec("TCP", ((port, port),)))
+
+    def _class_edges(self, key):
+        """Рёбра класса; класс порта при создании получает рёбра покрывающих его диапазонов."""
+        edges = self._edges.get(key)
+        if edges is None:
+            edges = self._edges[key] = {}
+            if isinstance(key, int):
+                for range_key in self._ranges:
+                    if self._covers(range_key, key):
+                        for edge, count in self._edges[range_key].items():
+                            edges[edge] = edges.get(edge, 0) + count
+        return edges
+
+    def _rule_keys(self, key):
+        """Классы, в которые входит правило с ключом key."""
+        if key.__class__ is not ServiceSpec or key.protocol != "TCP":
+            return key, ANY_SERVICE
+        return [key, ANY_SERVICE] + [k for k in self._edges if isinstance(k, int) and self._covers(key, k)]
+
+    def service_classes(self):
+        """Ключи классов сервисов, встречающихся в правилах."""
+        return list(self.labels)
+
+    def adjacency(self, svc=ANY_SERVICE):
+        key = self._key(svc)
+        if key not in self._adjacency:
+            self._adjacency[key] = _packed_matrix(len(self.segments), sorted(self._class_edges(key)))
+        return self._adjacency[key]
+
+    def closure(self, svc=ANY_SERVICE):
+        key = self._key(svc)
+        if key not in self._closure:
+            self._closure[key] = _transitive_closure(self.adjacency(svc))
+        return self._closure[key]
+
+    def reaches(self, src, dst, svc=ANY_SERVICE):
+        """Достижим ли dst из src по цепочке правил (только по сервису svc, если задан)."""
+        if src not in self.ids or dst not in self.ids:
+            return False
+        return _has_bit(self.closure(svc)[self.ids[src]], self.ids[dst])
+
+    def reachable_from(self, src, svc=ANY_SERVICE):
+        if src not in self.ids:
+            return []
+        row = self.closure(svc)[self.ids[src]]
+        return [self.segments[j] for j in _bits(row, len(self.segments)) if j != self.ids[src]]
+
+    def first_hop(self, src, dst, svc=ANY_SERVICE):
+        """Первый промежуточный сегмент на пути src → dst или None, если пути нет."""
+        if not self.reaches(src, dst, svc):
+            return None
+        i, t = self.ids[src], self.ids[dst]
+        closure = self.closure(svc)
+        for v in _bits(self.adjacency(svc)[i], len(self.segments)):
+            if v == t:
+                return dst
+            if _has_bit(closure[v], t):
+                return self.segments[v]
+        return None
+
+    def transitive_exposures(self, src, svc=ANY_SERVICE, order=None):
+        """
+        Сегменты, достижимые из src только через промежуточные сегменты
+        (прямого правила нет). Возвращает пары (сегмент, первый промежуточный).
+        Промежуточный — первый подходящий сосед в порядке добавления в индекс
+        или с наименьшей позицией в order ({сегмент: позиция}).
+        """
+        if src not in self.ids:
+            return []
+        i = self.ids[src]
+        n = len(self.segments)
+        closure = self.closure(svc)
+        direct = self.adjacency(svc)[i]
+        hops = _bits(direct, n)
+        exposures = []
+        for t in _bits(closure[i] & ~direct, n):
+            if t == i:
+                continue
+            if order is None:
+                via = next(v for v in hops if _has_bit(closure[v], t))
+            else:
+                via = min((v for v in hops if _has_bit(closure[v], t)), key=lambda v: order[self.segments[v]])
+            exposures.append((self.segments[t], self.segments[via]))
+        return exposures
@@ -0,0 +1,101 @@
+# report_export.py
+"""
+Машиночитаемая выгрузка модели: сегменты и подсети, глобальные правила,
+правила пользователей, оборудование, ошибки валидации и риски.
+Строки формируются генератором и сразу пишутся в файл, поэтому память
+не зависит от размера модели.
+
+JSON Lines — один файл, у каждой строки поле "table" с именем таблицы.
+CSV — по файлу на таблицу: <имя>.<таблица>.csv.
+"""
+import csv
+import json
+import os
+
+EXPORT_FORMATS = ("jsonl", "csv")
+
+# Таблицы выгрузки и их столбцы (в порядке вывода)
+EXPORT_TABLES = {
+    "segments": ("segment", "subnet"),
+    "global_rules": ("index", "name", "source", "destination", "service"),
+    "user_rules": ("index", "segment", "user", "position", "target", "service"),
+    "equipment": ("segment", "equipment", "count"),
+    "validation_errors": ("code", "segment", "rule_index", "message"),
+    "risks": ("check", "message"),
+}
+
+
+def iter_export_rows(segments, subnets, global_rules, user_rules, segment_equipment,
+                     validation_errors=(), risks=None):
+    """
+    Лениво выдаёт пары (таблица, словарь строки) по таблицам EXPORT_TABLES.
+    validation_errors — ValidationIssue, risks — словарь проверка -> предупреждения
+    (как у analyze_risks_by_check).
+    """
+    for seg in segments:
+        yield "segments", {"segment": seg, "subnet": subnets.get(seg, "")}
+    for i, (name, src, dst, svc) in enumerate(global_rules):
+        yield "global_rules", {"index": i, "name": name, "source": src, "destination": dst, "service": svc}
+    for i, (seg, fio, pos, target, svc) in enumerate(user_rules):
+        yield "user_rules", {"index": i, "segment": seg, "user": fio, "position": pos, "target": target,
+                             "service": svc}
+    for seg, equipment in segment_equipment.items():
+        for eq, count in equipment.items():
+            if count:
+                yield "equipment", {"segment": seg, "equipment": eq, "count": count}
+    for issue in validation_errors:
+        yield "validation_errors", {"code": issue.code, "segment": issue.segment, "rule_index": issue.rule_index,
+                                    "message": issue.message}
+    for check, warnings in (risks or {}).items():
+        for warning in warnings:
+            yield "risks", {"check": check, "message": warning.strip()}
+
+
+def write_jsonl(out, rows):
+    """Пишет строки в out (текстовый файл) в формате JSON Lines. Возвращает число строк."""
+    count = 0
+    for table, row in rows:
+        out.write(json.dumps({"table": table, **row}, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def csv_paths(path):
+    """Пути CSV-файлов таблиц для базового пути path (расширение отбрасывается)."""
+    base = os.path.splitext(path)[0]
+    return {table: f"{base}.{table}.csv" for table in EXPORT_TABLES}
+
+
+def write_csv(path, rows):
+    """
+    Пишет таблицы в CSV-файлы рядом с path (заголовок есть и у пустых таблиц).
+    Возвращает список путей.
+    """
+    paths = csv_paths(path)
+    files = {table: open(p, "w", encoding="utf-8", newline="") for table, p in paths.items()}
+    try:
+        writers = {}
+        for table, f in files.items():
+            writers[table] = csv.DictWriter(f, fieldnames=EXPORT_TABLES[table])
+            writers[table].writeheader()
+        for table, row in rows:
+            writers[table].writerow(row)
+    finally:
+        for f in files.values():
+            f.close()
+    return list(paths.values())
+
+
+def export_scenario(path, export_format, segments, subnets, global_rules, user_rules, segment_equipment,
+                    validation_errors=(), risks=None):
+    """Выгружает модель в path (jsonl) или в CSV-файлы рядом с path. Возвращает список путей."""
+    rows = iter_export_rows(segments, subnets, global_rules, user_rules, segment_equipment,
+                            validation_errors, risks)
+    if export_format == "csv":
+        return write_csv(path, rows)
+    if export_format != "jsonl":
+        raise ValueError(f"Неизвестный формат выгрузки: {export_format}")
+    with open(path, "w", encoding="utf-8") as f:
+        write_jsonl(f, rows)
+    return [path]
@@ -1,58 +1,494 @@
 # report_generator.py
+import base64
+import heapq
+import html
+import io
+import json
+from collections import Counter
+from collections.abc import Sequence
+from itertools import islice
+from operator import itemgetter
 
-from risk_analyzer import analyze_risks
+from attack_paths import AttackGraph, STOP_TIME, format_attack_path, untrusted_segments
+from model import GlobalRuleTable, UserRuleTable
+from permissions import PermissionIndex, format_user_access
+from risk_analyzer import NO_RISKS, analyze_risks, merge_policy, score_risks
 
-def generate_risk_report(segments, global_rules, user_rules, segment_equipment):
-    report = "=== Отчёт о потенциальных рисках и сложностях ===\n\n"
-    risks = analyze_risks(segments, global_rules, user_rules, segment_equipment)
-    for r in risks:
-        report += f"{r}\n"
-    return report
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_PAGE_SIZE = 100
+MATRIX_MAX_SEGMENTS = 15  # больше — матрица выводится списком самых насыщенных пар
 
-def generate_report(segments, subnets, global_rules, user_rules, segment_equipment, validation_errors=None):
-    report = "=== Отчёт по сегментации локальной сети ===\n\n"
+# Начала заголовков разделов отчёта — по ним просмотрщик строит переходы к разделам
+SECTION_TITLES = (
+    "=== ",
+    "ОБНАРУЖЕНЫ ОШИБКИ",
+    "Сегменты и подсети:",
+    "Глобальные правила взаимодействия",
+    "Правила для пользователей",
+    "Правила по сегментам",
+    "Правила по сервисам",
+    "Пользователи с самыми широкими правами",
+    "Сервисы между сегментами",
+    "Итого оборудования",
+    "Эффективные права пользователей",
+    "Оборудование по сегментам:",
+    "Наиболее рискованные сегменты",
+    "Наиболее рискованные связи",
+    "Возможные пути атаки",
+)
+
+
+class ChunkedWriter:
+    """
+    Приёмник текста для функции-обработчика (например, вставки в виджет):
+    записи копятся и передаются в callback блоками не меньше chunk_size
+    символов. После последней записи нужен flush().
+    """
+
+    def __init__(self, callback, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.callback = callback
+        self.chunk_size = chunk_size
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.callback("".join(self._parts))
+            self._parts = []
+            self._size = 0
+
+
+def _write_function(out):
+    """out — объект с методом write (файл, io.StringIO) или функция, принимающая текст."""
+    return out.write if hasattr(out, "write") else out
+
+
+def write_risk_report(out, segments, global_rules, user_rules, segment_equipment, policy=None, top_n=10):
+    """Пишет отчёт о рисках в out по мере формирования разделов."""
+    write = _write_function(out)
+    write("=== Отчёт о потенциальных рисках и сложностях ===\n\n")
+    for r in analyze_risks(segments, global_rules, user_rules, segment_equipment, policy):
+        write(f"{r}\n")
+
+    scores = score_risks(segments, global_rules, user_rules, segment_equipment, policy)
+    top_segments = [(seg, score) for seg, score in scores.top_segments(top_n) if score > 0]
+    if top_segments:
+        write("\nНаиболее рискованные сегменты (оценка):\n")
+        for seg, score in top_segments:
+            write(f" - {seg}: {score:.1f}\n")
+        write("\nНаиболее рискованные связи между сегментами:\n")
+        for src, dst, score in scores.top_pairs(top_n):
+            write(f" - {src} → {dst}: {score:.1f}\n")
+
+    critical, paths, stopped = _attack_paths(segments, global_rules, user_rules, policy, top_segments)
+    if paths:
+        write(f"\nВозможные пути атаки к критичным сегментам ({', '.join(critical)}):\n")
+        for path in paths:
+            write(f" - {format_attack_path(path)}\n")
+        if stopped == STOP_TIME:
+            write(" - ... перебор остановлен по ограничению времени\n")
+        elif stopped:
+            write(f" - ... показаны первые {len(paths)} путей\n")
+
+
+def _attack_paths(segments, global_rules, user_rules, policy, top_segments):
+    """
+    Пути атаки из недоверенных сегментов к критичным (из политики или
+    самым рискованным): (критичные сегменты, пути, причина остановки перебора).
+    """
+    policy = merge_policy(policy)
+    sources = untrusted_segments(segments, policy["guest_marker"])
+    limits = policy["attack_paths"]
+    critical = limits["critical_segments"] or [seg for seg, _ in top_segments if seg not in sources][:3]
+    if not (sources and critical):
+        return critical, [], None
+    graph = AttackGraph(global_rules, user_rules)
+    paths = list(graph.iter_paths(sources, critical, limits["max_depth"], limits["max_paths"],
+                                  limits["time_budget"]))
+    return critical, paths, graph.stopped
+
+
+def write_report(out, segments, subnets, global_rules, user_rules, segment_equipment, validation_errors=None):
+    """Пишет отчёт по модели в out: файл, io.StringIO или функцию, принимающую текст."""
+    write = _write_function(out)
+    write("=== Отчёт по сегментации локальной сети ===\n\n")
 
     if validation_errors:
-        report += "ОБНАРУЖЕНЫ ОШИБКИ:\n"
+        write("ОБНАРУЖЕНЫ ОШИБКИ:\n")
         for err in validation_errors:
-            report += f" - {err}\n"
-        report += "\n"
+            write(f" - {err}\n")
+        write("\n")
     else:
-        report += "Модель прошла валидацию успешно.\n\n"
+        write("Модель прошла валидацию успешно.\n\n")
 
-    report += "Сегменты и подсети:\n"
+    write("Сегменты и подсети:\n")
     for seg in segments:
         cidr = subnets.get(seg, "").strip()
         if not cidr:
             cidr = "не задано"
-        report += f" - {seg}: {cidr}\n"
+        write(f" - {seg}: {cidr}\n")
 
-    report += "\nГлобальные правила взаимодействия:\n"
+    write("\nГлобальные правила взаимодействия:\n")
     if global_rules:
         for name, src, dst, svc in global_rules:
-            report += f" - [{name}] {src} → {dst} : {svc}\n"
+            write(f" - [{name}] {src} → {dst} : {svc}\n")
     else:
-        report += " - Отсутствуют.\n"
+        write(" - Отсутствуют.\n")
 
-    report += "\nПравила для пользователей:\n"
+    write("\nПравила для пользователей:\n")
     if user_rules:
         for seg, fio, pos, target, svc in user_rules:
-            report += f" - {fio} ({pos}, сегмент {seg}) → {target} : {svc}\n"
+            write(f" - {fio} ({pos}, сегмент {seg}) → {target} : {svc}\n")
     else:
-        report += " - Не заданы.\n"
+        write(" - Не заданы.\n")
 
-    report += "\nОборудование по сегментам:\n"
+    if user_rules:
+        permissions = PermissionIndex(global_rules, user_rules)
+        write("\nЭффективные права пользователей (с учётом глобальных правил):\n")
+        for fio in permissions.users():
+            segments_list = ", ".join(permissions.user_segments(fio))
+            write(f" - {fio} ({segments_list}): {format_user_access(permissions, fio)}\n")
+
+    write("\nОборудование по сегментам:\n")
     has_eq = False
     for seg in segments:
         eq_list = segment_equipment.get(seg, {})
         if any(count > 0 for count in eq_list.values()):
-            report += f"\nСегмент {seg}:\n"
+            write(f"\nСегмент {seg}:\n")
             for eq, cnt in eq_list.items():
                 if cnt > 0:
-                    report += f"  - {eq}: {cnt} шт.\n"
+                    write(f"  - {eq}: {cnt} шт.\n")
                     has_eq = True
     if not has_eq:
-        report += " - Не указано.\n"
+        write(" - Не указано.\n")
+
+
+def _write_page(write, title, rows, total, page, page_size, format_row):
+    """Страница page (с 1) раздела подробностей: page_size строк из rows."""
+    pages = max(1, -(-total // page_size))
+    page = min(max(page, 1), pages)
+    write(f"\n{title} (стр. {page} из {pages}, всего {total}):\n")
+    for row in islice(rows, (page - 1) * page_size, page * page_size):
+        write(f" - {format_row(row)}\n")
+    if not total:
+        write(" - Нет.\n")
+
+
+def _reiterable(rows):
+    """rows для нескольких проходов: одноразовый итератор сохраняется в список."""
+    return rows if isinstance(rows, (Sequence, GlobalRuleTable, UserRuleTable)) else list(rows)
+
+
+def write_summary_report(out, segments, subnets, global_rules, user_rules, segment_equipment,
+                         validation_errors=None, top_n=10, details=False, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Сводный отчёт для больших моделей: счётчики вместо построчных
+    списков. Время линейно по числу правил: каждый счётчик — отдельный
+    проход map/itemgetter по списку правил (около десяти проходов);
+    одноразовые итераторы сегментов и правил сначала сохраняются в список.
+    details — добавить постраничные списки правил (страница page по
+    page_size строк).
+    """
+    write = _write_function(out)
+    segments, global_rules, user_rules = _reiterable(segments), _reiterable(global_rules), _reiterable(user_rules)
+    validation_errors = validation_errors or []
+    # Несколько проходов map/itemgetter вместо одного цикла: перебор идёт внутри Counter и set,
+    # на 1 млн правил пользователей это примерно в 1,6 раза быстрее общего цикла на Python
+    outgoing = Counter(map(itemgetter(1), global_rules))
+    user_segment_rules = Counter(map(itemgetter(0), user_rules))
+    incoming = Counter(map(itemgetter(2), global_rules))
+    incoming.update(map(itemgetter(3), user_rules))
+    services = Counter(map(itemgetter(3), global_rules))
+    services.update(map(itemgetter(4), user_rules))
+    links = set(map(itemgetter(1, 2, 3), global_rules))  # (откуда, куда, сервис)
+    links.update(map(itemgetter(0, 3, 4), user_rules))
+    matrix = Counter(map(itemgetter(0, 1), links))  # (откуда, куда) -> число различных сервисов
+    user_access = Counter(map(itemgetter(1), user_rules))  # ФИО -> число правил
+    equipment_totals, segment_totals = Counter(), Counter()
+    for seg, eq_list in segment_equipment.items():
+        for eq, cnt in eq_list.items():
+            if cnt > 0:
+                equipment_totals[eq] += cnt
+                segment_totals[seg] += cnt
+
+    write("=== Сводный отчёт по сегментации локальной сети ===\n\n")
+    write(f"Сегментов: {len(segments)}, с подсетью: {sum(1 for seg in segments if subnets.get(seg, '').strip())}\n")
+    write(f"Глобальных правил: {len(global_rules)}, правил для пользователей: {len(user_rules)}, "
+          f"пользователей: {len(user_access)}\n")
+    if validation_errors:
+        write(f"\nОБНАРУЖЕНЫ ОШИБКИ: {len(validation_errors)}\n")
+        for err in validation_errors[:top_n]:
+            write(f" - {err}\n")
+        if len(validation_errors) > top_n:
+            write(f" - ... и ещё {len(validation_errors) - top_n}\n")
+    else:
+        write("Модель прошла валидацию успешно.\n")
+
+    write("\nПравила по сегментам (исходящие глобальные / пользовательские / входящие):\n")
+    for seg in segments:
+        write(f" - {seg}: {outgoing[seg]} / {user_segment_rules[seg]} / {incoming[seg]}\n")
+
+    write("\nПравила по сервисам:\n")
+    for svc, count in services.most_common():
+        write(f" - {svc}: {count}\n")
+    if not services:
+        write(" - Нет.\n")
+
+    write(f"\nПользователи с самыми широкими правами (топ-{top_n}, число правил):\n")
+    widest = user_access.most_common(top_n)
+    for fio, count in widest:
+        write(f" - {fio}: {count}\n")
+    if not widest:
+        write(" - Нет.\n")
 
-    return report
+    write("\nСервисы между сегментами (число различных сервисов):\n")
+    if matrix and segments and len(segments) <= MATRIX_MAX_SEGMENTS:
+        width = max(len(seg) for seg in segments)
+        write(" " * (width + 4) + " ".join(seg.rjust(width) for seg in segments) + "\n")
+        for src in segments:
+            cells = (str(matrix[src, dst]).rjust(width) for dst in segments)
+            write(f"   {src.ljust(width)} " + " ".join(cells) + "\n")
+    position = {seg: i for i, seg in enumerate(segments)}
+    top_pairs = heapq.nsmallest(top_n, matrix.items(), key=lambda item: (
+        -item[1], position.get(item[0][0], len(position)), position.get(item[0][1], len(position)), item[0]))
+    pair_services = {pair: [] for pair, _ in top_pairs}
+    for src, dst, svc in links:
+        if (src, dst) in pair_services:
+            pair_services[src, dst].append(svc)
+    for (src, dst), _ in top_pairs:
+        write(f" - {src} → {dst}: {', '.join(sorted(pair_services[src, dst]))}\n")
+    if len(matrix) > top_n:
+        write(f" - ... и ещё пар сегментов: {len(matrix) - top_n}\n")
+    if not matrix:
+        write(" - Нет.\n")
 
+    write("\nИтого оборудования:\n")
+    for eq, cnt in equipment_totals.most_common():
+        write(f" - {eq}: {cnt} шт.\n")
+    for seg, cnt in segment_totals.most_common(top_n):
+        write(f" - сегмент {seg}: {cnt} шт.\n")
+    if not equipment_totals:
+        write(" - Не указано.\n")
+
+    if details:
+        _write_page(write, "Глобальные правила взаимодействия", global_rules, len(global_rules), page, page_size,
+                    lambda rule: f"[{rule[0]}] {rule[1]} → {rule[2]} : {rule[3]}")
+        _write_page(write, "Правила для пользователей", user_rules, len(user_rules), page, page_size,
+                    lambda rule: f"{rule[1]} ({rule[2]}, сегмент {rule[0]}) → {rule[3]} : {rule[4]}")
+
+
+def write_full_report(out, segments, subnets, global_rules, user_rules, segment_equipment,
+                      validation_errors=None, policy=None):
+    """Отчёт по модели и отчёт о рисках подряд — то, что показывает «Анализ и отчёт»."""
+    write_report(out, segments, subnets, global_rules, user_rules, segment_equipment, validation_errors)
+    _write_function(out)("\n\n")
+    write_risk_report(out, segments, global_rules, user_rules, segment_equipment, policy)
+
+
+def generate_risk_report(segments, global_rules, user_rules, segment_equipment, policy=None, top_n=10):
+    out = io.StringIO()
+    write_risk_report(out, segments, global_rules, user_rules, segment_equipment, policy, top_n)
+    return out.getvalue()
+
+
+_HTML_STYLE = """
+body { font-family: sans-serif; margin: 20px; color: #222; }
+details { margin: 10px 0; border: 1px solid #ccc; border-radius: 4px; padding: 6px 10px; }
+summary { cursor: pointer; font-weight: bold; }
+table { border-collapse: collapse; margin: 6px 0; font-size: 14px; }
+th, td { border: 1px solid #ddd; padding: 3px 8px; text-align: left; }
+th { background: #f0f0f0; cursor: pointer; user-select: none; }
+.errors li { color: #b00; }
+.muted { color: #777; }
+img { max-width: 100%; }
+"""
+
+# Таблицы хранятся как JSON в <script type="application/json"> и строятся
+# постранично при первом раскрытии раздела: DOM не растёт с размером модели
+_HTML_SCRIPT = """
+var PAGE = 200;
+function initTable(box) {
+  if (box.data) return;
+  box.data = JSON.parse(document.getElementById(box.dataset.source).textContent);
+  box.view = box.data;
+  var columns = JSON.parse(box.dataset.columns);
+  var filter = document.createElement("input");
+  filter.placeholder = "Фильтр";
+  var info = document.createElement("span");
+  info.className = "muted";
+  var table = document.createElement("table");
+  var head = table.createTHead().insertRow();
+  var body = table.createTBody();
+  var more = document.createElement("button");
+  more.textContent = "Показать ещё";
+  var order = {column: -1, asc: true};
+  function draw(reset) {
+    if (reset) { body.innerHTML = ""; box.shown = 0; }
+    var stop = Math.min(box.view.length, box.shown + PAGE);
+    for (var i = box.shown; i < stop; i++) {
+      var row = body.insertRow();
+      box.view[i].forEach(function (value) { row.insertCell().textContent = value; });
+    }
+    box.shown = stop;
+    info.textContent = " строк: " + box.view.length + (box.view.length < box.data.length ? " из " + box.data.length : "");
+    more.style.display = box.shown < box.view.length ? "" : "none";
+  }
+  columns.forEach(function (title, column) {
+    var th = document.createElement("th");
+    th.textContent = title;
+    th.onclick = function () {
+      order.asc = order.column === column ? !order.asc : true;
+      order.column = column;
+      var sign = order.asc ? 1 : -1;
+      box.view = box.view.slice().sort(function (a, b) {
+        var x = a[column], y = b[column];
+        if (typeof x === "number" && typeof y === "number") return sign * (x - y);
+        return sign * String(x).localeCompare(String(y));
+      });
+      draw(true);
+    };
+    head.appendChild(th);
+  });
+  filter.oninput = function () {
+    var query = filter.value.toLowerCase();
+    box.view = query ? box.data.filter(function (row) {
+      return row.join("\\u0001").toLowerCase().indexOf(query) >= 0;
+    }) : box.data;
+    order.column = -1;
+    draw(true);
+  };
+  more.onclick = function () { draw(false); };
+  box.append(filter, info, table, more);
+  draw(true);
+}
+document.querySelectorAll("details").forEach(function (section) {
+  function open() {
+    if (section.open) section.querySelectorAll(":scope > .lazy-table").forEach(initTable);
+  }
+  section.addEventListener("toggle", open);
+  open();
+});
+"""
+
+
+def _json_for_html(value):
+    """Компактный JSON, безопасный внутри <script>: '<' экранируется."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
+
+
+def _write_lazy_table(write, table_id, columns, rows):
+    """Заготовка таблицы и её строки в JSON; строки пишутся потоком, по одной."""
+    write(f'<div class="lazy-table" data-source="{table_id}" data-columns="{html.escape(_json_for_html(columns))}">'
+          f'</div>\n<script type="application/json" id="{table_id}">[')
+    separator = ""
+    for row in rows:
+        write(separator + _json_for_html(row))
+        separator = ","
+    write("]</script>\n")
+
+
+def _write_html_table(write, table_id, title, columns, rows, count, open_section=False):
+    """Раскрывающийся раздел с одной таблицей."""
+    write(f'<details{" open" if open_section else ""}><summary>{html.escape(title)} ({count})</summary>\n')
+    _write_lazy_table(write, table_id, columns, rows)
+    write("</details>\n")
+
+
+def write_html_report(out, segments, subnets, global_rules, user_rules, segment_equipment,
+                      validation_errors=None, policy=None, diagram_png=None, top_n=10):
+    """
+    Самодостаточный HTML-отчёт: стили и скрипт встроены, схема сети
+    (diagram_png — байты PNG) встраивается как data URI. Большие таблицы
+    выводятся компактным JSON и отрисовываются скриптом постранично при
+    раскрытии раздела.
+    """
+    write = _write_function(out)
+    write('<!DOCTYPE html>\n<html lang="ru">\n<head>\n<meta charset="utf-8">\n'
+          f'<title>Отчёт по сегментации локальной сети</title>\n<style>{_HTML_STYLE}</style>\n</head>\n<body>\n'
+          '<h1>Отчёт по сегментации локальной сети</h1>\n')
+    write(f'<p>Сегментов: {len(segments)}, глобальных правил: {len(global_rules)}, '
+          f'правил для пользователей: {len(user_rules)}</p>\n')
+    if validation_errors:
+        write(f'<details open><summary>Обнаружены ошибки ({len(validation_errors)})</summary>\n<ul class="errors">\n')
+        for err in validation_errors:
+            write(f"<li>{html.escape(str(err))}</li>\n")
+        write("</ul>\n</details>\n")
+    else:
+        write("<p>Модель прошла валидацию успешно.</p>\n")
+
+    warnings = analyze_risks(segments, global_rules, user_rules, segment_equipment, policy)
+    scores = score_risks(segments, global_rules, user_rules, segment_equipment, policy)
+    top_segments = [(seg, score) for seg, score in scores.top_segments(top_n) if score > 0]
+    if warnings == [NO_RISKS]:
+        warnings = []
+    write(f"<details open><summary>Потенциальные риски и сложности ({len(warnings)})</summary>\n")
+    if warnings:
+        _write_lazy_table(write, "risks", ["Предупреждение"], ([warning.strip()] for warning in warnings))
+    else:
+        write(f"<p>{NO_RISKS}</p>\n")
+    if top_segments:
+        write("<h3>Наиболее рискованные сегменты</h3>\n<table><tr><th>Сегмент</th><th>Оценка</th></tr>\n")
+        for seg, score in top_segments:
+            write(f"<tr><td>{html.escape(seg)}</td><td>{score:.1f}</td></tr>\n")
+        write("</table>\n<h3>Наиболее рискованные связи</h3>\n"
+              "<table><tr><th>Откуда</th><th>Куда</th><th>Оценка</th></tr>\n")
+        for src, dst, score in scores.top_pairs(top_n):
+            write(f"<tr><td>{html.escape(src)}</td><td>{html.escape(dst)}</td><td>{score:.1f}</td></tr>\n")
+        write("</table>\n")
+    critical, paths, stopped = _attack_paths(segments, global_rules, user_rules, policy, top_segments)
+    if paths:
+        write(f"<h3>Возможные пути атаки к критичным сегментам ({html.escape(', '.join(critical))})</h3>\n<ul>\n")
+        for path in paths:
+            write(f"<li>{html.escape(format_attack_path(path))}</li>\n")
+        if stopped == STOP_TIME:
+            write('<li class="muted">перебор остановлен по ограничению времени</li>\n')
+        elif stopped:
+            write(f'<li class="muted">показаны первые {len(paths)} путей</li>\n')
+        write("</ul>\n")
+    write("</details>\n")
+
+    if diagram_png:
+        write("<details open><summary>Схема сети</summary>\n")
+        write(f'<img alt="Схема сети" src="data:image/png;base64,{base64.b64encode(diagram_png).decode("ascii")}">\n')
+        write("</details>\n")
+
+    _write_html_table(write, "segments", "Сегменты и подсети", ["Сегмент", "Подсеть"],
+                      ([seg, subnets.get(seg, "").strip() or "не задано"] for seg in segments), len(segments),
+                      open_section=True)
+    _write_html_table(write, "global-rules", "Глобальные правила взаимодействия",
+                      ["Правило", "Откуда", "Куда", "Сервис"], global_rules, len(global_rules))
+    _write_html_table(write, "user-rules", "Правила для пользователей",
+                      ["Сегмент", "Пользователь", "Должность", "Куда", "Сервис"], user_rules, len(user_rules))
+    equipment = [[seg, eq, cnt] for seg in segments for eq, cnt in segment_equipment.get(seg, {}).items() if cnt > 0]
+    _write_html_table(write, "equipment", "Оборудование по сегментам", ["Сегмент", "Оборудование", "Количество"],
+                      equipment, len(equipment))
+
+    write(f"<script>{_HTML_SCRIPT}</script>\n</body>\n</html>\n")
+
+
+def generate_html_report(segments, subnets, global_rules, user_rules, segment_equipment, validation_errors=None,
+                         policy=None, diagram_png=None, top_n=10):
+    out = io.StringIO()
+    write_html_report(out, segments, subnets, global_rules, user_rules, segment_equipment, validation_errors, policy,
+                      diagram_png, top_n)
+    return out.getvalue()
+
+
+def generate_summary_report(segments, subnets, global_rules, user_rules, segment_equipment, validation_errors=None,
+                            top_n=10, details=False, page=1, page_size=DEFAULT_PAGE_SIZE):
+    out = io.StringIO()
+    write_summary_report(out, segments, subnets, global_rules, user_rules, segment_equipment, validation_errors,
+                         top_n, details, page, page_size)
+    return out.getvalue()
+
+
+def generate_report(segments, subnets, global_rules, user_rules, segment_equipment, validation_errors=None):
+    out = io.StringIO()
+    write_report(out, segments, subnets, global_rules, user_rules, segment_equipment, validation_errors)
+    return out.getvalue()
@@ -0,0 +1,331 @@
+# report_viewer.py
+"""
+Просмотр больших отчётов: в виджет Text попадают только видимые строки,
+а сам текст хранится в ReportBuffer (байты UTF-8 в памяти или файл,
+отображённый через mmap) с индексом начал строк. Прокрутка, переход к
+разделу и поиск не зависят от размера отчёта.
+
+    python report_viewer.py reports/site1.txt
+"""
+import io
+import mmap
+import sys
+import tempfile
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+
+import numpy as np
+
+from report_generator import SECTION_TITLES
+
+WHEEL_LINES = 3
+SEARCH_WINDOW = 1 << 20  # байт текста на одно окно поиска
+
+
+def _map_file(f):
+    """Содержимое открытого двоичного файла через mmap; b"" для пустого файла."""
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # пустой файл
+        return b""
+
+
+class ReportBuffer:
+    """
+    Текст отчёта с индексом строк. data — bytes или mmap в UTF-8;
+    начала строк находятся одним векторным проходом, строка по номеру
+    декодируется только при обращении.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10) if len(data) else np.empty(0, np.int64)
+        starts = np.concatenate(([0], ends + 1))
+        if starts[-1] == len(data):  # после завершающего \n строки нет
+            starts = starts[:-1]
+        self._starts = starts
+        self._bounds = np.append(starts, len(data))
+        self._sections = None
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Буфер из частей текста (например, отчёта и отчёта о рисках)."""
+        return cls(b"".join(chunk.encode("utf-8") for chunk in chunks))
+
+    @classmethod
+    def from_file(cls, path):
+        """Буфер поверх файла: файл отображается в память, а не читается целиком."""
+        with open(path, "rb") as f:
+            return cls(_map_file(f))
+
+    @classmethod
+    def from_writer(cls, write):
+        """
+        Буфер из отчёта, который write(out) пишет в текстовый поток out:
+        текст сразу уходит во временный файл, отображаемый затем в память,
+        и целиком строкой не собирается.
+        """
+        with tempfile.TemporaryFile() as f:
+            out = io.TextIOWrapper(f, encoding="utf-8", newline="")
+            write(out)
+            out.flush()
+            out.detach()
+            return cls(_map_file(f))
+
+    def write_to(self, out):
+        """Пишет текст в двоичный файл out частями по SEARCH_WINDOW байт."""
+        for start in range(0, len(self._data), SEARCH_WINDOW):
+            out.write(self._data[start:start + SEARCH_WINDOW])
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __len__(self):
+        return len(self._starts)
+
+    def line(self, i):
+        return self._data[self._bounds[i]:self._bounds[i + 1]].decode("utf-8", "replace").rstrip("\r\n")
+
+    def lines(self, start, stop):
+        """Строки [start, stop) — одно декодирование на весь диапазон."""
+        start, stop = max(0, start), min(len(self), stop)
+        if start >= stop:
+            return []
+        text = self._data[self._bounds[start]:self._bounds[stop]].decode("utf-8", "replace")
+        return [line.rstrip("\r") for line in text.rstrip("\n").split("\n")]
+
+    def line_at(self, offset):
+        """Номер строки, содержащей байт с данным смещением."""
+        return int(np.searchsorted(self._starts, offset, side="right")) - 1
+
+    def sections(self):
+        """Заголовки разделов: список (номер строки, заголовок)."""
+        if self._sections is None:
+            found = set()
+            for title in SECTION_TITLES:
+                prefix = title.encode("utf-8")
+                if self._data[:len(prefix)] == prefix:
+                    found.add(0)
+                pos = self._data.find(b"\n" + prefix)
+                while pos != -1:
+                    found.add(self.line_at(pos + 1))
+                    pos = self._data.find(b"\n" + prefix, pos + 1)
+            self._sections = [(i, self.line(i)) for i in sorted(found)]
+        return self._sections
+
+    def _find_in_lines(self, needle, start, stop, backward):
+        """
+        Ищет needle (уже в нижнем регистре) в строках [start, stop) окнами
+        по SEARCH_WINDOW байт, выровненными по границам строк; регистр
+        приводится только внутри текущего окна.
+        """
+        while start < stop:
+            if backward:
+                first = int(np.searchsorted(self._bounds, self._bounds[stop] - SEARCH_WINDOW))
+                first, last = max(start, min(first, stop - 1)), stop
+            else:
+                last = int(np.searchsorted(self._bounds, self._bounds[start] + SEARCH_WINDOW, side="right")) - 1
+                first, last = start, min(stop, max(last, start + 1))
+            text = self._data[self._bounds[first]:self._bounds[last]].decode("utf-8", "replace").lower()
+            pos = text.rfind(needle) if backward else text.find(needle)
+            if pos != -1:
+                return first + text.count("\n", 0, pos)
+            if backward:
+                stop = first
+            else:
+                start = last
+        return None
+
+    def find(self, query, line=0, backward=False):
+        """
+        Номер первой строки с query без учёта регистра, начиная со строки
+        line (назад — до строки line), с переходом через конец отчёта.
+        None, если нет.
+        """
+        if not query or not len(self):
+            return None
+        needle = query.lower()
+        line = min(max(line, 0), len(self) - 1)
+        if backward:
+            found = self._find_in_lines(needle, 0, line, True)
+            return found if found is not None else self._find_in_lines(needle, line, len(self), True)
+        found = self._find_in_lines(needle, line, len(self), False)
+        return found if found is not None else self._find_in_lines(needle, 0, line, False)
+
+
+class ReportView(ttk.Frame):
+    """
+    Виджет просмотра отчёта: панель с переходом к разделу и поиском,
+    Text с видимым окном строк и собственная полоса прокрутки по всему
+    буферу.
+    """
+
+    def __init__(self, parent, height=6):
+        super().__init__(parent)
+        self.buffer = None
+        self._top = 0
+        self._rows = height
+        self._match = None
+
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill='x')
+        ttk.Label(toolbar, text="Раздел:").pack(side='left')
+        self.section_box = ttk.Combobox(toolbar, state='readonly', width=40)
+        self.section_box.pack(side='left', padx=5)
+        self.section_box.bind("<<ComboboxSelected>>", self._on_section)
+        ttk.Label(toolbar, text="Поиск:").pack(side='left', padx=(10, 0))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *_: self._search(self._match if self._match is not None else self._top))
+        search_entry = ttk.Entry(toolbar, textvariable=self.search_var, width=25)
+        search_entry.pack(side='left', padx=5)
+        search_entry.bind("<Return>", lambda e: self.find_next())
+        search_entry.bind("<Shift-Return>", lambda e: self.find_previous())
+        ttk.Button(toolbar, text="▲", width=3, command=self.find_previous).pack(side='left')
+        ttk.Button(toolbar, text="▼", width=3, command=self.find_next).pack(side='left')
+        self.status = ttk.Label(toolbar, foreground="gray")
+        self.status.pack(side='right')
+
+        body = ttk.Frame(self)
+        body.pack(fill='both', expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient='vertical', command=self._on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        xscroll = ttk.Scrollbar(body, orient='horizontal')
+        xscroll.pack(side='bottom', fill='x')
+        self.text = tk.Text(body, height=height, wrap='none', state='disabled', xscrollcommand=xscroll.set)
+        self.text.pack(side='left', fill='both', expand=True)
+        xscroll.config(command=self.text.xview)
+        self.text.tag_configure("match", background="yellow")
+        self.text.tag_configure("current", background="orange")
+
+        self.text.bind("<Configure>", self._on_resize)
+        self.text.bind("<MouseWheel>", lambda e: self.scroll(-WHEEL_LINES if e.delta > 0 else WHEEL_LINES))
+        self.text.bind("<Button-4>", lambda e: self.scroll(-WHEEL_LINES))
+        self.text.bind("<Button-5>", lambda e: self.scroll(WHEEL_LINES))
+        self.text.bind("<Button-1>", lambda e: self.text.focus_set())
+        for key, step in (("<Up>", -1), ("<Down>", 1)):
+            self.text.bind(key, lambda e, step=step: self.scroll(step))
+        for key, pages in (("<Prior>", -1), ("<Next>", 1)):
+            self.text.bind(key, lambda e, pages=pages: self.scroll(pages * self._rows))
+        self.text.bind("<Control-Home>", lambda e: self.scroll_to(0))
+        self.text.bind("<Control-End>", lambda e: self.scroll_to(len(self.buffer or ())))
+        self._render()
+
+    # --- Содержимое ---
+    def set_buffer(self, buffer):
+        """Показывает новый буфер с начала; предыдущий закрывается."""
+        if self.buffer is not None:
+            self.buffer.close()
+        self.buffer = buffer
+        self._top = 0
+        self._match = None
+        self.section_box.config(values=[title for _, title in buffer.sections()])
+        self.section_box.set("")
+        self._render()
+
+    def is_empty(self):
+        return self.buffer is None or not len(self.buffer)
+
+    # --- Прокрутка ---
+    def scroll(self, lines):
+        self.scroll_to(self._top + lines)
+        return "break"
+
+    def scroll_to(self, top):
+        total = len(self.buffer or ())
+        self._top = max(0, min(top, total - self._rows))
+        self._render()
+        return "break"
+
+    def see_line(self, line):
+        if not self._top <= line < self._top + self._rows:
+            self.scroll_to(line - self._rows // 3)
+        else:
+            self._render()
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.buffer or ())))
+        else:
+            self.scroll(int(amount) * (self._rows if unit == "pages" else 1))
+
+    def _on_resize(self, event):
+        linespace = tkfont.Font(font=self.text.cget("font")).metrics("linespace")
+        rows = max(1, event.height // linespace)
+        if rows != self._rows:
+            self._rows = rows
+            self.scroll_to(self._top)
+
+    def _on_section(self, event):
+        index = self.section_box.current()
+        if self.buffer is not None and index >= 0:
+            self.scroll_to(self.buffer.sections()[index][0])
+
+    # --- Поиск ---
+    def find_next(self):
+        if self._match is not None:
+            self._search(self._match + 1)
+
+    def find_previous(self):
+        if self._match is not None:
+            self._search(self._match, backward=True)
+
+    def _search(self, line, backward=False):
+        query = self.search_var.get()
+        self._match = self.buffer.find(query, line, backward) if self.buffer is not None else None
+        if self._match is not None:
+            self.see_line(self._match)
+        else:
+            self._render()
+
+    # --- Отрисовка ---
+    def _render(self):
+        total = len(self.buffer or ())
+        lines = self.buffer.lines(self._top, self._top + self._rows + 1) if total else []
+        self.text.config(state='normal')
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        query = self.search_var.get()
+        if self._match is not None and self._top <= self._match < self._top + len(lines):
+            row = self._match - self._top + 1
+            self.text.tag_add("current", f"{row}.0", f"{row}.end")
+        if query:
+            count = tk.IntVar()
+            index = self.text.search(query, "1.0", stopindex=tk.END, nocase=True, count=count)
+            while index and count.get():
+                end = f"{index}+{count.get()}c"
+                self.text.tag_add("match", index, end)
+                index = self.text.search(query, end, stopindex=tk.END, nocase=True, count=count)
+        self.text.tag_raise("match")
+        self.text.config(state='disabled')
+
+        if total:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + self._rows) / total))
+            status = f"Строки {self._top + 1}–{min(total, self._top + self._rows)} из {total}"
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            status = ""
+        if query and self._match is None and total:
+            status = f"«{query}» не найдено · {status}"
+        self.status.config(text=status)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Использование: python report_viewer.py ОТЧЁТ.txt", file=sys.stderr)
+        return 2
+    root = tk.Tk()
+    root.title(f"Отчёт — {argv[0]}")
+    root.geometry("1000x700")
+    view = ReportView(root, height=30)
+    view.pack(fill='both', expand=True, padx=10, pady=10)
+    view.set_buffer(ReportBuffer.from_file(argv[0]))
+    root.mainloop()
+    view.buffer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
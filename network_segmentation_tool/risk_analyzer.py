@@ -1,55 +1,399 @@
 # risk_analyzer.py
+import json
+from collections import defaultdict
 
-def analyze_risks(segments, global_rules, user_rules, segment_equipment):
+import numpy as np
+
+from example_data import STANDARD_SERVICES
+from reachability import ReachabilityIndex
+from services import ServiceCatalog
+
+NO_RISKS = "Модель не содержит явных рисков."
+
+# Типы записей, которые диспетчер передаёт проверкам
+SEGMENT = "segment"
+GLOBAL_RULE = "global_rule"
+USER_RULE = "user_rule"
+
+# Общие настройки политики; настройки проверок по умолчанию — в их классах.
+# Файл политики (JSON) переопределяет отдельные ключи, например:
+# {"guest_marker": "dmz", "checks": {"empty_segments": {"enabled": false},
+#                                    "excessive_services": {"max_services": 5}}}
+DEFAULT_POLICY = {
+    "guest_marker": "guest",  # подстрока имени ненадёжного сегмента
+    # Дополнительные сервисы: имя -> номер TCP-порта или запись вида 'UDP 500' / 'TCP 8000-8100'
+    "services": {},
+    # Веса числовой оценки риска (score_risks) и ценность оборудования
+    "scoring": {
+        "weights": {"dangerous": 3.0, "fan_in": 1.0, "untrusted": 5.0, "transitive": 2.0, "services": 0.5},
+        "equipment_values": {"Server": 5, "Storage": 5, "NAS": 4, "Firewall": 3, "Router": 3,
+                             "Load Balancer": 3, "Switch": 2, "Workstation": 1, "Printer": 1},
+    },
+    # Перебор путей атаки из ненадёжных сегментов для отчёта; без явного
+    # списка критичных сегментов берутся самые рискованные по score_risks
+    "attack_paths": {"critical_segments": [], "max_depth": 4, "max_paths": 20, "time_budget": 1.0},
+}
+
+RISK_CHECKS = {}  # имя -> класс проверки, в порядке регистрации
+
+
+def register_check(cls):
+    """Декоратор: добавляет проверку в реестр под именем cls.name."""
+    RISK_CHECKS[cls.name] = cls
+    return cls
+
+
+class RiskContext:
+    """Общие для всех проверок данные: оборудование, известные сервисы и найденный Guest-сегмент."""
+
+    def __init__(self, segment_equipment, guest_marker, services=None):
+        self.segment_equipment = segment_equipment
+        self.guest_marker = guest_marker.lower()
+        self.services = {**STANDARD_SERVICES, **(services or {})}
+        self.guest_segment = None
+
+
+class RiskCheck:
     """
-    Анализирует модель на наличие потенциальных рисков и сложностей.
-    Возвращает список предупреждений.
+    Базовая проверка. consumes — типы записей, которые она обрабатывает;
+    для каждого типа вызывается одноимённый метод. Предупреждения
+    накапливаются в self.warnings, finish() вызывается после прохода.
+    defaults — настройки, которые может переопределить политика.
+    """
+    name = None
+    consumes = ()
+    defaults = {}
+
+    def __init__(self, context, options):
+        self.context = context
+        self.options = options
+        self.warnings = []
+
+    def finish(self):
+        pass
+
+
+@register_check
+class DangerousServicesCheck(RiskCheck):
     """
+    Открытые опасные сервисы. В ports значения — номер TCP-порта или
+    запись вида 'TCP 135-139'; правила с портами и диапазонами ('8080',
+    'TCP 1-65535') сверяются со списком через интервальный индекс.
+    """
+    name = "dangerous_services"
+    consumes = (GLOBAL_RULE, USER_RULE)
+    defaults = {"ports": {"SSH": 22, "RDP": 3389, "SMB": 445}}
+
+    def __init__(self, context, options):
+        super().__init__(context, options)
+        self.catalog = ServiceCatalog(options["ports"], context.services)
+
+    def _describe(self, names):
+        return ", ".join(f"{name} ({self.catalog.describe(name)})" for name in names)
+
+    def global_rule(self, rule):
+        name, src, dst, svc = rule
+        port = self.options["ports"].get(svc)
+        if port is not None:
+            self.warnings.append(
+                f"Глобальное правило '{name}': открыт опасный сервис {svc} ({port}) между {src} и {dst}")
+            return
+        matched = self.catalog.matching(svc)
+        if matched:
+            self.warnings.append(f"Глобальное правило '{name}': {svc} открывает опасные сервисы "
+                                 f"{self._describe(matched)} между {src} и {dst}")
+
+    def user_rule(self, rule):
+        seg, fio, pos, target, svc = rule
+        if svc in self.options["ports"]:
+            self.warnings.append(f"Пользователь '{fio}' имеет доступ к опасному сервису {svc} в сегменте {target}")
+            return
+        matched = self.catalog.matching(svc)
+        if matched:
+            self.warnings.append(f"Пользователь '{fio}' имеет доступ к опасным сервисам {', '.join(matched)} "
+                                 f"({svc}) в сегменте {target}")
+
+
+@register_check
+class GuestAccessCheck(RiskCheck):
+    """Прямой доступ из Guest-сегмента."""
+    name = "guest_access"
+    consumes = (GLOBAL_RULE, USER_RULE)
+
+    def __init__(self, context, options):
+        super().__init__(context, options)
+        self.user_warnings = []
+
+    def global_rule(self, rule):
+        guest = self.context.guest_segment
+        if guest is not None and rule[1] == guest:
+            self.warnings.append(f"️Глобальный доступ из ненадёжного сегмента '{guest}' к {rule[2]} по {rule[3]}")
+
+    def user_rule(self, rule):
+        guest = self.context.guest_segment
+        if guest is not None and rule[0] == guest:
+            self.user_warnings.append(f"Пользователь из '{guest}' имеет доступ к {rule[3]} по {rule[4]}")
+
+    def finish(self):
+        self.warnings.extend(self.user_warnings)
+
+
+@register_check
+class EmptySegmentsCheck(RiskCheck):
+    """Сегменты без оборудования."""
+    name = "empty_segments"
+    consumes = (SEGMENT,)
+
+    def segment(self, seg):
+        eq_dict = self.context.segment_equipment.get(seg, {})
+        if sum(eq_dict.values()) == 0:
+            self.warnings.append(f" Сегмент '{seg}' не содержит оборудования (возможно, ошибка)")
+
+
+@register_check
+class ExcessiveServicesCheck(RiskCheck):
+    """Слишком много разных сервисов между парой сегментов."""
+    name = "excessive_services"
+    consumes = (GLOBAL_RULE,)
+    defaults = {"max_services": 3}
+
+    def __init__(self, context, options):
+        super().__init__(context, options)
+        self.inter_seg_services = defaultdict(set)
+
+    def global_rule(self, rule):
+        _, src, dst, svc = rule
+        if src != dst:
+            self.inter_seg_services[(src, dst)].add(svc)
+
+    def finish(self):
+        limit = self.options["max_services"]
+        for (src, dst), services in self.inter_seg_services.items():
+            if len(services) > limit:
+                self.warnings.append(f" Между {src} и {dst} разрешено {len(services)} сервисов — возможно, избыточно")
+
+
+@register_check
+class TransitiveExposureCheck(RiskCheck):
+    """Сегменты, достижимые из Guest только через промежуточные сегменты."""
+    name = "transitive_exposure"
+    consumes = (SEGMENT, GLOBAL_RULE, USER_RULE)
+    defaults = {"services": ["SSH", "RDP", "SMB"]}
+
+    def __init__(self, context, options):
+        super().__init__(context, options)
+        self.reachability = ReachabilityIndex([], [], services=context.services)
+
+    def segment(self, seg):
+        self.reachability.add_segment(seg)
+
+    def global_rule(self, rule):
+        self.reachability.add_rule(rule[1], rule[2], rule[3])
+
+    def user_rule(self, rule):
+        self.reachability.add_rule(rule[0], rule[3], rule[4])
+
+    def finish(self):
+        if self.context.guest_segment is not None:
+            self.warnings = transitive_exposure_warnings(self.reachability, self.context.guest_segment,
+                                                         self.options["services"])
+
+
+def transitive_exposure_warnings(reachability, guest, services, order=None):
+    """Предупреждения о сегментах, достижимых из guest через промежуточные сегменты."""
     warnings = []
+    reported = set()
+    for svc in services:
+        for dst, via in reachability.transitive_exposures(guest, svc, order):
+            reported.add(dst)
+            warnings.append(f"Сегмент '{guest}' достигает {dst} по {svc} через {via}")
+    for dst, via in reachability.transitive_exposures(guest, order=order):
+        if dst not in reported:
+            warnings.append(f"Сегмент '{guest}' транзитивно достигает {dst} через {via}")
+    return warnings
 
-    # 1. Открытые сервисы (особенно опасные)
-    dangerous_ports = {"SSH": 22, "RDP": 3389, "SMB": 445}
-    for name, src, dst, svc in global_rules:
-        if svc in dangerous_ports:
-            warnings.append(
-                f"Глобальное правило '{name}': открыт опасный сервис {svc} ({dangerous_ports[svc]}) между {src} и {dst}")
 
-    for seg, fio, pos, target, svc in user_rules:
-        if svc in dangerous_ports:
-            warnings.append(f"Пользователь '{fio}' имеет доступ к опасному сервису {svc} в сегменте {target}")
+def load_policy(path):
+    """Читает политику из JSON-файла и дополняет её значениями по умолчанию."""
+    with open(path, "r", encoding="utf-8") as f:
+        return merge_policy(json.load(f))
+
+
+def merge_policy(policy):
+    """
+    Накладывает policy на DEFAULT_POLICY и настройки зарегистрированных
+    проверок. Все проверки включены, если политика не отключает их явно.
+    """
+    merged = dict(DEFAULT_POLICY)
+    merged["checks"] = {name: {"enabled": True, **cls.defaults} for name, cls in RISK_CHECKS.items()}
+    for key, value in (policy or {}).items():
+        if key == "scoring":
+            merged[key] = {part: {**options, **value.get(part, {})} for part, options in merged[key].items()}
+            continue
+        if key != "checks":
+            merged[key] = {**merged[key], **value} if isinstance(merged.get(key), dict) else value
+            continue
+        for name, options in value.items():
+            if name not in RISK_CHECKS:
+                raise ValueError(f"Неизвестная проверка рисков в политике: '{name}'")
+            merged["checks"][name].update(options)
+    return merged
+
+
+def analyze_risks_by_check(segments, global_rules, user_rules, segment_equipment, policy=None):
+    """
+    То же, что analyze_risks, но предупреждения сгруппированы по проверкам:
+    словарь имя проверки -> список (в порядке регистрации, только включённые).
+    """
+    policy = merge_policy(policy)
+    context = RiskContext(segment_equipment, policy["guest_marker"], policy["services"])
+    checks = []
+    for name, options in policy["checks"].items():
+        if options["enabled"]:
+            checks.append(RISK_CHECKS[name](context, options))
+
+    handlers = {kind: [getattr(c, kind) for c in checks if kind in c.consumes]
+                for kind in (SEGMENT, GLOBAL_RULE, USER_RULE)}
 
-    # 2. Доступ из Guest-сегмента
-    guest_segment = None
-    for seg in segments:
-        if "guest" in seg.lower():
-            guest_segment = seg
-            break
-
-    if guest_segment:
-        for name, src, dst, svc in global_rules:
-            if src == guest_segment:
-                warnings.append(f"️Глобальный доступ из ненадёжного сегмента '{guest_segment}' к {dst} по {svc}")
-        for seg, fio, pos, target, svc in user_rules:
-            if seg == guest_segment:
-                warnings.append(f"Пользователь из '{guest_segment}' имеет доступ к {target} по {svc}")
-
-    # 3. Отсутствие оборудования в сегменте
     for seg in segments:
-        eq_dict = segment_equipment.get(seg, {})
-        total_eq = sum(eq_dict.values())
-        if total_eq == 0:
-            warnings.append(f" Сегмент '{seg}' не содержит оборудования (возможно, ошибка)")
-
-    # 4. Избыточные правила (например, полный доступ между сегментами)
-    # Простой пример: если между двумя сегментами >3 разных сервисов
-    from collections import defaultdict
-    inter_seg_services = defaultdict(set)
-    for _, src, dst, svc in global_rules:
-        if src != dst:
-            inter_seg_services[(src, dst)].add(svc)
+        if context.guest_segment is None and context.guest_marker in seg.lower():
+            context.guest_segment = seg
+        for handler in handlers[SEGMENT]:
+            handler(seg)
+    for kind, rules in ((GLOBAL_RULE, global_rules), (USER_RULE, user_rules)):
+        rule_handlers = handlers[kind]
+        if rule_handlers:
+            for rule in rules:
+                for handler in rule_handlers:
+                    handler(rule)
+
+    by_check = {}
+    for check in checks:
+        check.finish()
+        by_check[check.name] = check.warnings
+    return by_check
+
+
+def analyze_risks(segments, global_rules, user_rules, segment_equipment, policy=None):
+    """
+    Анализирует модель на наличие потенциальных рисков и сложностей.
+    Все включённые проверки получают сегменты и правила за один проход.
+    Возвращает список предупреждений.
+    """
+    by_check = analyze_risks_by_check(segments, global_rules, user_rules, segment_equipment, policy)
+    warnings = [warning for check_warnings in by_check.values() for warning in check_warnings]
+    return warnings if warnings else [NO_RISKS]
+
+
+def _top_indices(scores, n):
+    """Индексы n наибольших значений по убыванию (при равенстве — по порядку)."""
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, n - 1)[:n]
+    return idx[np.lexsort((idx, -scores[idx]))]
+
+
+class RiskScores:
+    """
+    Числовые оценки риска: по сегментам (segment_scores) и по парам
+    сегментов (pair_src, pair_dst, pair_scores). components — слагаемые
+    оценки сегмента, отдельными массивами для объяснения результата.
+    """
+
+    def __init__(self, segments, components, segment_scores, pair_src, pair_dst, pair_scores):
+        self.segments = segments
+        self.components = components
+        self.segment_scores = segment_scores
+        self.pair_src = pair_src
+        self.pair_dst = pair_dst
+        self.pair_scores = pair_scores
+
+    def segment_score(self, seg):
+        return float(self.segment_scores[self.segments.index(seg)])
+
+    def top_segments(self, n=10):
+        """Список (сегмент, оценка) из n самых рискованных сегментов."""
+        return [(self.segments[i], float(self.segment_scores[i])) for i in _top_indices(self.segment_scores, n)]
+
+    def top_pairs(self, n=10):
+        """Список (источник, назначение, оценка) из n самых рискованных пар."""
+        return [(self.segments[self.pair_src[i]], self.segments[self.pair_dst[i]], float(self.pair_scores[i]))
+                for i in _top_indices(self.pair_scores, n)]
+
+
+def score_risks(segments, global_rules, user_rules, segment_equipment, policy=None):
+    """
+    Оценивает риск каждого сегмента и каждой пары сегментов, связанных
+    правилами. Правила переводятся в массивы идентификаторов за один
+    проход, дальше всё считается векторно:
+      сегмент = (опасные входящие + число источников + доступ из
+                 ненадёжных сегментов, прямой и транзитивный) × ценность;
+      пара    = (опасные правила + число сервисов + ненадёжный источник)
+                × ценность назначения.
+    Ценность = 1 + log(1 + сумма ценности оборудования сегмента).
+    """
+    policy = merge_policy(policy)
+    weights = policy["scoring"]["weights"]
+    equipment_values = policy["scoring"]["equipment_values"]
+    dangerous_ports = policy["checks"]["dangerous_services"]["ports"]
+    dangerous_services = ServiceCatalog(dangerous_ports, {**STANDARD_SERVICES, **policy["services"]})
+
+    reachability = ReachabilityIndex(segments, [])
+    services = {}
+    src, dst, svc, dangerous = [], [], [], []
+    rules = ((s, d, v) for _, s, d, v in global_rules)
+    user_access = ((seg, target, v) for seg, _, _, target, v in user_rules)
+    for stream in (rules, user_access):
+        for s, d, v in stream:
+            if s == d:
+                continue
+            reachability.add_rule(s, d, v)
+            src.append(reachability.ids[s])
+            dst.append(reachability.ids[d])
+            svc.append(services.setdefault(v, len(services)))
+            dangerous.append(v in dangerous_ports or bool(dangerous_services.matching(v)))
+
+    names = reachability.segments
+    n = len(names)
+    src = np.array(src, dtype=np.int64)
+    dst = np.array(dst, dtype=np.int64)
+    svc = np.array(svc, dtype=np.int64)
+    dangerous = np.array(dangerous, dtype=np.float64)
+
+    # Пары сегментов и их характеристики
+    pairs, pair_of_rule = np.unique(src * n + dst, return_inverse=True)
+    pair_src, pair_dst = pairs // n, pairs % n
+    pair_dangerous = np.bincount(pair_of_rule, weights=dangerous, minlength=len(pairs))
+    pair_services = np.bincount(np.unique(pair_of_rule * max(len(services), 1) + svc) // max(len(services), 1),
+                                minlength=len(pairs))
+
+    marker = policy["guest_marker"].lower()
+    untrusted = np.array([marker in name.lower() for name in names], dtype=bool)
+    value = np.array([sum(equipment_values.get(eq, 1) * count
+                          for eq, count in segment_equipment.get(name, {}).items()) for name in names],
+                     dtype=np.float64)
+    value = 1.0 + np.log1p(np.maximum(value, 0.0))
 
-    for (src, dst), services in inter_seg_services.items():
-        if len(services) > 3:
-            warnings.append(f" Между {src} и {dst} разрешено {len(services)} сервисов — возможно, избыточно")
+    # Слагаемые оценки сегментов
+    dangerous_in = np.bincount(dst, weights=dangerous, minlength=n)
+    fan_in = np.bincount(pair_dst, minlength=n).astype(np.float64)
+    direct_untrusted = np.bincount(pair_dst, weights=untrusted[pair_src].astype(np.float64), minlength=n)
+    transitive = np.zeros(n, dtype=bool)
+    if untrusted.any() and len(pairs):
+        reached = np.bitwise_or.reduce(reachability.closure()[untrusted], axis=0)
+        transitive = np.unpackbits(reached.view(np.uint8), bitorder="little")[:n].astype(bool)
+        transitive &= (direct_untrusted == 0) & ~untrusted
 
-    return warnings if warnings else ["Модель не содержит явных рисков."]
\ No newline at end of file
+    components = {
+        "dangerous": dangerous_in,
+        "fan_in": fan_in,
+        "untrusted": direct_untrusted,
+        "transitive": transitive.astype(np.float64),
+        "value": value,
+    }
+    threat = sum(weights[key] * components[key] for key in ("dangerous", "fan_in", "untrusted", "transitive"))
+    segment_scores = threat * value
+    pair_scores = (weights["dangerous"] * pair_dangerous + weights["services"] * pair_services
+                   + weights["untrusted"] * untrusted[pair_src]) * value[pair_dst]
+    return RiskScores(names, components, segment_scores, pair_src, pair_dst, pair_scores)
@@ -0,0 +1,151 @@
+# rule_analyzer.py
+from collections import namedtuple
+
+from example_data import STANDARD_SERVICES
+from services import PortIndex, is_single_port, resolve_service
+
+# Виды конфликтов правил
+SHADOWED = "shadowed"            # правило перекрыто более ранним правилом на те же порты
+REDUNDANT = "redundant"          # правило пользователя уже покрыто глобальным правилом
+CONTRADICTORY = "contradictory"  # одно имя/пользователь описан по-разному
+
+# source — 'global' или 'user'; index — номер правила в своём списке;
+# other — номер правила, с которым найден конфликт (для REDUNDANT — глобального)
+RuleConflict = namedtuple("RuleConflict", ["kind", "source", "index", "other"])
+
+# Порядок конфликтов одного правила в отчёте
+_KIND_ORDER = {REDUNDANT: 0, SHADOWED: 1, CONTRADICTORY: 2}
+
+
+def service_key(svc, services=STANDARD_SERVICES):
+    """
+    Ключ сервиса для сравнения правил: номер порта для известных сервисов
+    и записей вида '8080' или 'TCP 8080', ServiceSpec для диапазонов и
+    других протоколов, иначе само имя (например, 'Custom').
+    """
+    port = services.get(svc)
+    if isinstance(port, int):
+        return port
+    spec = resolve_service(svc, services)
+    if spec is None:
+        return svc
+    if spec.protocol == "TCP" and is_single_port(spec):
+        return spec.ranges[0][0]
+    return spec
+
+
+def is_port_range(svc, services=STANDARD_SERVICES):
+    """Открывает ли запись больше одного порта (например, 'TCP 1-1024')."""
+    spec = resolve_service(svc, services)
+    return spec is not None and not is_single_port(spec)
+
+
+def _range_shadowing(rules, groups, svc_pos, services, skip):
+    """
+    Перекрытия с участием диапазонов портов: для каждого правила группы
+    ищется самое раннее правило той же группы с пересекающимися портами
+    и другой записью сервиса. groups — группа -> номера правил, только
+    для групп, где есть диапазоны. Возвращает {номер: номер перекрывающего}.
+    """
+    found = {}
+    for members in groups.values():
+        specs = {i: resolve_service(rules[i][svc_pos], services) for i in members}
+        index = PortIndex((spec, i) for i, spec in specs.items() if spec is not None)
+        for i, spec in specs.items():
+            if spec is None or i in skip:
+                continue
+            svc = rules[i][svc_pos]
+            earlier = [j for j in index.overlapping(spec) if j < i and rules[j][svc_pos] != svc]
+            if earlier:
+                found[i] = min(earlier)
+    return found
+
+
+class RuleIndex:
+    """
+    Индекс глобальных правил по (источник, назначение, порт) и по имени.
+    Строится за один проход; конфликты между глобальными правилами
+    собираются при построении в self.conflicts. Для пар сегментов, где
+    есть правила с диапазонами портов, строится интервальный индекс:
+    перекрытие и покрытие там определяются пересечением диапазонов.
+    """
+
+    def __init__(self, global_rules, services=STANDARD_SERVICES):
+        self.rules = global_rules
+        self.services = services
+        self.by_pair = {}   # (src, dst, ключ сервиса) -> номер первого правила
+        self.by_name = {}   # имя -> номер первого правила
+        self.ranges = {}    # (src, dst) -> PortIndex правил пары, если в ней есть диапазоны
+        self.conflicts = []
+        pairs = {}
+        ranged_pairs = set()
+        shadowed = set()
+        for i, (name, src, dst, svc) in enumerate(global_rules):
+            key = service_key(svc, services)
+            first = self.by_pair.setdefault((src, dst, key), i)
+            # Точные дубликаты отмечает validate_rules, здесь — разные имена одного порта
+            if first != i and global_rules[first][3] != svc:
+                self.conflicts.append(RuleConflict(SHADOWED, "global", i, first))
+                shadowed.add(i)
+            first = self.by_name.setdefault(name, i)
+            if first != i and tuple(global_rules[first][1:]) != (src, dst, svc):
+                self.conflicts.append(RuleConflict(CONTRADICTORY, "global", i, first))
+            pairs.setdefault((src, dst), []).append(i)
+            if is_port_range(svc, services):
+                ranged_pairs.add((src, dst))
+
+        if ranged_pairs:
+            groups = {pair: pairs[pair] for pair in ranged_pairs}
+            for i, other in _range_shadowing(global_rules, groups, 3, services, shadowed).items():
+                self.conflicts.append(RuleConflict(SHADOWED, "global", i, other))
+            self.conflicts.sort(key=lambda c: (c.index, _KIND_ORDER[c.kind]))
+            for pair, members in groups.items():
+                specs = ((resolve_service(global_rules[i][3], services), i) for i in members)
+                self.ranges[pair] = PortIndex((spec, i) for spec, i in specs if spec is not None)
+
+    def covering_rule(self, src, dst, svc):
+        """Номер глобального правила, открывающего src → dst на порт (порты) svc, или None."""
+        first = self.by_pair.get((src, dst, service_key(svc, self.services)))
+        if first is None and (src, dst) in self.ranges:
+            spec = resolve_service(svc, self.services)
+            covering = self.ranges[(src, dst)].containing(spec) if spec is not None else None
+            if covering:
+                first = min(covering)
+        return first
+
+
+def find_user_conflicts(user_rules, rule_index):
+    """
+    Находит конфликты в правилах пользователей: избыточные (уже покрыты
+    глобальным правилом из сегмента пользователя), перекрытые и
+    противоречивые (разные должности одного пользователя в сегменте).
+    """
+    conflicts = []
+    services = rule_index.services
+    by_access = {}  # (сегмент, ФИО, цель, ключ сервиса) -> номер правила
+    by_person = {}  # (сегмент, ФИО) -> номер правила
+    targets = {}    # (сегмент, ФИО, цель) -> номера правил
+    ranged_targets = set()
+    shadowed = set()
+    for i, (seg, fio, pos, target, svc) in enumerate(user_rules):
+        covering = rule_index.covering_rule(seg, target, svc)
+        if covering is not None:
+            conflicts.append(RuleConflict(REDUNDANT, "user", i, covering))
+        key = (seg, fio, target, service_key(svc, services))
+        first = by_access.setdefault(key, i)
+        if first != i and user_rules[first][4] != svc:
+            conflicts.append(RuleConflict(SHADOWED, "user", i, first))
+            shadowed.add(i)
+        first = by_person.setdefault((seg, fio), i)
+        if first != i and user_rules[first][2] != pos:
+            conflicts.append(RuleConflict(CONTRADICTORY, "user", i, first))
+        targets.setdefault((seg, fio, target), []).append(i)
+        if is_port_range(svc, services):
+            ranged_targets.add((seg, fio, target))
+
+    if ranged_targets:
+        groups = {key: targets[key] for key in ranged_targets}
+        for i, other in _range_shadowing(user_rules, groups, 4, services, shadowed).items():
+            conflicts.append(RuleConflict(SHADOWED, "user", i, other))
+        conflicts.sort(key=lambda c: (c.index, _KIND_ORDER[c.kind]))
+    return conflicts
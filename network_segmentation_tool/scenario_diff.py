@@ -0,0 +1,262 @@
+# scenario_diff.py
+import json
+import os
+from collections import Counter
+
+from example_data import STANDARD_SERVICES
+from reachability import ReachabilityIndex
+from risk_analyzer import NO_RISKS, analyze_risks, merge_policy, transitive_exposure_warnings
+from scenario_manager import ScenarioManager
+
+
+class ScenarioDiff:
+    """
+    Различия двух сценариев. Правила сравниваются как мультимножества
+    кортежей (хеш-соединение через Counter), поэтому дубликаты
+    учитываются. changed — пары (старое, новое) для записей с тем же
+    ключом: имя глобального правила; (сегмент, ФИО, цель, сервис) для
+    правила пользователя.
+    """
+
+    def __init__(self):
+        self.segments_added = []
+        self.segments_removed = []
+        self.subnets_added = []      # (сегмент, CIDR)
+        self.subnets_removed = []    # (сегмент, CIDR)
+        self.subnets_changed = []    # (сегмент, старый CIDR, новый CIDR)
+        self.global_rules_added = []
+        self.global_rules_removed = []
+        self.global_rules_changed = []
+        self.user_rules_added = []
+        self.user_rules_removed = []
+        self.user_rules_changed = []
+        self.users_added = []
+        self.users_removed = []
+        self.equipment_changed = []  # (сегмент, оборудование, было, стало)
+        self.affected_segments = set()
+
+    def is_empty(self):
+        return not any(value for name, value in vars(self).items() if name != "affected_segments")
+
+
+def _rules_delta(old_rules, new_rules):
+    old_counts = Counter(map(tuple, old_rules))
+    new_counts = Counter(map(tuple, new_rules))
+    removed = list((old_counts - new_counts).elements())
+    added = list((new_counts - old_counts).elements())
+    return added, removed
+
+
+def _pair_changed(added, removed, key):
+    """Выделяет из added/removed записи с одинаковым однозначным ключом."""
+    added_by_key = Counter(key(rule) for rule in added)
+    removed_by_key = Counter(key(rule) for rule in removed)
+    unique = {k for k, n in added_by_key.items() if n == 1 and removed_by_key.get(k) == 1}
+    if not unique:
+        return added, removed, []
+    old_by_key = {key(rule): rule for rule in removed if key(rule) in unique}
+    changed = [(old_by_key[key(rule)], rule) for rule in added if key(rule) in unique]
+    added = [rule for rule in added if key(rule) not in unique]
+    removed = [rule for rule in removed if key(rule) not in unique]
+    return added, removed, changed
+
+
+def diff_scenarios(old, new):
+    """Сравнивает два сценария в формате ScenarioManager."""
+    diff = ScenarioDiff()
+    affected = diff.affected_segments
+
+    old_segments, new_segments = old.get("segments", []), new.get("segments", [])
+    old_set, new_set = set(old_segments), set(new_segments)
+    diff.segments_added = [s for s in new_segments if s not in old_set]
+    diff.segments_removed = [s for s in old_segments if s not in new_set]
+    affected.update(diff.segments_added, diff.segments_removed)
+
+    old_subnets, new_subnets = old.get("subnets", {}), new.get("subnets", {})
+    for seg, cidr in new_subnets.items():
+        if seg not in old_subnets:
+            diff.subnets_added.append((seg, cidr))
+        elif old_subnets[seg] != cidr:
+            diff.subnets_changed.append((seg, old_subnets[seg], cidr))
+    diff.subnets_removed = [(seg, cidr) for seg, cidr in old_subnets.items() if seg not in new_subnets]
+
+    added, removed = _rules_delta(old.get("global_rules", []), new.get("global_rules", []))
+    diff.global_rules_added, diff.global_rules_removed, diff.global_rules_changed = \
+        _pair_changed(added, removed, lambda rule: rule[0])
+    for rule in added + removed:
+        affected.update(rule[1:3])
+
+    added, removed = _rules_delta(old.get("user_rules", []), new.get("user_rules", []))
+    diff.user_rules_added, diff.user_rules_removed, diff.user_rules_changed = \
+        _pair_changed(added, removed, lambda rule: (rule[0], rule[1], rule[3], rule[4]))
+    for rule in added + removed:
+        affected.update((rule[0], rule[3]))
+
+    old_users = {rule[1] for rule in old.get("user_rules", [])}
+    new_users = {rule[1] for rule in new.get("user_rules", [])}
+    diff.users_added = sorted(new_users - old_users)
+    diff.users_removed = sorted(old_users - new_users)
+
+    old_eq, new_eq = old.get("segment_equipment", {}), new.get("segment_equipment", {})
+    for seg in dict.fromkeys(list(old_eq) + list(new_eq)):
+        before, after = old_eq.get(seg, {}), new_eq.get(seg, {})
+        for eq in dict.fromkeys(list(before) + list(after)):
+            if before.get(eq, 0) != after.get(eq, 0):
+                diff.equipment_changed.append((seg, eq, before.get(eq, 0), after.get(eq, 0)))
+                affected.add(seg)
+    return diff
+
+
+def _affected_risks(scenario, affected, policy):
+    """
+    Риски сценария, которые могут зависеть от изменённых сегментов:
+    проверки запускаются только на сегментах из affected и правилах,
+    касающихся их (для пары сегментов это все её правила). Транзитивная
+    достижимость считается отдельно в _transitive_risks.
+    """
+    marker = policy["guest_marker"].lower()
+    segments = [s for s in scenario.get("segments", []) if s in affected or marker in s.lower()]
+    global_rules = [r for r in scenario.get("global_rules", []) if r[1] in affected or r[2] in affected]
+    user_rules = [r for r in scenario.get("user_rules", []) if r[0] in affected or r[3] in affected]
+    checks = {name: dict(options, enabled=options["enabled"] and name != "transitive_exposure")
+              for name, options in policy["checks"].items()}
+    risks = analyze_risks(segments, global_rules, user_rules, scenario.get("segment_equipment", {}),
+                          merge_policy({**policy, "checks": checks}))
+    return [r for r in risks if r != NO_RISKS]
+
+
+def _guest_segment(segments, policy):
+    marker = policy["guest_marker"].lower()
+    return next((seg for seg in segments if marker in seg.lower()), None)
+
+
+def _transitive_risks(old, new, diff, policy, new_order):
+    """
+    Транзитивные риски обеих сторон. Замыкание достижимости строится один
+    раз по старому сценарию, затем к нему применяется дельта правил из diff
+    (add_rule/remove_rule). Удалённые сегменты остаются в индексе
+    изолированными вершинами и на достижимость не влияют. Порядок вершин
+    индекса при этом отличается от нового сценария, поэтому промежуточный
+    сегмент («через X») выбирается по порядку, в котором сегменты увидел
+    бы полный анализ нового сценария (new_order — см. _segment_order).
+    """
+    services = policy["checks"]["transitive_exposure"]["services"]
+    index = ReachabilityIndex(old.get("segments", []), old.get("global_rules", []), old.get("user_rules", []),
+                              services={**STANDARD_SERVICES, **policy["services"]})
+    guest = _guest_segment(old.get("segments", []), policy)
+    old_risks = transitive_exposure_warnings(index, guest, services) if guest is not None else []
+
+    for seg in diff.segments_added:
+        index.add_segment(seg)
+    removed_global = diff.global_rules_removed + [old_rule for old_rule, _ in diff.global_rules_changed]
+    removed_user = diff.user_rules_removed + [old_rule for old_rule, _ in diff.user_rules_changed]
+    for _, src, dst, svc in removed_global:
+        index.remove_rule(src, dst, svc)
+    for seg, _, _, target, svc in removed_user:
+        index.remove_rule(seg, target, svc)
+    for _, src, dst, svc in diff.global_rules_added + [new_rule for _, new_rule in diff.global_rules_changed]:
+        index.add_rule(src, dst, svc)
+    for seg, _, _, target, svc in diff.user_rules_added + [new_rule for _, new_rule in diff.user_rules_changed]:
+        index.add_rule(seg, target, svc)
+
+    guest = _guest_segment(new.get("segments", []), policy)
+    new_risks = transitive_exposure_warnings(index, guest, services, new_order) if guest is not None else []
+    return old_risks, new_risks
+
+
+def _segment_order(scenario):
+    """Позиции сегментов в порядке добавления в ReachabilityIndex при полном анализе."""
+    order = dict.fromkeys(scenario.get("segments", []))
+    for _, src, dst, _ in scenario.get("global_rules", []):
+        if src != dst:
+            order.setdefault(src)
+            order.setdefault(dst)
+    for seg, _, _, target, _ in scenario.get("user_rules", []):
+        if seg != target:
+            order.setdefault(seg)
+            order.setdefault(target)
+    return {seg: k for k, seg in enumerate(order)}
+
+
+def delta_risks(old, new, diff=None, policy=None):
+    """
+    Возвращает (новые риски, устранённые риски). Оцениваются только
+    части сценариев, затронутые изменениями; риски неизменённых частей
+    одинаковы с обеих сторон и в разность не попадают. Транзитивная
+    достижимость пересчитывается инкрементально по дельте правил.
+    Смена Guest-сегмента (новый сегмент с маркером перед прежним,
+    перестановка сегментов) затрагивает и старый, и новый Guest;
+    перестановка сегментов может сменить промежуточный сегмент
+    транзитивных рисков.
+    """
+    diff = diff or diff_scenarios(old, new)
+    policy = merge_policy(policy)
+    new_order = _segment_order(new)
+    order_changed = list(_segment_order(old)) != list(new_order)
+    if diff.is_empty() and not order_changed:
+        return [], []
+    old_guest = _guest_segment(old.get("segments", []), policy)
+    new_guest = _guest_segment(new.get("segments", []), policy)
+    guest_changed = old_guest != new_guest
+    affected = diff.affected_segments
+    if guest_changed:
+        affected = affected | {seg for seg in (old_guest, new_guest) if seg is not None}
+    old_risks = Counter(_affected_risks(old, affected, policy))
+    new_risks = Counter(_affected_risks(new, affected, policy))
+    rules_changed = any((diff.global_rules_added, diff.global_rules_removed, diff.global_rules_changed,
+                         diff.user_rules_added, diff.user_rules_removed, diff.user_rules_changed,
+                         diff.segments_added, diff.segments_removed, order_changed))
+    if rules_changed and policy["checks"]["transitive_exposure"]["enabled"]:
+        old_transitive, new_transitive = _transitive_risks(old, new, diff, policy, new_order)
+        old_risks.update(old_transitive)
+        new_risks.update(new_transitive)
+    return list((new_risks - old_risks).elements()), list((old_risks - new_risks).elements())
+
+
+def load_scenario_ref(ref):
+    """Сценарий по пути к JSON-файлу или по имени в ScenarioManager."""
+    if ref.endswith(".json") or os.path.exists(ref):
+        with open(ref, "r", encoding="utf-8") as f:
+            return json.load(f)
+    scenario = ScenarioManager().load_scenario(ref)
+    if scenario is None:
+        raise ValueError(f"Сценарий '{ref}' не найден")
+    return scenario
+
+
+def _rule_text(rule):
+    if len(rule) == 4:
+        name, src, dst, svc = rule
+        return f"[{name}] {src} → {dst} : {svc}"
+    seg, fio, pos, target, svc = rule
+    return f"{fio} ({pos}, сегмент {seg}) → {target} : {svc}"
+
+
+def format_diff_report(diff, new_risks=(), resolved_risks=()):
+    report = "=== Сравнение сценариев ===\n"
+    if diff.is_empty():
+        return report + "\nСценарии не различаются.\n"
+
+    def section(title, lines):
+        nonlocal report
+        if lines:
+            report += f"\n{title}:\n" + "".join(f" {line}\n" for line in lines)
+
+    section("Сегменты", [f"+ {s}" for s in diff.segments_added] + [f"- {s}" for s in diff.segments_removed])
+    section("Подсети", [f"+ {seg}: {cidr}" for seg, cidr in diff.subnets_added]
+            + [f"- {seg}: {cidr}" for seg, cidr in diff.subnets_removed]
+            + [f"~ {seg}: {old} → {new}" for seg, old, new in diff.subnets_changed])
+    section("Глобальные правила", [f"+ {_rule_text(r)}" for r in diff.global_rules_added]
+            + [f"- {_rule_text(r)}" for r in diff.global_rules_removed]
+            + [f"~ {_rule_text(old)}  ⇒  {_rule_text(new)}" for old, new in diff.global_rules_changed])
+    section("Правила для пользователей", [f"+ {_rule_text(r)}" for r in diff.user_rules_added]
+            + [f"- {_rule_text(r)}" for r in diff.user_rules_removed]
+            + [f"~ {_rule_text(old)}  ⇒  {_rule_text(new)}" for old, new in diff.user_rules_changed])
+    section("Пользователи", [f"+ {u}" for u in diff.users_added] + [f"- {u}" for u in diff.users_removed])
+    section("Оборудование", [f"~ {seg}: {eq} {before} → {after} шт."
+                             for seg, eq, before, after in diff.equipment_changed])
+    section("Новые риски", [f"+ {r.strip()}" for r in new_risks])
+    section("Устранённые риски", [f"- {r.strip()}" for r in resolved_risks])
+    if not new_risks and not resolved_risks:
+        report += "\nИзменения не повлияли на риски.\n"
+    return report
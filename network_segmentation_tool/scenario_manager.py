@@ -5,6 +5,22 @@ from datetime import datetime
 
 SCENARIOS_DIR = "scenarios"
 
+
+def load_scenario_file(path):
+    """Загружает сценарий из JSON-файла path: только поля модели, правила — кортежами."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("ожидался JSON-объект сценария")
+    return {
+        "segments": data.get("segments", []),
+        "subnets": data.get("subnets", {}),
+        "global_rules": [tuple(rule) for rule in data.get("global_rules", [])],
+        "user_rules": [tuple(rule) for rule in data.get("user_rules", [])],
+        "segment_equipment": data.get("segment_equipment", {}),
+    }
+
+
 class ScenarioManager:
     def __init__(self):
         os.makedirs(SCENARIOS_DIR, exist_ok=True)
@@ -0,0 +1,232 @@
+# services.py
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+
+from example_data import STANDARD_SERVICES
+
+PROTOCOLS = ("TCP", "UDP")
+MIN_PORT = 0
+MAX_PORT = 65535
+
+# protocol — 'TCP' или 'UDP'; ranges — отсортированные непересекающиеся
+# отрезки портов (первый, последний)
+ServiceSpec = namedtuple("ServiceSpec", ["protocol", "ranges"])
+
+_RANGE = r"\d+(?:\s*-\s*\d+)?"
+_SPEC_RE = re.compile(rf"^(?:(tcp|udp)[\s/]*)?({_RANGE}(?:\s*,\s*{_RANGE})*)$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def parse_port_spec(text):
+    """
+    Разбирает запись вида '8080', 'TCP 1-1024', 'udp 53', 'TCP 80,443,8000-8100'
+    (протокол по умолчанию — TCP). Возвращает ServiceSpec или None, если
+    запись не описывает порты (имя сервиса, 'Custom', порт вне 0–65535).
+    """
+    match = _SPEC_RE.match(text.strip())
+    if not match:
+        return None
+    protocol = (match.group(1) or "TCP").upper()
+    ranges = []
+    for part in match.group(2).split(","):
+        first, _, last = part.partition("-")
+        first = int(first)
+        last = int(last) if last else first
+        if not MIN_PORT <= first <= last <= MAX_PORT:
+            return None
+        ranges.append((first, last))
+    ranges.sort()
+    merged = [ranges[0]]
+    for first, last in ranges[1:]:
+        if first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return ServiceSpec(protocol, tuple(merged))
+
+
+def resolve_service(svc, services=STANDARD_SERVICES):
+    """
+    Порты сервиса: по таблице services (значение — номер TCP-порта или
+    запись для parse_port_spec), иначе разбором самой записи правила.
+    None — порты неизвестны (например, 'Custom').
+    """
+    if svc in services:
+        value = services[svc]
+        if value is None:
+            return None
+        if isinstance(value, int):
+            return ServiceSpec("TCP", ((value, value),))
+        return parse_port_spec(value)
+    return parse_port_spec(svc)
+
+
+def is_single_port(spec):
+    return len(spec.ranges) == 1 and spec.ranges[0][0] == spec.ranges[0][1]
+
+
+def port_count(spec):
+    return sum(last - first + 1 for first, last in spec.ranges)
+
+
+def specs_overlap(a, b):
+    """Есть ли у двух наборов портов общий порт (слиянием отсортированных отрезков)."""
+    if a.protocol != b.protocol:
+        return False
+    i = j = 0
+    while i < len(a.ranges) and j < len(b.ranges):
+        (a_first, a_last), (b_first, b_last) = a.ranges[i], b.ranges[j]
+        if a_first <= b_last and b_first <= a_last:
+            return True
+        if a_last < b_last:
+            i += 1
+        else:
+            j += 1
+    return False
+
+
+def spec_contains(outer, inner):
+    """Покрывает ли outer все порты inner (каждый отрезок inner — одним отрезком outer)."""
+    if outer.protocol != inner.protocol:
+        return False
+    for first, last in inner.ranges:
+        k = bisect_right(outer.ranges, (first, MAX_PORT)) - 1
+        if k < 0 or outer.ranges[k][1] < last:
+            return False
+    return True
+
+
+def format_spec(spec):
+    """'TCP 80,443,8000-8100'"""
+    parts = (str(first) if first == last else f"{first}-{last}" for first, last in spec.ranges)
+    return f"{spec.protocol} {','.join(parts)}"
+
+
+class IntervalIndex:
+    """
+    Статический индекс отрезков [first, last] с привязанными значениями.
+    Отрезки отсортированы по началу; над концами построено дерево
+    максимумов, поэтому запрос перебирает только подходящие отрезки:
+    O(log n + k·log n) вместо просмотра всех n.
+    """
+
+    def __init__(self, intervals):
+        items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in items]
+        self._values = [item[2] for item in items]
+        size = 1
+        while size < len(items):
+            size *= 2
+        self._size = size
+        tree = [-1] * (2 * size)
+        tree[size:size + len(items)] = [item[1] for item in items]
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._max_end = tree
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _reaching(self, count, threshold):
+        """Номера среди первых count отрезков, конец которых не меньше threshold."""
+        found = []
+        if count <= 0:
+            return found
+        tree, size = self._max_end, self._size
+        stack = [(1, 0, size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= count or tree[node] < threshold:
+                continue
+            if node >= size:
+                found.append(node - size)
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return found
+
+    def overlapping(self, first, last):
+        """Значения отрезков, пересекающихся с [first, last]."""
+        count = bisect_right(self._starts, last)
+        return [self._values[k] for k in self._reaching(count, first)]
+
+    def containing(self, first, last):
+        """Значения отрезков, целиком покрывающих [first, last]."""
+        count = bisect_right(self._starts, first)
+        return [self._values[k] for k in self._reaching(count, last)]
+
+
+class PortIndex:
+    """Индекс наборов портов (ServiceSpec) по протоколам; entries — пары (spec, значение)."""
+
+    def __init__(self, entries):
+        by_protocol = {}
+        for spec, value in entries:
+            intervals = by_protocol.setdefault(spec.protocol, [])
+            intervals.extend((first, last, value) for first, last in spec.ranges)
+        self._indexes = {protocol: IntervalIndex(intervals) for protocol, intervals in by_protocol.items()}
+
+    def overlapping(self, spec):
+        """Множество значений, у которых есть общий порт со spec."""
+        index = self._indexes.get(spec.protocol)
+        if index is None:
+            return set()
+        found = set()
+        for first, last in spec.ranges:
+            found.update(index.overlapping(first, last))
+        return found
+
+    def containing(self, spec):
+        """Множество значений, чьи отрезки покрывают каждый отрезок spec."""
+        index = self._indexes.get(spec.protocol)
+        if index is None:
+            return set()
+        found = None
+        for first, last in spec.ranges:
+            current = set(index.containing(first, last))
+            found = current if found is None else found & current
+            if not found:
+                break
+        return found
+
+
+class ServiceCatalog:
+    """
+    Именованные сервисы с портами (например, список опасных сервисов
+    политики) и поиск тех из них, чьи порты затрагивает запись правила.
+    Записи правил разрешаются по services, затем по known; результаты
+    кэшируются, поэтому правило 'TCP 1-65535' проверяется по всему
+    каталогу одним запросом к индексу, а не по каждому порту.
+    """
+
+    def __init__(self, services, known=STANDARD_SERVICES):
+        self.services = services
+        self.known = {**known, **services}
+        self.specs = {}
+        for name in services:
+            spec = resolve_service(name, self.known)
+            if spec is not None:
+                self.specs[name] = spec
+        self._order = {name: k for k, name in enumerate(self.specs)}
+        self._index = PortIndex((spec, name) for name, spec in self.specs.items())
+        self._matches = {}
+
+    def spec(self, svc):
+        return resolve_service(svc, self.known)
+
+    def matching(self, svc):
+        """Имена сервисов каталога, порты которых пересекаются с портами svc (в порядке каталога)."""
+        matched = self._matches.get(svc)
+        if matched is None:
+            spec = self.spec(svc)
+            found = self._index.overlapping(spec) if spec is not None else ()
+            matched = self._matches[svc] = sorted(found, key=self._order.__getitem__)
+        return matched
+
+    def describe(self, name):
+        """Порты сервиса каталога для сообщений: '22' или 'TCP 135-139'."""
+        value = self.services[name]
+        return str(value) if isinstance(value, int) else format_spec(self.specs[name])
@@ -0,0 +1,167 @@
+# subnet_allocator.py
+import heapq
+import ipaddress
+
+from ip_utils import address_bits, parse_cidr
+
+
+class SubnetAllocator:
+    """
+    Распределитель адресного пространства базового диапазона по схеме
+    «близнецов» (buddy allocator).
+
+    Свободные блоки хранятся по длинам префикса: для каждой длины — куча
+    начальных адресов и множество для проверки принадлежности. Выдача
+    и возврат блока занимают O(log n) плюс число разбиений/слияний,
+    которое не превышает разрядности адреса.
+    """
+
+    def __init__(self, base_network):
+        self.base_network = ipaddress.ip_network(base_network, strict=False)
+        self.version = self.base_network.version
+        self.bits = address_bits(self.version)
+        self.reset()
+
+    def reset(self):
+        """Освобождает все блоки: весь базовый диапазон снова свободен."""
+        self._free_heaps = {}
+        self._free_sets = {}
+        self._allocated = {}  # начальный адрес -> длина префикса
+        self._push_free(int(self.base_network.network_address), self.base_network.prefixlen)
+
+    # --- Внутренние операции над списками свободных блоков ---
+    def _push_free(self, start, prefixlen):
+        self._free_sets.setdefault(prefixlen, set()).add(start)
+        heapq.heappush(self._free_heaps.setdefault(prefixlen, []), start)
+
+    def _pop_lowest_free(self, prefixlen):
+        free = self._free_sets.get(prefixlen)
+        if not free:
+            return None
+        heap = self._free_heaps[prefixlen]
+        # Удаление из кучи «ленивое»: пропускаем блоки, которые уже заняты или слиты
+        while heap[0] not in free:
+            heapq.heappop(heap)
+        start = heapq.heappop(heap)
+        free.remove(start)
+        return start
+
+    def _remove_free(self, start, prefixlen):
+        free = self._free_sets.get(prefixlen)
+        if free is None or start not in free:
+            return False
+        free.remove(start)
+        return True
+
+    def _block_size(self, prefixlen):
+        return 1 << (self.bits - prefixlen)
+
+    def _to_network(self, start, prefixlen):
+        return ipaddress.ip_network((start, prefixlen))
+
+    # --- Публичный интерфейс ---
+    def allocate(self, prefixlen=24):
+        """
+        Выдаёт свободный блок заданной длины префикса с наименьшим адресом
+        среди блоков подходящего размера. Возвращает ip_network или None,
+        если в базовом диапазоне нет места.
+        """
+        if prefixlen < self.base_network.prefixlen or prefixlen > self.bits:
+            return None
+        # Ищем наименьший свободный блок, не меньший запрошенного
+        order = prefixlen
+        start = None
+        while order >= self.base_network.prefixlen:
+            start = self._pop_lowest_free(order)
+            if start is not None:
+                break
+            order -= 1
+        if start is None:
+            return None
+        # Делим найденный блок пополам, возвращая правые половины в свободные
+        while order < prefixlen:
+            order += 1
+            self._push_free(start + self._block_size(order), order)
+        self._allocated[start] = prefixlen
+        return self._to_network(start, prefixlen)
+
+    def reserve(self, cidr):
+        """
+        Помечает заданную подсеть как занятую (например, введённую вручную
+        или загруженную из сценария). Возвращает False, если подсеть вне
+        базового диапазона или пересекается с уже занятыми блоками.
+        """
+        try:
+            version, start, end = parse_cidr(cidr)
+        except (ValueError, TypeError):
+            return False
+        if version != self.version:
+            return False
+        prefixlen = self.bits - (end - start + 1).bit_length() + 1
+        if prefixlen < self.base_network.prefixlen:
+            return False
+        # Ищем свободный блок-предок, содержащий подсеть
+        order = prefixlen
+        while order >= self.base_network.prefixlen:
+            host_bits = self.bits - order
+            ancestor = (start >> host_bits) << host_bits
+            if self._remove_free(ancestor, order):
+                break
+            order -= 1
+        else:
+            return False
+        # Разбиваем предка до нужного размера, освобождая соседние половины
+        while order < prefixlen:
+            order += 1
+            half = self._block_size(order)
+            if start & half:
+                self._push_free(ancestor, order)
+                ancestor += half
+            else:
+                self._push_free(ancestor + half, order)
+        self._allocated[start] = prefixlen
+        return True
+
+    def release(self, cidr):
+        """
+        Возвращает ранее выданный или зарезервированный блок и сливает его
+        со свободными «близнецами». Возвращает False для неизвестного блока.
+        """
+        try:
+            version, start, end = parse_cidr(cidr)
+        except (ValueError, TypeError):
+            return False
+        prefixlen = self.bits - (end - start + 1).bit_length() + 1
+        if version != self.version or self._allocated.get(start) != prefixlen:
+            return False
+        del self._allocated[start]
+        while prefixlen > self.base_network.prefixlen:
+            buddy = start ^ self._block_size(prefixlen)
+            if not self._remove_free(buddy, prefixlen):
+                break
+            start = min(start, buddy)
+            prefixlen -= 1
+        self._push_free(start, prefixlen)
+        return True
+
+    def is_allocated(self, cidr):
+        """Проверяет, занят ли блок именно этим распределителем."""
+        try:
+            version, start, end = parse_cidr(cidr)
+        except (ValueError, TypeError):
+            return False
+        prefixlen = self.bits - (end - start + 1).bit_length() + 1
+        return version == self.version and self._allocated.get(start) == prefixlen
+
+    def free_blocks(self):
+        """Возвращает отсортированный список свободных блоков (ip_network)."""
+        blocks = [(start, prefixlen)
+                  for prefixlen, free in self._free_sets.items()
+                  for start in free]
+        blocks.sort()
+        return [self._to_network(start, prefixlen) for start, prefixlen in blocks]
+
+    def free_addresses(self):
+        """Количество свободных адресов в базовом диапазоне."""
+        return sum(len(free) * self._block_size(prefixlen)
+                   for prefixlen, free in self._free_sets.items())
@@ -0,0 +1,96 @@
+# subnet_index.py
+from array import array
+from bisect import bisect_right
+
+from ip_utils import parse_address, parse_cidr
+
+
+class SubnetIndex:
+    """
+    Индекс «IP-адрес -> сегмент» по словарю подсетей сценария.
+
+    Подсети каждой версии IP раскладываются в отсортированный массив
+    непересекающихся интервалов: граница интервала хранится целым числом,
+    владельцем интервала считается самая узкая (с наибольшим префиксом)
+    подсеть, содержащая его. Поиск по наибольшему совпадению префикса
+    сводится к одному двоичному поиску.
+    """
+
+    def __init__(self, subnets):
+        parsed = {4: [], 6: []}
+        for order, (name, cidr) in enumerate(subnets.items()):
+            if not cidr:
+                continue
+            try:
+                version, start, end = parse_cidr(cidr)
+            except ValueError:
+                continue
+            parsed[version].append((start, end, order, name))
+
+        self._names = []
+        self._tables = {}
+        for version, nets in parsed.items():
+            # IPv4 умещается в 64-битный массив (с запасом на границу 2**32),
+            # для IPv6 остаются целые числа Python
+            bounds = array("Q") if version == 4 else []
+            owners = array("i")
+            self._tables[version] = (bounds, owners)
+            self._build(nets, bounds, owners)
+
+    def _name_id(self, name):
+        self._names.append(name)
+        return len(self._names) - 1
+
+    def _build(self, nets, bounds, owners):
+        """Строит массив интервалов: bounds[i] — начало, owners[i] — сегмент (-1 — нет)."""
+        def emit(position, owner):
+            if bounds and bounds[-1] == position:
+                owners[-1] = owner
+            else:
+                bounds.append(position)
+                owners.append(owner)
+
+        # При одинаковых подсетях побеждает объявленная раньше: она кладётся в стек последней
+        nets.sort(key=lambda n: (n[0], -n[1], -n[2]))
+        stack = []  # цепочка вложенных подсетей: (конец, id сегмента)
+        for start, end, _, name in nets:
+            while stack and stack[-1][0] < start:
+                closed_end = stack.pop()[0]
+                emit(closed_end + 1, stack[-1][1] if stack else -1)
+            owner = self._name_id(name)
+            emit(start, owner)
+            stack.append((end, owner))
+        while stack:
+            closed_end = stack.pop()[0]
+            emit(closed_end + 1, stack[-1][1] if stack else -1)
+
+    def _lookup_int(self, version, value):
+        bounds, owners = self._tables[version]
+        pos = bisect_right(bounds, value) - 1
+        if pos < 0 or owners[pos] < 0:
+            return None
+        return self._names[owners[pos]]
+
+    def lookup(self, address):
+        """
+        Возвращает сегмент, к подсети которого относится адрес (строка,
+        ip_address или целое число), либо None. Целые числа меньше 2**32
+        считаются адресами IPv4.
+        """
+        version, value = parse_address(address)
+        return self._lookup_int(version, value)
+
+    def lookup_many(self, addresses):
+        """Пакетный поиск: возвращает список сегментов в порядке адресов."""
+        names = self._names
+        tables = self._tables
+        result = []
+        for address in addresses:
+            version, value = parse_address(address)
+            bounds, owners = tables[version]
+            pos = bisect_right(bounds, value) - 1
+            result.append(names[owners[pos]] if pos >= 0 and owners[pos] >= 0 else None)
+        return result
+
+    def __len__(self):
+        return len(self._names)
@@ -0,0 +1,66 @@
+# subnet_planner.py
+import ipaddress
+import math
+
+from subnet_allocator import SubnetAllocator
+
+DEFAULT_GROWTH = 0.25  # запас на рост сегмента (25%)
+MIN_IPV4_PREFIX = 30   # наименьшая подсеть IPv4 с двумя рабочими адресами
+IPV6_SEGMENT_PREFIX = 64
+
+
+def host_demand(segments, segment_equipment, growth=DEFAULT_GROWTH):
+    """
+    Считает потребность каждого сегмента в адресах: количество оборудования
+    с вкладки «Оборудование», увеличенное на коэффициент роста.
+    """
+    demand = {}
+    for seg in segments:
+        total = sum(segment_equipment.get(seg, {}).values())
+        demand[seg] = max(1, math.ceil(total * (1 + growth)))
+    return demand
+
+
+def prefix_for_hosts(hosts, version=4):
+    """Наименьшая подсеть (наибольший префикс), вмещающая заданное число узлов."""
+    if version == 6:
+        # Сегменты IPv6 не делятся мельче /64
+        return min(IPV6_SEGMENT_PREFIX, 128 - max(hosts - 1, 0).bit_length())
+    # Адрес сети и широковещательный адрес не выдаются узлам
+    return min(MIN_IPV4_PREFIX, 32 - (hosts + 1).bit_length())
+
+
+def plan_subnets(segments, segment_equipment, base_network, growth=DEFAULT_GROWTH):
+    """
+    Подбирает каждому сегменту подсеть минимального размера (VLSM)
+    и размещает их в базовом диапазоне, начиная с самых крупных.
+    Возвращает (подсети, ошибки): словарь сегмент -> CIDR и список
+    сообщений о сегментах, которые не поместились.
+    """
+    base = ipaddress.ip_network(base_network, strict=False)
+    demand = host_demand(segments, segment_equipment, growth)
+    prefixes = {seg: prefix_for_hosts(hosts, base.version) for seg, hosts in demand.items()}
+
+    errors = []
+    bits = base.max_prefixlen
+    required = sum(1 << (bits - p) for p in prefixes.values())
+    if required > base.num_addresses:
+        errors.append(
+            f"Базовый диапазон {base} вмещает {base.num_addresses} адресов, "
+            f"а сегментам требуется {required}"
+        )
+
+    # Блоки-степени двойки, выдаваемые по убыванию размера, укладываются
+    # распределителем «близнецов» без фрагментации
+    allocator = SubnetAllocator(base)
+    subnets = {}
+    for seg in sorted(prefixes, key=prefixes.get):
+        net = allocator.allocate(prefixes[seg])
+        if net is None:
+            errors.append(
+                f"Сегменту '{seg}' требуется подсеть /{prefixes[seg]} "
+                f"({demand[seg]} узлов), но в диапазоне {base} нет места"
+            )
+        else:
+            subnets[seg] = str(net)
+    return {seg: subnets[seg] for seg in segments if seg in subnets}, errors
@@ -0,0 +1,109 @@
+# tests/test_analysis_cache.py
+import os
+import tempfile
+import unittest
+from unittest import mock
+from analysis_cache import AnalysisCache, scenario_hash
+from report_generator import generate_report
+
+SCENARIO = {
+    "segments": ["HR", "IT"],
+    "subnets": {"HR": "10.0.0.0/24", "IT": "10.0.1.0/24"},
+    "global_rules": [("SSH", "HR", "IT", "SSH")],
+    "user_rules": [("HR", "Иван", "Админ", "IT", "RDP")],
+    "segment_equipment": {"HR": {"Workstation": 2, "Printer": 0}, "IT": {}},
+    "saved_at": "2024-01-01T00:00:00",
+}
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "scenario_cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_ignores_metadata_and_representation(self):
+        same = dict(SCENARIO, saved_at="2025-05-05", global_rules=[["SSH", "HR", "IT", "SSH"]],
+                    segment_equipment={"HR": {"Workstation": 2}})
+        self.assertEqual(scenario_hash(SCENARIO), scenario_hash(same))
+        changed = dict(SCENARIO, global_rules=[("SSH", "HR", "IT", "RDP")])
+        self.assertNotEqual(scenario_hash(SCENARIO), scenario_hash(changed))
+
+    def test_results_memoized_in_memory_and_on_disk(self):
+        cache = AnalysisCache(self.dir)
+        report = cache.generate_report(SCENARIO, [])
+        self.assertEqual(report, generate_report(SCENARIO["segments"], SCENARIO["subnets"],
+                                                 SCENARIO["global_rules"], SCENARIO["user_rules"],
+                                                 SCENARIO["segment_equipment"], []))
+        with mock.patch("analysis_cache.analyze_risks") as analyze:
+            analyze.return_value = ["риск"]
+            self.assertEqual(cache.analyze_risks(SCENARIO), ["риск"])
+            self.assertEqual(cache.analyze_risks(SCENARIO), ["риск"])
+            self.assertEqual(analyze.call_count, 1)
+            # Новый экземпляр (перезапуск программы) читает результат с диска
+            self.assertEqual(AnalysisCache(self.dir).analyze_risks(SCENARIO), ["риск"])
+            self.assertEqual(analyze.call_count, 1)
+            # Другая политика — другой ключ
+            cache.analyze_risks(SCENARIO, {"guest_marker": "hr"})
+            self.assertEqual(analyze.call_count, 2)
+        self.assertEqual(cache.validate(SCENARIO), [])
+
+    def test_memory_lru_and_disk_size_eviction(self):
+        cache = AnalysisCache(self.dir, memory_items=2, max_disk_bytes=250)
+        for i in range(5):
+            cache.put(f"key{i}", "x" * 100)
+        self.assertEqual(list(cache._memory), ["key3", "key4"])
+        files = os.listdir(self.dir)
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.dir, f)) for f in files), 250)
+        self.assertIn("key4.json", files)
+        self.assertIsNone(AnalysisCache(self.dir).get("key0"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        AnalysisCache(self.dir).put("key", ["значение"])
+        path = os.path.join(self.dir, "key.json")
+        with open(path, "wb") as f:
+            f.write('["обре'.encode('utf-8')[:-1])
+        cache = AnalysisCache(self.dir)
+        self.assertIsNone(cache.get("key"))
+        self.assertFalse(os.path.exists(path))
+        cache.put("key", ["значение"])
+        self.assertEqual(AnalysisCache(self.dir).get("key"), ["значение"])
+        self.assertEqual([f for f in os.listdir(self.dir) if f.endswith(".tmp")], [])
+
+    def test_key_depends_on_code_version(self):
+        cache = AnalysisCache(self.dir)
+        with mock.patch("analysis_cache.analyze_risks", return_value=["старый"]):
+            cache.analyze_risks(SCENARIO)
+        with mock.patch("analysis_cache.code_version", return_value="другая версия"), \
+                mock.patch("analysis_cache.analyze_risks", return_value=["новый"]):
+            self.assertEqual(AnalysisCache(self.dir).analyze_risks(SCENARIO), ["новый"])
+
+    def test_binary_values(self):
+        cache = AnalysisCache(self.dir)
+        cache.put("image", b"\x89PNG")
+        self.assertEqual(AnalysisCache(self.dir).get("image"), b"\x89PNG")
+        cache.clear()
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_render_cached(self):
+        cache = AnalysisCache(self.dir)
+        first = os.path.join(self.tmp.name, "a.png")
+        second = os.path.join(self.tmp.name, "b.png")
+
+        def fake_draw(*args, file_path=None, **kwargs):
+            with open(file_path, "wb") as f:
+                f.write(b"png-data")
+            return file_path
+
+        with mock.patch("visualizer.draw_and_save_network", side_effect=fake_draw) as draw:
+            cache.render(SCENARIO, first)
+            cache.render(SCENARIO, second)
+        self.assertEqual(draw.call_count, 1)
+        with open(second, "rb") as f:
+            self.assertEqual(f.read(), b"png-data")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# tests/test_attack_paths.py
+import random
+import time
+import unittest
+from attack_paths import (STOP_PATHS, STOP_TIME, AttackGraph, AttackPath, format_attack_path,
+                          user_attack_graph)
+from report_generator import generate_risk_report
+
+GLOBAL_RULES = [
+    ("Web", "Guest", "IT", "HTTPS"),
+    ("Share", "IT", "Finance", "SMB"),
+    ("Admin", "IT", "Finance", "SSH"),
+    ("Print", "Guest", "HR", "HTTP"),
+    ("Remote", "HR", "IT", "RDP"),
+    ("Back", "Finance", "HR", "SSH"),
+]
+USER_RULES = [("HR", "Иван", "Бухгалтер", "Finance", "SMB")]
+
+
+class TestAttackPaths(unittest.TestCase):
+
+    def test_paths_shortest_first(self):
+        graph = AttackGraph(GLOBAL_RULES)
+        paths = list(graph.iter_paths("Guest", ["Finance"]))
+        self.assertEqual([p.segments for p in paths], [
+            ("Guest", "IT", "Finance"),
+            ("Guest", "HR", "IT", "Finance"),
+        ])
+        self.assertEqual(paths[0].services, (("HTTPS",), ("SMB", "SSH")))
+        self.assertEqual(format_attack_path(paths[0]), "Guest → IT (HTTPS) → Finance (SMB, SSH)")
+        self.assertIsNone(graph.stopped)
+
+    def test_depth_limit_and_stop_at_first_target(self):
+        graph = AttackGraph(GLOBAL_RULES, USER_RULES)
+        self.assertEqual([p.segments for p in graph.iter_paths("Guest", ["Finance"], max_depth=2)],
+                         [("Guest", "IT", "Finance"), ("Guest", "HR", "Finance")])
+        # HR — цель, поэтому путь через HR дальше не продолжается
+        paths = list(graph.iter_paths("Guest", ["Finance", "HR"]))
+        self.assertEqual([p.segments for p in paths], [("Guest", "HR"), ("Guest", "IT", "Finance")])
+
+    def test_user_attack_paths(self):
+        graph, sources = user_attack_graph(GLOBAL_RULES, USER_RULES + [("IT", "Пётр", "Админ", "HR", "SSH")],
+                                           "Иван")
+        self.assertEqual(sources, ["HR"])
+        self.assertEqual(next(graph.iter_paths(sources, ["Finance"])),
+                         AttackPath(("HR", "Finance"), (("SMB",),)))
+
+    def test_incremental_and_bounded_on_dense_graph(self):
+        rnd = random.Random(0)
+        segments = [f"S{i}" for i in range(300)]
+        rules = [("R", rnd.choice(segments), rnd.choice(segments), "SSH") for _ in range(20000)]
+        graph = AttackGraph(rules)
+        paths = graph.iter_paths("S0", ["S1"], max_depth=8, max_paths=50)
+        first = next(paths)
+        self.assertEqual(first.segments[0], "S0")
+        self.assertEqual(len(list(paths)), 49)
+        self.assertEqual(graph.stopped, STOP_PATHS)
+
+        start = time.perf_counter()
+        list(graph.iter_paths("S0", ["S1"], max_depth=8, time_budget=0.2))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(graph.stopped, STOP_TIME)
+
+    def test_risk_report_section(self):
+        report = generate_risk_report(["Guest", "IT", "Finance", "HR"], GLOBAL_RULES, USER_RULES, {},
+                                      policy={"attack_paths": {"critical_segments": ["Finance"]}})
+        self.assertIn("Возможные пути атаки к критичным сегментам (Finance)", report)
+        self.assertIn("Guest → HR (HTTP) → Finance (SMB)", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# tests/test_benchmark.py
+import json
+import os
+import tempfile
+import unittest
+from benchmark import compare_results, generate_scenario, main, run_benchmarks
+from validation import validate_rules, validate_subnets
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_scenario_sizes(self):
+        scenario = generate_scenario(segments=300, global_rules=50, user_rules=80, equipment=10, seed=1)
+        self.assertEqual(len(scenario["segments"]), 300)
+        self.assertIn("Guest", scenario["segments"])
+        self.assertEqual(len(scenario["global_rules"]), 50)
+        self.assertEqual(len(scenario["user_rules"]), 80)
+        # Подсети выданы аллокатором — пересечений нет
+        self.assertEqual(validate_subnets(scenario["subnets"]), [])
+        self.assertFalse(any("Неизвестный" in e for e in validate_rules(scenario["global_rules"],
+                                                                       scenario["segments"])))
+
+    def test_generate_scenario_is_reproducible(self):
+        self.assertEqual(generate_scenario(seed=5), generate_scenario(seed=5))
+        self.assertNotEqual(generate_scenario(seed=5), generate_scenario(seed=6))
+
+    def test_run_and_compare(self):
+        params = {"segments": 5, "global_rules": 10, "user_rules": 10, "equipment": 5}
+        results = run_benchmarks([params], repeat=2, stages=["validate_rules", "analyze_risks"])
+        timings = results[0]["timings"]
+        self.assertEqual(set(timings), {"validate_rules", "analyze_risks"})
+        self.assertLessEqual(timings["validate_rules"]["min"], timings["validate_rules"]["median"])
+        ratios = compare_results({"results": results}, {"results": results})[0]["ratios"]
+        self.assertEqual(ratios, {"validate_rules": 1.0, "analyze_risks": 1.0})
+
+    def test_main_writes_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            main(["--segments", "3", "4", "--global-rules", "5", "--user-rules", "5", "--equipment", "2",
+                  "--stages", "validate_subnets", "--repeat", "1", "-o", path])
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIn("python", data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# tests/test_cli.py
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from cli import EXIT_ERROR, EXIT_FINDINGS, EXIT_OK, exit_code, main, run
+
+CLEAN = {
+    "segments": ["HR", "IT"],
+    "subnets": {"HR": "10.0.0.0/24", "IT": "10.0.1.0/24"},
+    "global_rules": [["Web", "HR", "IT", "HTTPS"]],
+    "user_rules": [],
+    "segment_equipment": {"HR": {"Workstation": 2}, "IT": {"Server": 1}},
+}
+BROKEN = dict(CLEAN, subnets={"HR": "10.0.0.0/16", "IT": "10.0.1.0/24"},
+              global_rules=[["SSH", "HR", "IT", "SSH"], ["SSH", "HR", "IT", "SSH"]])
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        for name, data in (("clean", CLEAN), ("broken", BROKEN)):
+            with open(os.path.join(self.dir, name + ".json"), "w", encoding="utf-8") as f:
+                json.dump(data, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_validate_directory_in_parallel(self):
+        results = run("validate", [self.dir], jobs=2)
+        self.assertEqual([os.path.basename(r["scenario"]) for r in results], ["broken.json", "clean.json"])
+        codes = [e["code"] for e in results[0]["errors"]]
+        self.assertEqual(codes, ["subnet_overlap", "duplicate_rule"])
+        self.assertEqual(results[1]["status"], "ok")
+        self.assertEqual(exit_code(results), EXIT_FINDINGS)
+        self.assertEqual(run("validate", [self.dir], jobs=1), results)
+
+    def test_analyze_reports_risks(self):
+        clean, = run("analyze", [self.path("clean.json")])
+        self.assertEqual(clean["risks"], [])
+        self.assertEqual(exit_code([clean]), EXIT_OK)
+        broken, = run("analyze", [self.path("broken.json")])
+        self.assertTrue(any("SSH" in r for r in broken["risks"]))
+
+    def test_report_written_to_output_dir(self):
+        out = self.path("reports")
+        result, = run("report", [self.path("clean.json")], output_dir=out)
+        self.assertEqual(result["output"], os.path.join(out, "clean.txt"))
+        with open(result["output"], encoding="utf-8") as f:
+            self.assertIn("HR", f.read())
+
+    def test_summary_report(self):
+        out = self.path("reports")
+        code = main(["report", self.path("broken.json"), "--output-dir", out, "--summary", "--page", "1"])
+        self.assertEqual(code, EXIT_FINDINGS)
+        with open(os.path.join(out, "broken.txt"), encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn("=== Сводный отчёт по сегментации локальной сети ===", text)
+        self.assertIn("Глобальные правила взаимодействия (стр. 1 из 1, всего 2):", text)
+        self.assertIn("=== Отчёт о потенциальных рисках и сложностях ===", text)
+
+    def test_summary_and_html_rejected(self):
+        with contextlib.redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit) as ctx:
+            main(["report", self.path("clean.json"), "--output-dir", self.path("reports"), "--summary", "--html"])
+        self.assertEqual(ctx.exception.code, EXIT_ERROR)
+        self.assertIn("--html", err.getvalue())
+        self.assertFalse(os.path.exists(self.path("reports")))
+
+    def test_unknown_option(self):
+        with self.assertRaises(ValueError):
+            run("validate", [self.dir], page_size=10)
+
+    def test_html_report(self):
+        out = self.path("reports")
+        code = main(["report", self.path("clean.json"), "--output-dir", out, "--html"])
+        self.assertEqual(code, EXIT_OK)
+        with open(os.path.join(out, "clean.html"), encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn('<script type="application/json" id="global-rules">[["Web","HR","IT","HTTPS"]]</script>', text)
+        self.assertIn("data:image/png;base64,", text)
+
+    def test_unreadable_scenario(self):
+        with open(self.path("bad.json"), "w") as f:
+            f.write("[")
+        results = run("validate", [self.path("bad.json"), self.path("missing.json")])
+        self.assertTrue(all(r["status"] == "error" for r in results))
+        self.assertEqual(exit_code(results), EXIT_ERROR)
+
+    def test_malformed_scenario_does_not_abort_batch(self):
+        for name, data in (("bad_rule", dict(CLEAN, global_rules=[["a", "HR", "IT"]])),
+                           ("bad_subnets", dict(CLEAN, subnets=["10.0.0.0/24"]))):
+            with open(self.path(name + ".json"), "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        for jobs in (1, 2):
+            results = run("analyze", [self.dir], jobs=jobs)
+            statuses = {os.path.basename(r["scenario"]): r["status"] for r in results}
+            self.assertEqual(statuses, {"bad_rule.json": "error", "bad_subnets.json": "error",
+                                        "broken.json": "findings", "clean.json": "ok"})
+            self.assertEqual(exit_code(results), EXIT_ERROR)
+        self.assertIn("Не удалось обработать сценарий", results[0]["error"])
+
+    def test_main_json_output(self):
+        code = main(["validate", self.path("clean.json"), "--format", "json"])
+        self.assertEqual(code, EXIT_OK)
+
+    def test_does_not_import_tkinter(self):
+        script = ("import sys; from cli import main; main(['analyze', sys.argv[1], '-j', '1']); "
+                  "assert 'tkinter' not in sys.modules")
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        proc = subprocess.run([sys.executable, "-c", script, self.dir], cwd=cwd, capture_output=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
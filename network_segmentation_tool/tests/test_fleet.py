@@ -0,0 +1,71 @@
+# tests/test_fleet.py
+import json
+import os
+import tempfile
+import unittest
+from benchmark import generate_scenario
+from cli import EXIT_ERROR, main
+from fleet import analyze_fleet, format_fleet_report, summarize_fleet
+
+
+class TestFleet(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for i, size in enumerate((30, 400, 5, 120)):
+            path = os.path.join(self.tmp.name, f"site{i}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(generate_scenario(10, size, size, 10, seed=i), f, ensure_ascii=False)
+            self.files.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_matches_serial_in_file_order(self):
+        parallel = analyze_fleet(self.files, jobs=2)
+        serial = analyze_fleet(self.files, jobs=1)
+        self.assertEqual([r["scenario"] for r in parallel], self.files)
+        strip = [{k: v for k, v in r.items() if k != "timings"} for r in parallel]
+        self.assertEqual(strip, [{k: v for k, v in r.items() if k != "timings"} for r in serial])
+        for r in parallel:
+            self.assertEqual(set(r["timings"]), {"load", "validate", "analyze", "score", "total"})
+
+    def test_summary(self):
+        bad = os.path.join(self.tmp.name, "bad.json")
+        with open(bad, "w") as f:
+            f.write("[")
+        results = analyze_fleet(self.files + [bad], jobs=1)
+        summary = summarize_fleet(results, top_n=3)
+        self.assertEqual(summary["scenarios"], 5)
+        self.assertEqual(summary["statuses"]["error"], 1)
+        counts = {name: count for name, count, _ in summary["risk_types"]}
+        expected = sum(len(r["risks"].get("dangerous_services", [])) for r in results[:4])
+        self.assertEqual(counts["dangerous_services"], expected)
+        scores = [score for _, _, score in summary["worst_segments"]]
+        self.assertEqual(len(scores), 3)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        report = format_fleet_report(summary, results)
+        self.assertIn("dangerous_services", report)
+        self.assertIn("bad.json: Не удалось загрузить сценарий", report)
+
+    def test_malformed_scenario_reported_as_error(self):
+        bad = os.path.join(self.tmp.name, "bad_rule.json")
+        with open(bad, "w", encoding="utf-8") as f:
+            json.dump({"segments": ["A", "B"], "global_rules": [["r", "A", "B"]]}, f)
+        for jobs in (1, 2):
+            results = analyze_fleet(self.files + [bad], jobs=jobs)
+            self.assertEqual([r["status"] == "error" for r in results], [False] * 4 + [True])
+            self.assertIn("Не удалось обработать сценарий", results[-1]["error"])
+        summary = summarize_fleet(results)
+        self.assertEqual(summary["statuses"]["error"], 1)
+        self.assertIn("bad_rule.json: Не удалось обработать сценарий", format_fleet_report(summary, results))
+
+    def test_cli_without_scenarios(self):
+        empty = os.path.join(self.tmp.name, "empty")
+        os.mkdir(empty)
+        self.assertEqual(main(["fleet", empty]), EXIT_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main()
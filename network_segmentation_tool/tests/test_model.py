@@ -0,0 +1,67 @@
+# tests/test_model.py
+import unittest
+from model import NetworkModel
+from report_generator import generate_report, generate_risk_report
+from risk_analyzer import analyze_risks
+from validation import validate_rules, validate_user_rules
+
+SEGMENTS = ["HR", "IT", "Guest"]
+SUBNETS = {"HR": "10.0.0.0/24", "IT": "10.0.1.0/24", "Guest": "10.0.2.0/24"}
+GLOBAL_RULES = [
+    ("R1", "HR", "IT", "SSH"),
+    ("R2", "HR", "IT", "SSH"),
+    ("R3", "Guest", "Finance", "RDP"),
+    ("R4", " HR ", "IT", "22"),
+]
+USER_RULES = [
+    ("HR", "Иван", "Админ", "IT", "SSH"),
+    ("HR", "Иван", "Админ", "IT", "SSH"),
+    ("Lab", "Пётр", "Инженер", "IT", "HTTPS"),
+]
+EQUIPMENT = {"HR": {"Workstation": 3}}
+
+
+class TestNetworkModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = NetworkModel(SEGMENTS, SUBNETS, GLOBAL_RULES, USER_RULES, EQUIPMENT)
+        self.clean_rules = [tuple(x.strip() for x in r) for r in GLOBAL_RULES]
+
+    def test_tables_iterate_as_tuples(self):
+        self.assertEqual(list(self.model.global_rules), self.clean_rules)
+        self.assertEqual(list(self.model.user_rules), USER_RULES)
+        self.assertEqual(self.model.user_rules[2], USER_RULES[2])
+        self.assertEqual(len(self.model.global_rules), 4)
+
+    def test_names_are_interned_to_small_ids(self):
+        rules = self.model.global_rules
+        self.assertEqual(list(rules.src), [0, 0, 2, 0])
+        self.assertEqual(len(self.model.segment_ids), 5)  # Finance и Lab встречаются только в правилах
+        self.assertEqual(self.model.segments, SEGMENTS)
+        self.assertFalse(self.model.is_declared(self.model.segment_ids.get("Finance")))
+        self.assertEqual(len(self.model.user_rules.people), 2)
+
+    def test_validators_accept_model(self):
+        m = self.model
+        self.assertEqual(validate_rules(m.global_rules, m.segments),
+                         validate_rules(self.clean_rules, SEGMENTS))
+        self.assertEqual(validate_user_rules(m.user_rules, m.segments, m.global_rules),
+                         validate_user_rules(USER_RULES, SEGMENTS, self.clean_rules))
+
+    def test_risks_and_reports_accept_model(self):
+        m = self.model
+        self.assertEqual(analyze_risks(m.segments, m.global_rules, m.user_rules, m.segment_equipment),
+                         analyze_risks(SEGMENTS, self.clean_rules, USER_RULES, EQUIPMENT))
+        report = generate_report(m.segments, m.subnets, m.global_rules, m.user_rules, m.segment_equipment)
+        self.assertIn(" - [R3] Guest → Finance : RDP", report)
+        self.assertIn("ненадёжного сегмента", generate_risk_report(
+            m.segments, m.global_rules, m.user_rules, m.segment_equipment))
+
+    def test_from_scenario(self):
+        model = NetworkModel.from_scenario({"segments": SEGMENTS, "user_rules": USER_RULES})
+        self.assertEqual(len(model.user_rules), 3)
+        self.assertEqual(model.subnets, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# tests/test_permissions.py
+import random
+import unittest
+from permissions import PermissionIndex, format_user_access
+from report_generator import generate_report
+
+GLOBAL_RULES = [("Web", "HR", "IT", "HTTPS"), ("Mail", "IT", "Finance", "SMB")]
+USER_RULES = [
+    ("HR", "Иванов И.И.", "Бухгалтер", "Finance", "SMB"),
+    ("HR", "Иванов И.И.", "Бухгалтер", "IT", "SSH"),
+    ("IT", "Петров П.П.", "Админ", "HR", "RDP"),
+]
+
+
+class TestPermissionIndex(unittest.TestCase):
+
+    def test_user_access_combines_global_rules(self):
+        index = PermissionIndex(GLOBAL_RULES, USER_RULES)
+        self.assertEqual(index.user_access("Иванов И.И."),
+                         {("Finance", "SMB"), ("IT", "SSH"), ("IT", "HTTPS")})
+        self.assertEqual(index.services_to("Иванов И.И.", "IT"), ["HTTPS", "SSH"])
+        self.assertTrue(index.can_access("Петров П.П.", "Finance", "SMB"))  # из сегмента IT
+        self.assertFalse(index.can_access("Сидоров", "IT", "SSH"))
+        self.assertEqual(index.segment_access("IT"), {("Finance", "SMB")})
+        self.assertEqual(format_user_access(index, "Иванов И.И."), "Finance: SMB; IT: HTTPS, SSH")
+
+    def test_incremental_updates(self):
+        index = PermissionIndex(GLOBAL_RULES, USER_RULES)
+        index.user_access("Петров П.П.")
+        index.add_global_rule(("Dup", "IT", "Finance", "SMB"))
+        index.remove_global_rule(("Mail", "IT", "Finance", "SMB"))
+        self.assertTrue(index.can_access("Петров П.П.", "Finance", "SMB"))  # ещё одно такое правило
+        index.remove_global_rule(("Dup", "IT", "Finance", "SMB"))
+        self.assertFalse(index.can_access("Петров П.П.", "Finance", "SMB"))
+        index.remove_user_rule(USER_RULES[2])
+        self.assertEqual(index.user_access("Петров П.П."), frozenset())
+        self.assertNotIn("Петров П.П.", index.users())
+        index.remove_user_rule(USER_RULES[2])  # повторное удаление ничего не ломает
+
+    def test_incremental_matches_rebuild(self):
+        rnd = random.Random(7)
+        segments = ["A", "B", "C", "D"]
+        services = ["SSH", "SMB", "HTTPS"]
+        global_rules = [("R", rnd.choice(segments), rnd.choice(segments), rnd.choice(services)) for _ in range(30)]
+        user_rules = [(rnd.choice(segments), rnd.choice(["u1", "u2", "u3"]), "x", rnd.choice(segments),
+                       rnd.choice(services)) for _ in range(30)]
+        index = PermissionIndex(global_rules, user_rules)
+        for _ in range(40):
+            if rnd.random() < 0.5:
+                rule = global_rules.pop(rnd.randrange(len(global_rules)))
+                index.remove_global_rule(rule)
+            else:
+                rule = user_rules.pop(rnd.randrange(len(user_rules)))
+                index.remove_user_rule(rule)
+            for fio in ("u1", "u2", "u3"):
+                index.user_access(fio)
+        fresh = PermissionIndex(global_rules, user_rules)
+        for fio in ("u1", "u2", "u3"):
+            self.assertEqual(index.user_access(fio), fresh.user_access(fio))
+
+    def test_report_section(self):
+        report = generate_report(["HR", "IT", "Finance"], {}, GLOBAL_RULES, USER_RULES, {})
+        self.assertIn("Эффективные права пользователей", report)
+        self.assertIn(" - Иванов И.И. (HR): Finance: SMB; IT: HTTPS, SSH", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
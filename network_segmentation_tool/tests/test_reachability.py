@@ -0,0 +1,99 @@
+# tests/test_reachability.py
+import random
+import time
+import unittest
+from reachability import ReachabilityIndex
+from risk_analyzer import analyze_risks
+
+SEGMENTS = ["Guest", "IT", "Finance", "HR"]
+GLOBAL_RULES = [
+    ("Web", "Guest", "IT", "HTTPS"),
+    ("Files", "Guest", "IT", "445"),
+    ("Share", "IT", "Finance", "SMB"),
+    ("Admin", "Finance", "HR", "SSH"),
+]
+
+
+class TestReachability(unittest.TestCase):
+
+    def test_transitive_exposures_per_service(self):
+        index = ReachabilityIndex(SEGMENTS, GLOBAL_RULES)
+        self.assertEqual(index.transitive_exposures("Guest"), [("Finance", "IT"), ("HR", "IT")])
+        # '445' и 'SMB' — один класс сервисов
+        self.assertEqual(index.transitive_exposures("Guest", "SMB"), [("Finance", "IT")])
+        self.assertEqual(index.transitive_exposures("Guest", "SSH"), [])
+        self.assertFalse(index.reaches("Guest", "HR", "SMB"))
+        self.assertTrue(index.reaches("Guest", "HR"))
+        self.assertEqual(index.first_hop("Guest", "HR"), "IT")
+        self.assertIsNone(index.first_hop("HR", "Guest"))
+
+    def test_user_rules_are_edges(self):
+        index = ReachabilityIndex(SEGMENTS, GLOBAL_RULES, [("HR", "Иван", "Админ", "Guest", "RDP")])
+        self.assertEqual(sorted(index.reachable_from("HR")), ["Finance", "Guest", "IT"])
+        self.assertTrue(index.reaches("Guest", "Guest"))  # цикл через HR
+
+    def test_port_range_joins_port_classes(self):
+        index = ReachabilityIndex(SEGMENTS, [("All", "Guest", "IT", "TCP 1-1024"), ("Admin", "IT", "HR", "SSH")])
+        self.assertEqual(index.transitive_exposures("Guest", "SSH"), [("HR", "IT")])
+        index.add_rule("IT", "Finance", "SMB")
+        self.assertEqual(index.transitive_exposures("Guest", "SMB"), [("Finance", "IT")])
+        index.remove_rule("Guest", "IT", "TCP 1-1024")
+        self.assertEqual(index.transitive_exposures("Guest", "SSH"), [])
+        self.assertEqual(index.transitive_exposures("Guest", "SMB"), [])
+
+    def test_matches_naive_bfs(self):
+        rnd = random.Random(3)
+        segments = [f"S{i}" for i in range(150)]  # больше 64: несколько слов в строке
+        rules = [("R", rnd.choice(segments), rnd.choice(segments), "SSH") for _ in range(250)]
+        index = ReachabilityIndex(segments, rules)
+        adjacency = {s: set() for s in segments}
+        for _, src, dst, _ in rules:
+            if src != dst:
+                adjacency[src].add(dst)
+        for src in segments[:20]:
+            seen, stack = set(), list(adjacency[src])
+            while stack:
+                node = stack.pop()
+                if node not in seen:
+                    seen.add(node)
+                    stack.extend(adjacency[node])
+            seen.discard(src)
+            self.assertEqual(set(index.reachable_from(src)), seen)
+
+    def test_incremental_updates_match_rebuild(self):
+        rnd = random.Random(5)
+        segments = [f"S{i}" for i in range(100)]
+        services = ["SSH", "SMB", "TCP 1-1024", "TCP 20-30"]
+        rules = [("R", rnd.choice(segments), rnd.choice(segments), rnd.choice(services)) for _ in range(150)]
+        index = ReachabilityIndex(segments, rules)
+        index.closure(), index.closure("SSH"), index.closure("SMB")
+        for _ in range(100):
+            if rnd.random() < 0.5:
+                rule = rules.pop(rnd.randrange(len(rules)))
+                index.remove_rule(rule[1], rule[2], rule[3])
+            else:
+                rule = ("R", rnd.choice(segments), rnd.choice(segments), rnd.choice(services))
+                rules.append(rule)
+                index.add_rule(rule[1], rule[2], rule[3])
+        fresh = ReachabilityIndex(segments, rules)
+        for svc in (None, "SSH", "SMB"):
+            self.assertTrue((index.closure(svc) == fresh.closure(svc)).all())
+
+    def test_closure_thousands_of_segments(self):
+        rnd = random.Random(1)
+        segments = [f"S{i}" for i in range(3000)]
+        rules = [("R", rnd.choice(segments), rnd.choice(segments), "SMB") for _ in range(6000)]
+        index = ReachabilityIndex(segments, rules)
+        start = time.perf_counter()
+        index.closure()
+        self.assertLess(time.perf_counter() - start, 3.0)
+
+    def test_analyze_risks_reports_transitive_access(self):
+        equipment = {seg: {"Server": 1} for seg in SEGMENTS}
+        risks = analyze_risks(SEGMENTS, GLOBAL_RULES, [], equipment)
+        self.assertIn("Сегмент 'Guest' достигает Finance по SMB через IT", risks)
+        self.assertIn("Сегмент 'Guest' транзитивно достигает HR через IT", risks)
+
+
+if __name__ == "__main__":
+    unittest.main()
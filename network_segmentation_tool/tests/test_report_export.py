@@ -0,0 +1,82 @@
+# tests/test_report_export.py
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from cli import EXIT_FINDINGS, main
+from report_export import EXPORT_TABLES, csv_paths, export_scenario, iter_export_rows, write_jsonl
+from risk_analyzer import analyze_risks_by_check
+from validation import iter_validation_errors
+
+SEGMENTS = ["HR", "IT", "Guest"]
+SUBNETS = {"HR": "192.168.1.0/24", "IT": "192.168.2.0/24", "Guest": "192.168.2.128/25"}
+GLOBAL_RULES = [("Admin", "HR", "IT", "SSH"), ("Web", "Guest", "IT", "HTTPS")]
+USER_RULES = [("HR", "Иванов И.И., ст. инженер", "Админ", "IT", "RDP")]
+EQUIPMENT = {"HR": {"Workstation": 5, "Printer": 0}, "IT": {"Server": 2}}
+
+
+class TestReportExport(unittest.TestCase):
+
+    def setUp(self):
+        self.errors = list(iter_validation_errors(SEGMENTS, SUBNETS, GLOBAL_RULES, USER_RULES))
+        self.risks = analyze_risks_by_check(SEGMENTS, GLOBAL_RULES, USER_RULES, EQUIPMENT)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rows(self):
+        return iter_export_rows(SEGMENTS, SUBNETS, GLOBAL_RULES, USER_RULES, EQUIPMENT, self.errors, self.risks)
+
+    def test_jsonl(self):
+        out = io.StringIO()
+        count = write_jsonl(out, self.rows())
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), count)
+        by_table = {}
+        for record in records:
+            table = record.pop("table")
+            self.assertEqual(tuple(record), EXPORT_TABLES[table])
+            by_table.setdefault(table, []).append(record)
+        self.assertEqual([r["segment"] for r in by_table["segments"]], SEGMENTS)
+        self.assertEqual(by_table["user_rules"][0]["user"], "Иванов И.И., ст. инженер")
+        self.assertEqual(by_table["equipment"], [{"segment": "HR", "equipment": "Workstation", "count": 5},
+                                                 {"segment": "IT", "equipment": "Server", "count": 2}])
+        self.assertEqual(len(by_table["validation_errors"]), len(self.errors))
+        self.assertTrue(by_table["validation_errors"])
+        self.assertEqual(len(by_table["risks"]), sum(len(w) for w in self.risks.values()))
+
+    def test_csv(self):
+        base = os.path.join(self.tmp.name, "model.csv")
+        paths = export_scenario(base, "csv", SEGMENTS, SUBNETS, GLOBAL_RULES, USER_RULES, EQUIPMENT,
+                                self.errors, self.risks)
+        self.assertEqual(paths, list(csv_paths(base).values()))
+        for table, path in csv_paths(base).items():
+            with open(path, encoding="utf-8", newline="") as f:
+                reader = csv.DictReader(f)
+                self.assertEqual(tuple(reader.fieldnames), EXPORT_TABLES[table])
+                rows = list(reader)
+            if table == "user_rules":
+                self.assertEqual(rows[0]["user"], "Иванов И.И., ст. инженер")
+            if table == "global_rules":
+                self.assertEqual([r["service"] for r in rows], ["SSH", "HTTPS"])
+
+    def test_cli_export(self):
+        scenario = os.path.join(self.tmp.name, "office.json")
+        with open(scenario, "w", encoding="utf-8") as f:
+            json.dump({"segments": SEGMENTS, "subnets": SUBNETS, "global_rules": GLOBAL_RULES,
+                       "user_rules": USER_RULES, "segment_equipment": EQUIPMENT}, f, ensure_ascii=False)
+        out_dir = os.path.join(self.tmp.name, "out")
+        code = main(["export", scenario, "--output-dir", out_dir])
+        self.assertEqual(code, EXIT_FINDINGS)  # подсети IT и Guest пересекаются
+        with open(os.path.join(out_dir, "office.jsonl"), encoding="utf-8") as f:
+            tables = {json.loads(line)["table"] for line in f}
+        self.assertEqual(tables, set(EXPORT_TABLES))
+        main(["export", scenario, "--output-dir", out_dir, "--export-format", "csv"])
+        self.assertTrue(os.path.exists(os.path.join(out_dir, "office.segments.csv")))
+
+
+if __name__ == '__main__':
+    unittest.main()
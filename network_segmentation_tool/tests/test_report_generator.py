@@ -1,6 +1,15 @@
 # tests/test_report_generator.py
+import io
+import json
+import os
+import re
+import tempfile
+import time
 import unittest
-from report_generator import generate_report
+from benchmark import generate_scenario
+from report_generator import (ChunkedWriter, generate_html_report, generate_report, generate_risk_report,
+                              generate_summary_report, write_full_report, write_html_report, write_report,
+                              write_summary_report)
 
 class TestReportGeneratorEdgeCases(unittest.TestCase):
 
@@ -34,6 +43,136 @@ class TestReportGeneratorEdgeCases(unittest.TestCase):
         self.assertIn("Ошибка 2", report)
 
 
+class TestReportWriters(unittest.TestCase):
+
+    def setUp(self):
+        s = generate_scenario(20, 200, 200, 20, seed=2)
+        self.args = (s["segments"], s["subnets"], s["global_rules"], s["user_rules"], s["segment_equipment"])
+
+    def expected(self):
+        segments, subnets, global_rules, user_rules, equipment = self.args
+        return (generate_report(*self.args, ["Ошибка"]) + "\n\n"
+                + generate_risk_report(segments, global_rules, user_rules, equipment))
+
+    def test_sinks_receive_same_text(self):
+        buffer = io.StringIO()
+        write_full_report(buffer, *self.args, ["Ошибка"])
+        self.assertEqual(buffer.getvalue(), self.expected())
+
+        chunks = []
+        sink = ChunkedWriter(chunks.append, chunk_size=1000)
+        write_full_report(sink, *self.args, ["Ошибка"])
+        sink.flush()
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) >= 1000 for chunk in chunks[:-1]))
+        self.assertEqual("".join(chunks), self.expected())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                write_full_report(f, *self.args, ["Ошибка"])
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), self.expected())
+
+    def test_callback_sink(self):
+        parts = []
+        write_report(parts.append, [], {}, [], [], {})
+        self.assertEqual("".join(parts), generate_report([], {}, [], [], {}))
+
+    def test_100k_user_rules_linear(self):
+        s = generate_scenario(100, 1000, 100000, 100, seed=1)
+        start = time.perf_counter()
+        write_report(io.StringIO(), s["segments"], s["subnets"], s["global_rules"], s["user_rules"],
+                     s["segment_equipment"])
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+
+class TestSummaryReport(unittest.TestCase):
+
+    SEGMENTS = ["HR", "IT", "Guest"]
+    GLOBAL_RULES = [("A", "HR", "IT", "SSH"), ("B", "HR", "IT", "HTTPS"), ("C", "Guest", "IT", "HTTPS")]
+    USER_RULES = [("HR", "Иванов", "Админ", "IT", "RDP"), ("HR", "Иванов", "Админ", "Guest", "RDP"),
+                  ("IT", "Петров", "Инженер", "HR", "SSH")]
+    EQUIPMENT = {"HR": {"PC": 3}, "IT": {"PC": 1, "Server": 2}}
+
+    def summary(self, **options):
+        return generate_summary_report(self.SEGMENTS, {"HR": "10.0.0.0/24"}, self.GLOBAL_RULES, self.USER_RULES,
+                                       self.EQUIPMENT, **options)
+
+    def test_counters(self):
+        report = self.summary(top_n=1)
+        self.assertIn("Глобальных правил: 3, правил для пользователей: 3, пользователей: 2", report)
+        self.assertIn(" - HR: 2 / 2 / 1\n", report)
+        self.assertIn(" - IT: 0 / 1 / 4\n", report)
+        self.assertIn(" - HTTPS: 2\n", report)
+        self.assertIn(" - Иванов: 2\n", report)
+        self.assertNotIn("Петров", report)  # только топ-1
+        self.assertIn("   HR        0     3     1\n", report)  # HR → IT: SSH, HTTPS, RDP
+        self.assertIn(" - HR → IT: HTTPS, RDP, SSH\n - ... и ещё пар сегментов: 3\n", report)
+        self.assertIn(" - PC: 4 шт.\n - Server: 2 шт.\n", report)
+        self.assertNotIn("стр.", report)
+
+    def test_paginated_details(self):
+        report = self.summary(details=True, page=2, page_size=2)
+        self.assertIn("Глобальные правила взаимодействия (стр. 2 из 2, всего 3):\n - [C] Guest → IT : HTTPS\n", report)
+        self.assertIn("Правила для пользователей (стр. 2 из 2, всего 3):\n - Петров (Инженер, сегмент IT) → HR : SSH\n",
+                      report)
+        self.assertIn("(стр. 2 из 2", self.summary(details=True, page=99, page_size=2))
+        orphan = generate_summary_report([], {}, [("a", "X", "Y", "SSH")], [], {})
+        self.assertIn(" - X → Y: SSH\n", orphan)
+        empty = generate_summary_report([], {}, [], [], {}, details=True)
+        self.assertIn("Правила для пользователей (стр. 1 из 1, всего 0):\n - Нет.\n", empty)
+
+    def test_one_shot_iterators(self):
+        for options in ({}, {"details": True, "page": 2, "page_size": 2}):
+            report = generate_summary_report(iter(self.SEGMENTS), {"HR": "10.0.0.0/24"}, iter(self.GLOBAL_RULES),
+                                             (rule for rule in self.USER_RULES), self.EQUIPMENT, **options)
+            self.assertEqual(report, self.summary(**options))
+
+    def test_large_model_is_fast(self):
+        s = generate_scenario(200, 1000, 300000, 200, seed=1)
+        start = time.perf_counter()
+        write_summary_report(io.StringIO(), s["segments"], s["subnets"], s["global_rules"], s["user_rules"],
+                             s["segment_equipment"], details=True, page=5)
+        self.assertLess(time.perf_counter() - start, 3.0)
+
+
+class TestHtmlReport(unittest.TestCase):
+
+    SEGMENTS = ["HR", "IT", "Guest"]
+    GLOBAL_RULES = [("A", "Guest", "IT", "SSH"), ("B", "HR", "IT", "HTTPS")]
+    USER_RULES = [("HR", "Иванов </script><b>", "Админ", "IT", "RDP")]
+
+    def tables(self, report):
+        blobs = re.findall(r'<script type="application/json" id="([\w-]+)">(.*?)</script>', report, re.S)
+        return {table_id: json.loads(blob) for table_id, blob in blobs}
+
+    def test_tables_are_json_blobs(self):
+        report = generate_html_report(self.SEGMENTS, {"HR": "10.0.0.0/24"}, self.GLOBAL_RULES, self.USER_RULES,
+                                      {"HR": {"PC": 3}}, ["Ошибка <1>"], diagram_png=b"\x89PNG")
+        tables = self.tables(report)
+        self.assertEqual(tables["global-rules"], [list(rule) for rule in self.GLOBAL_RULES])
+        self.assertEqual(tables["user-rules"], [list(rule) for rule in self.USER_RULES])
+        self.assertEqual(tables["segments"][1], ["IT", "не задано"])
+        self.assertEqual(tables["equipment"], [["HR", "PC", 3]])
+        self.assertTrue(any("SSH" in row[0] for row in tables["risks"]))
+        self.assertIn("<li>Ошибка &lt;1&gt;</li>", report)
+        self.assertIn('src="data:image/png;base64,iVBORw=="', report)
+        self.assertNotIn("<b>", report)
+        self.assertNotRegex(report, r'(src|href)="https?:')  # без обращений к сети
+
+    def test_large_model_streams(self):
+        s = generate_scenario(100, 1000, 200000, 100, seed=1)
+        parts = []
+        start = time.perf_counter()
+        write_html_report(parts.append, s["segments"], s["subnets"], s["global_rules"], s["user_rules"],
+                          s["segment_equipment"])
+        self.assertLess(time.perf_counter() - start, 10.0)
+        report = "".join(parts)
+        self.assertLess(report.count("<tr>"), 30)  # в разметке только топ-списки, правила — в JSON
+        self.assertEqual(len(self.tables(report)["user-rules"]), 200000)
+
+
 if __name__ == '__main__':
     unittest.main()
 
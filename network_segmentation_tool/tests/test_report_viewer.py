@@ -0,0 +1,110 @@
+# tests/test_report_viewer.py
+import os
+import tempfile
+import time
+import unittest
+from report_generator import generate_report, generate_risk_report, write_full_report
+import report_viewer
+from report_viewer import ReportBuffer
+
+SEGMENTS = ["HR", "IT"]
+SUBNETS = {"HR": "192.168.1.0/24", "IT": "192.168.2.0/24"}
+GLOBAL_RULES = [("Admin", "HR", "IT", "SSH")]
+USER_RULES = [("HR", "Иванов И.И.", "Админ", "IT", "RDP")]
+
+
+class TestReportBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.text = (generate_report(SEGMENTS, SUBNETS, GLOBAL_RULES, USER_RULES, {}) + "\n\n"
+                     + generate_risk_report(SEGMENTS, GLOBAL_RULES, USER_RULES, {}))
+        self.buffer = ReportBuffer.from_chunks([self.text])
+
+    def test_lines_match_splitlines(self):
+        expected = self.text.splitlines()
+        self.assertEqual(len(self.buffer), len(expected))
+        self.assertEqual(self.buffer.lines(0, len(self.buffer)), expected)
+        self.assertEqual([self.buffer.line(i) for i in range(len(expected))], expected)
+        self.assertEqual(self.buffer.lines(3, 5), expected[3:5])
+        self.assertEqual(self.buffer.lines(len(expected), len(expected) + 10), [])
+        self.assertEqual(len(ReportBuffer(b"")), 0)
+        self.assertEqual(ReportBuffer(b"a\n\nb").lines(0, 5), ["a", "", "b"])
+
+    def test_sections_and_search(self):
+        titles = [title for _, title in self.buffer.sections()]
+        self.assertEqual(titles[0], "=== Отчёт по сегментации локальной сети ===")
+        self.assertIn("Правила для пользователей:", titles)
+        self.assertIn("=== Отчёт о потенциальных рисках и сложностях ===", titles)
+        for line, title in self.buffer.sections():
+            self.assertEqual(self.buffer.line(line), title)
+
+        first = self.buffer.find("иванов")  # без учёта регистра
+        self.assertIn("Иванов", self.buffer.line(first))
+        second = self.buffer.find("иванов", first + 1)
+        self.assertGreater(second, first)
+        self.assertEqual(self.buffer.find("иванов", first, backward=True), self.buffer.find("иванов", 0, backward=True))
+        self.assertIsNone(self.buffer.find("нет такого текста"))
+        self.assertIsNone(self.buffer.find(""))
+
+    def test_file_backed_buffer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.text)
+            buffer = ReportBuffer.from_file(path)
+            self.assertEqual(buffer.lines(0, len(buffer)), self.text.splitlines())
+            self.assertEqual(buffer.sections(), self.buffer.sections())
+            copy_path = os.path.join(tmp, "copy.txt")
+            with open(copy_path, "wb") as f:
+                buffer.write_to(f)
+            with open(copy_path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), self.text)
+            buffer.close()
+            empty = os.path.join(tmp, "empty.txt")
+            open(empty, "w").close()
+            self.assertEqual(len(ReportBuffer.from_file(empty)), 0)
+
+    def test_buffer_from_writer(self):
+        buffer = ReportBuffer.from_writer(
+            lambda out: write_full_report(out, SEGMENTS, SUBNETS, GLOBAL_RULES, USER_RULES, {}))
+        self.assertEqual(buffer.lines(0, len(buffer)), self.text.splitlines())
+        self.assertEqual(buffer.sections(), self.buffer.sections())
+        buffer.close()
+        self.assertEqual(len(ReportBuffer.from_writer(lambda out: None)), 0)
+
+    def test_search_windows(self):
+        lines = self.text.splitlines()
+
+        def expected(query, line, backward):
+            order = list(range(line - 1, -1, -1)) + list(range(len(lines) - 1, line - 1, -1)) if backward \
+                else list(range(line, len(lines))) + list(range(line))
+            return next((i for i in order if query.lower() in lines[i].lower()), None)
+
+        saved = report_viewer.SEARCH_WINDOW
+        report_viewer.SEARCH_WINDOW = 64  # много маленьких окон
+        try:
+            for query in ("ИВАНОВ", "ssh", "===", "→ it"):
+                for line in range(len(lines)):
+                    for backward in (False, True):
+                        self.assertEqual(self.buffer.find(query, line, backward), expected(query, line, backward),
+                                         (query, line, backward))
+        finally:
+            report_viewer.SEARCH_WINDOW = saved
+
+    def test_million_lines(self):
+        chunks = ["=== Отчёт ===\n", "Правила для пользователей:\n"]
+        chunks.extend(f" - Пользователь{i} (Инженер, сегмент S{i % 100}) → S{i % 7} : SSH\n" for i in range(1000000))
+        start = time.perf_counter()
+        buffer = ReportBuffer.from_chunks(chunks)
+        window = buffer.lines(600000, 600040)
+        line = buffer.find("пользователь999999")
+        sections = buffer.sections()
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertEqual(len(buffer), 1000002)
+        self.assertEqual(window[0], chunks[600000].rstrip("\n"))
+        self.assertEqual(line, 1000001)
+        self.assertEqual([i for i, _ in sections], [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
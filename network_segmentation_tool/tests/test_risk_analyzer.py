@@ -1,6 +1,10 @@
 # tests/test_risk_analyzer.py
+import json
+import os
+import tempfile
 import unittest
-from risk_analyzer import analyze_risks
+from risk_analyzer import (GLOBAL_RULE, RISK_CHECKS, RiskCheck, analyze_risks, load_policy, merge_policy,
+                           register_check, score_risks)
 
 class TestRiskAnalyzerEdgeCases(unittest.TestCase):
 
@@ -37,6 +41,103 @@ class TestRiskAnalyzerEdgeCases(unittest.TestCase):
             )
 
 
+
+
+class TestRiskRuleEngine(unittest.TestCase):
+
+    SEGMENTS = ["HR", "IT"]
+    RULES = [("R1", "HR", "IT", "SSH"), ("R2", "HR", "IT", "HTTPS")]
+    EQUIPMENT = {"HR": {"Workstation": 1}, "IT": {}}
+
+    def test_policy_overrides_and_disables_checks(self):
+        policy = {"checks": {"empty_segments": {"enabled": False},
+                             "dangerous_services": {"ports": {"HTTPS": 443}}}}
+        risks = analyze_risks(self.SEGMENTS, self.RULES, [], self.EQUIPMENT, policy)
+        self.assertEqual(risks, ["Глобальное правило 'R2': открыт опасный сервис HTTPS (443) между HR и IT"])
+
+    def test_port_ranges_checked_against_danger_list(self):
+        policy = {"checks": {"empty_segments": {"enabled": False}},
+                  "services": {"NetBIOS": "TCP 137-139"}}
+        rules = [("Any", "HR", "IT", "TCP 1-65535"), ("Web", "HR", "IT", "TCP 80,443"), ("Ssh", "HR", "IT", "22")]
+        users = [("HR", "Иван", "Админ", "IT", "TCP 3000-4000"), ("HR", "Иван", "Админ", "IT", "NetBIOS")]
+        policy["checks"]["dangerous_services"] = {"ports": {"SSH": 22, "RDP": 3389, "NetBIOS": "TCP 137-139"}}
+        risks = analyze_risks(self.SEGMENTS, rules, users, self.EQUIPMENT, policy)
+        self.assertEqual(risks, [
+            "Глобальное правило 'Any': TCP 1-65535 открывает опасные сервисы SSH (22), RDP (3389), "
+            "NetBIOS (TCP 137-139) между HR и IT",
+            "Глобальное правило 'Ssh': 22 открывает опасные сервисы SSH (22) между HR и IT",
+            "Пользователь 'Иван' имеет доступ к опасным сервисам RDP (TCP 3000-4000) в сегменте IT",
+            "Пользователь 'Иван' имеет доступ к опасному сервису NetBIOS в сегменте IT",
+        ])
+        scores = score_risks(self.SEGMENTS, rules, users, self.EQUIPMENT, policy)
+        self.assertEqual(scores.components["dangerous"][scores.segments.index("IT")], 4)
+
+    def test_policy_file_and_unknown_check(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "policy.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"guest_marker": "hr", "checks": {"excessive_services": {"max_services": 1}}}, f)
+            policy = load_policy(path)
+        self.assertEqual(policy["checks"]["excessive_services"]["max_services"], 1)
+        risks = analyze_risks(self.SEGMENTS, self.RULES, [], self.EQUIPMENT, policy)
+        self.assertTrue(any("ненадёжного сегмента 'HR'" in r for r in risks))
+        self.assertTrue(any("разрешено 2 сервисов" in r for r in risks))
+        with self.assertRaises(ValueError):
+            merge_policy({"checks": {"no_such_check": {}}})
+
+    def test_registered_check_runs_in_single_pass(self):
+        @register_check
+        class CountCheck(RiskCheck):
+            name = "count_rules"
+            consumes = (GLOBAL_RULE,)
+
+            def global_rule(self, rule):
+                self.warnings.append(rule[0])
+
+        passes = []
+
+        def stream(rules):
+            passes.append(1)
+            yield from rules
+
+        try:
+            risks = analyze_risks(self.SEGMENTS, stream(self.RULES), stream([]), self.EQUIPMENT)
+        finally:
+            del RISK_CHECKS["count_rules"]
+        self.assertEqual(risks[-2:], ["R1", "R2"])
+        self.assertEqual(len(passes), 2)  # генераторы правил прочитаны по одному разу
+
+
+
+class TestRiskScoring(unittest.TestCase):
+
+    SEGMENTS = ["Guest", "IT", "Finance", "HR"]
+    RULES = [("Web", "Guest", "IT", "HTTPS"), ("Share", "IT", "Finance", "SMB"), ("Admin", "IT", "Finance", "SSH")]
+    EQUIPMENT = {"Finance": {"Server": 3}, "IT": {"Workstation": 10}}
+
+    def test_components_and_ranking(self):
+        scores = score_risks(self.SEGMENTS, self.RULES, [("HR", "Иван", "Админ", "IT", "RDP")], self.EQUIPMENT)
+        finance = scores.segments.index("Finance")
+        it = scores.segments.index("IT")
+        self.assertEqual(scores.components["dangerous"][finance], 2)
+        self.assertEqual(scores.components["fan_in"][it], 2)        # Guest и HR
+        self.assertEqual(scores.components["untrusted"][it], 1)
+        self.assertEqual(scores.components["transitive"][finance], 1)
+        self.assertEqual(scores.segment_score("HR"), 0)
+        self.assertEqual([seg for seg, _ in scores.top_segments(2)], ["IT", "Finance"])
+        self.assertEqual(scores.top_pairs(1)[0][:2], ("IT", "Finance"))
+        self.assertEqual(len(scores.top_pairs(10)), 3)
+
+    def test_policy_weights(self):
+        policy = {"scoring": {"weights": {"fan_in": 0.0, "untrusted": 0.0, "transitive": 0.0}}}
+        scores = score_risks(self.SEGMENTS, self.RULES, [], {}, policy)
+        self.assertEqual(scores.top_segments(1), [("Finance", 6.0)])  # 2 опасных правила × 3.0
+
+    def test_empty_model(self):
+        scores = score_risks([], [], [], {})
+        self.assertEqual(scores.top_segments(5), [])
+        self.assertEqual(scores.top_pairs(5), [])
+
+
 if __name__ == '__main__':
     unittest.main()
-
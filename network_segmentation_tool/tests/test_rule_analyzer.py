@@ -0,0 +1,74 @@
+# tests/test_rule_analyzer.py
+import time
+import unittest
+from rule_analyzer import (CONTRADICTORY, REDUNDANT, SHADOWED, RuleConflict, RuleIndex,
+                           find_user_conflicts, service_key)
+from services import ServiceSpec
+
+class TestRuleAnalyzer(unittest.TestCase):
+
+    def test_service_key(self):
+        self.assertEqual(service_key("HTTPS"), 443)
+        self.assertEqual(service_key("443"), 443)
+        self.assertEqual(service_key("Custom"), "Custom")
+        self.assertEqual(service_key("TCP 22"), 22)
+        self.assertEqual(service_key("tcp 1-1024"), ServiceSpec("TCP", ((1, 1024),)))
+
+    def test_port_ranges_overlap(self):
+        rules = [("SSH", "HR", "IT", "SSH"), ("Low", "HR", "IT", "TCP 1-1024"), ("Web", "HR", "IT", "HTTPS"),
+                 ("Other", "IT", "HR", "TCP 1-1024"), ("Dns", "HR", "IT", "UDP 53")]
+        index = RuleIndex(rules)
+        self.assertEqual(index.conflicts, [RuleConflict(SHADOWED, "global", 1, 0), RuleConflict(SHADOWED, "global", 2, 1)])
+        self.assertEqual(index.covering_rule("HR", "IT", "TCP 20-25"), 1)
+        self.assertEqual(index.covering_rule("HR", "IT", "SSH"), 0)
+        self.assertIsNone(index.covering_rule("HR", "IT", "TCP 1000-2000"))
+        user_rules = [("HR", "Иван", "Админ", "IT", "TCP 8000-9000"), ("HR", "Иван", "Админ", "IT", "8080"),
+                      ("HR", "Иван", "Админ", "IT", "RDP")]
+        self.assertEqual(find_user_conflicts(user_rules, index), [RuleConflict(SHADOWED, "user", 1, 0)])
+
+    def test_shadowed_by_same_port(self):
+        rules = [("Web", "HR", "IT", "HTTPS"), ("Web443", "HR", "IT", "443"), ("Other", "IT", "HR", "443")]
+        self.assertEqual(RuleIndex(rules).conflicts, [RuleConflict(SHADOWED, "global", 1, 0)])
+
+    def test_exact_duplicate_is_not_shadowing(self):
+        rules = [("R1", "HR", "IT", "Custom"), ("R2", "HR", "IT", "Custom")]
+        self.assertEqual(RuleIndex(rules).conflicts, [])
+
+    def test_contradictory_rule_name(self):
+        rules = [("R1", "HR", "IT", "SSH"), ("R1", "HR", "Finance", "SSH")]
+        self.assertEqual(RuleIndex(rules).conflicts, [RuleConflict(CONTRADICTORY, "global", 1, 0)])
+
+    def test_rules_as_lists(self):
+        # Правила из JSON-сценариев приходят списками, а не кортежами
+        rules = [["R1", "HR", "IT", "SSH"], ["R1", "HR", "IT", "SSH"]]
+        self.assertEqual(RuleIndex(rules).conflicts, [])
+
+    def test_user_conflicts(self):
+        index = RuleIndex([("R1", "HR", "IT", "SSH")])
+        user_rules = [
+            ("HR", "Иван", "Админ", "IT", "SSH"),       # покрыто R1
+            ("HR", "Пётр", "Бухгалтер", "IT", "HTTPS"),
+            ("HR", "Пётр", "Бухгалтер", "IT", "443"),   # тот же порт
+            ("HR", "Пётр", "Кассир", "Finance", "DNS"),  # другая должность
+        ]
+        self.assertEqual(find_user_conflicts(user_rules, index), [
+            RuleConflict(REDUNDANT, "user", 0, 0),
+            RuleConflict(SHADOWED, "user", 2, 1),
+            RuleConflict(CONTRADICTORY, "user", 3, 1),
+        ])
+
+    def test_100k_rules_near_linear(self):
+        segments = [f"S{i}" for i in range(300)]
+        services = ["HTTP", "HTTPS", "SSH", "RDP", "SMB", "DNS", "LDAP", "Custom"]
+        global_rules = [(f"R{i}", segments[i % 300], segments[i * 7 % 300], services[i % 8])
+                        for i in range(100000)]
+        user_rules = [(segments[i % 300], f"User{i % 5000}", "Инженер", segments[i * 11 % 300], services[i % 7])
+                      for i in range(100000)]
+        start = time.perf_counter()
+        index = RuleIndex(global_rules)
+        find_user_conflicts(user_rules, index)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+# tests/test_scenario_diff.py
+import copy
+import random
+import time
+import unittest
+from collections import Counter
+from benchmark import generate_scenario
+from risk_analyzer import analyze_risks
+from scenario_diff import delta_risks, diff_scenarios, format_diff_report
+
+OLD = {
+    "segments": ["HR", "IT", "Guest"],
+    "subnets": {"HR": "10.0.0.0/24", "IT": "10.0.1.0/24", "Guest": "10.0.2.0/24"},
+    "global_rules": [["Web", "HR", "IT", "HTTPS"], ["Admin", "IT", "HR", "SSH"]],
+    "user_rules": [["HR", "Иван", "Бухгалтер", "IT", "SMB"]],
+    "segment_equipment": {"HR": {"Workstation": 5}, "IT": {"Server": 2}, "Guest": {"Printer": 1}},
+}
+
+
+def _full_delta(old, new):
+    def risks(s):
+        return Counter(analyze_risks(s["segments"], s["global_rules"], s["user_rules"], s["segment_equipment"]))
+    before, after = risks(old), risks(new)
+    return after - before, before - after
+
+
+def _random_edit(rnd, old, seed):
+    """Случайная правка: правила, оборудование, новые и удалённые сегменты, смена Guest-сегмента."""
+    new = copy.deepcopy(old)
+    segments = new["segments"]
+    for _ in range(rnd.randint(1, 4)):
+        op = rnd.randrange(8)
+        if op == 0 and new["global_rules"]:
+            new["global_rules"].pop(rnd.randrange(len(new["global_rules"])))
+        elif op == 1:
+            new["global_rules"].append([f"N{seed}", rnd.choice(segments), rnd.choice(segments),
+                                        rnd.choice(["SSH", "SMB", "HTTP", "RDP", "TCP 1-1024"])])
+        elif op == 2 and new["global_rules"]:
+            k = rnd.randrange(len(new["global_rules"]))
+            new["global_rules"][k] = new["global_rules"][k][:3] + [rnd.choice(["SSH", "HTTPS", "RDP"])]
+        elif op == 3 and new["user_rules"]:
+            new["user_rules"].pop(rnd.randrange(len(new["user_rules"])))
+        elif op == 4:
+            seg = rnd.choice(["Guest2", "Lab", "Guest WiFi"])
+            if seg not in segments:
+                segments.insert(rnd.randrange(len(segments) + 1), seg)
+                new["global_rules"].append([f"G{seed}", seg, rnd.choice(segments), rnd.choice(["SSH", "SMB"])])
+        elif op == 5 and len(segments) > 2:
+            segments.remove(rnd.choice(segments))
+        elif op == 6:
+            rnd.shuffle(segments)
+        else:
+            new["segment_equipment"][rnd.choice(segments)] = {}
+    return new
+
+
+class TestScenarioDiff(unittest.TestCase):
+
+    def test_diff_parts(self):
+        new = copy.deepcopy(OLD)
+        new["segments"].append("Finance")
+        new["subnets"]["Finance"] = "10.0.3.0/24"
+        new["subnets"]["IT"] = "10.0.5.0/24"
+        new["global_rules"][1] = ["Admin", "IT", "HR", "RDP"]
+        new["global_rules"].append(["Guest Web", "Guest", "IT", "HTTPS"])
+        new["user_rules"] = [["HR", "Иван", "Главбух", "IT", "SMB"], ["IT", "Пётр", "Админ", "HR", "SSH"]]
+        new["segment_equipment"]["IT"] = {"Server": 3}
+        diff = diff_scenarios(OLD, new)
+        self.assertEqual(diff.segments_added, ["Finance"])
+        self.assertEqual(diff.subnets_added, [("Finance", "10.0.3.0/24")])
+        self.assertEqual(diff.subnets_changed, [("IT", "10.0.1.0/24", "10.0.5.0/24")])
+        self.assertEqual(diff.global_rules_changed, [(("Admin", "IT", "HR", "SSH"), ("Admin", "IT", "HR", "RDP"))])
+        self.assertEqual(diff.global_rules_added, [("Guest Web", "Guest", "IT", "HTTPS")])
+        self.assertEqual(len(diff.user_rules_changed), 1)
+        self.assertEqual(diff.users_added, ["Пётр"])
+        self.assertEqual(diff.equipment_changed, [("IT", "Server", 2, 3)])
+
+        new_risks, resolved = delta_risks(OLD, new, diff)
+        self.assertIn("️Глобальный доступ из ненадёжного сегмента 'Guest' к IT по HTTPS", new_risks)
+        self.assertIn("Глобальное правило 'Admin': открыт опасный сервис SSH (22) между IT и HR", resolved)
+        report = format_diff_report(diff, new_risks, resolved)
+        self.assertIn("Новые риски:", report)
+        self.assertIn("~ IT: 10.0.1.0/24 → 10.0.5.0/24", report)
+
+    def test_identical_scenarios(self):
+        diff = diff_scenarios(OLD, dict(OLD, saved_at="2025-01-01"))
+        self.assertTrue(diff.is_empty())
+        self.assertEqual(delta_risks(OLD, OLD, diff), ([], []))
+        self.assertIn("не различаются", format_diff_report(diff))
+
+    def test_delta_matches_full_reanalysis(self):
+        for seed in range(20):
+            rnd = random.Random(seed)
+            old = generate_scenario(10, 40, 40, 15, seed=seed)
+            new = copy.deepcopy(old)
+            segments = new["segments"]
+            for _ in range(rnd.randint(1, 4)):
+                op = rnd.randrange(4)
+                if op == 0:
+                    new["global_rules"].pop(rnd.randrange(len(new["global_rules"])))
+                elif op == 1:
+                    new["global_rules"].append([f"N{seed}", rnd.choice(segments), rnd.choice(segments),
+                                                rnd.choice(["SSH", "SMB", "HTTP", "RDP"])])
+                elif op == 2:
+                    new["user_rules"].pop(rnd.randrange(len(new["user_rules"])))
+                else:
+                    new["segment_equipment"][rnd.choice(segments)] = {}
+            expected_new, expected_resolved = _full_delta(old, new)
+            new_risks, resolved = delta_risks(old, new)
+            self.assertEqual(Counter(new_risks), expected_new, seed)
+            self.assertEqual(Counter(resolved), expected_resolved, seed)
+
+    def test_random_edits_match_full_reanalysis(self):
+        for seed in range(300):
+            rnd = random.Random(seed)
+            old = generate_scenario(8, 30, 20, 8, seed=seed)
+            new = _random_edit(rnd, old, seed)
+            expected_new, expected_resolved = _full_delta(old, new)
+            new_risks, resolved = delta_risks(old, new)
+            self.assertEqual(Counter(new_risks), expected_new, seed)
+            self.assertEqual(Counter(resolved), expected_resolved, seed)
+
+    def test_guest_segment_change(self):
+        new = copy.deepcopy(OLD)
+        new["segments"].insert(0, "Guest2")
+        new["global_rules"].append(["Guest Web", "Guest", "IT", "HTTPS"])
+        for variant in (new, dict(new, segments=["Guest", "HR", "IT", "Guest2"])):
+            expected_new, expected_resolved = _full_delta(OLD, variant)
+            new_risks, resolved = delta_risks(OLD, variant)
+            self.assertEqual(Counter(new_risks), expected_new)
+            self.assertEqual(Counter(resolved), expected_resolved)
+        # Только перестановка сегментов меняет Guest-сегмент
+        reordered = dict(new, segments=["Guest", "HR", "IT", "Guest2"])
+        new_risks, resolved = delta_risks(new, reordered)
+        self.assertIn("️Глобальный доступ из ненадёжного сегмента 'Guest' к IT по HTTPS", new_risks)
+        self.assertEqual((Counter(new_risks), Counter(resolved)), _full_delta(new, reordered))
+
+    def test_via_follows_new_segment_order(self):
+        # Guest → HR → IT и Guest → Ops → IT: промежуточный сегмент зависит от порядка сегментов
+        old = copy.deepcopy(OLD)
+        old["segments"].append("Ops")
+        old["global_rules"] += [["G1", "Guest", "Ops", "HTTPS"], ["G2", "Guest", "HR", "HTTPS"],
+                                ["O1", "Ops", "IT", "HTTPS"]]
+        new = copy.deepcopy(old)
+        new["segments"] = ["Ops", "HR", "IT", "Guest"]
+        new["segments"].remove("HR")  # HR остаётся в модели только через правила
+        new["global_rules"].append(["Tmp", "Guest", "Ops", "SMB"])
+        expected_new, expected_resolved = _full_delta(old, new)
+        self.assertIn("Сегмент 'Guest' транзитивно достигает IT через Ops", expected_new)
+        new_risks, resolved = delta_risks(old, new)
+        self.assertEqual(Counter(new_risks), expected_new)
+        self.assertEqual(Counter(resolved), expected_resolved)
+
+    def test_transitive_delta_incremental(self):
+        old = copy.deepcopy(OLD)
+        old["global_rules"].append(["Guest Web", "Guest", "HR", "HTTPS"])
+        variants = []
+        new = copy.deepcopy(old)
+        new["global_rules"][0] = ["Web", "HR", "IT", "SSH"]  # изменённое правило
+        variants.append(new)
+        new = copy.deepcopy(old)
+        new["segments"].append("DMZ")
+        new["global_rules"].append(["Pub", "IT", "DMZ", "RDP"])
+        new["user_rules"][0] = ["HR", "Иван", "Бухгалтер", "IT", "RDP"]
+        variants.append(new)
+        new = copy.deepcopy(old)
+        new["segments"].remove("IT")
+        new["global_rules"] = [r for r in new["global_rules"] if "IT" not in r[1:3]]
+        new["user_rules"] = []
+        variants.append(new)
+        new = copy.deepcopy(old)
+        new["segments"].remove("Guest")  # ненадёжного сегмента больше нет
+        new["global_rules"].pop()
+        variants.append(new)
+        for i, new in enumerate(variants):
+            expected_new, expected_resolved = _full_delta(old, new)
+            new_risks, resolved = delta_risks(old, new)
+            self.assertEqual(Counter(new_risks), expected_new, i)
+            self.assertEqual(Counter(resolved), expected_resolved, i)
+        self.assertTrue(any("транзитивно" in r or "через" in r for r in delta_risks(old, variants[1])[0]))
+
+    def test_large_scenarios(self):
+        old = generate_scenario(200, 100000, 100000, 200, seed=1)
+        new = copy.deepcopy(old)
+        new["global_rules"].pop(5)
+        new["global_rules"].append(["Z", "Guest", "Seg7", "SMB"])
+        start = time.perf_counter()
+        diff = diff_scenarios(old, new)
+        new_risks, _ = delta_risks(old, new, diff)
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertEqual(diff.global_rules_added, [("Z", "Guest", "Seg7", "SMB")])
+        self.assertIn("Глобальное правило 'Z': открыт опасный сервис SMB (445) между Guest и Seg7", new_risks)
+
+
+if __name__ == "__main__":
+    unittest.main()
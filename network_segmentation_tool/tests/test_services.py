@@ -0,0 +1,68 @@
+# tests/test_services.py
+import random
+import time
+import unittest
+from services import (IntervalIndex, ServiceCatalog, ServiceSpec, format_spec, parse_port_spec, resolve_service,
+                      spec_contains, specs_overlap)
+
+
+class TestServices(unittest.TestCase):
+
+    def test_parse_port_spec(self):
+        self.assertEqual(parse_port_spec("8080"), ServiceSpec("TCP", ((8080, 8080),)))
+        self.assertEqual(parse_port_spec("udp 53"), ServiceSpec("UDP", ((53, 53),)))
+        self.assertEqual(parse_port_spec("TCP 8000-8100, 80,443,81"),
+                         ServiceSpec("TCP", ((80, 81), (443, 443), (8000, 8100))))
+        self.assertEqual(format_spec(parse_port_spec("tcp/1-1024")), "TCP 1-1024")
+        for text in ("Custom", "SSH", "TCP 70000", "TCP 20-10", ""):
+            self.assertIsNone(parse_port_spec(text), text)
+
+    def test_resolve_service(self):
+        self.assertEqual(resolve_service("SSH"), ServiceSpec("TCP", ((22, 22),)))
+        self.assertIsNone(resolve_service("Custom"))
+        self.assertEqual(resolve_service("IPsec", {"IPsec": "UDP 500,4500"}), ServiceSpec("UDP", ((500, 500), (4500, 4500))))
+
+    def test_overlap_and_containment(self):
+        wide = parse_port_spec("TCP 1-1024")
+        self.assertTrue(specs_overlap(wide, parse_port_spec("TCP 1000-2000")))
+        self.assertFalse(specs_overlap(wide, parse_port_spec("UDP 53")))
+        self.assertTrue(spec_contains(wide, parse_port_spec("TCP 22,80")))
+        self.assertFalse(spec_contains(wide, parse_port_spec("TCP 1000-2000")))
+
+    def test_interval_index_matches_scan(self):
+        rnd = random.Random(4)
+        intervals = []
+        for k in range(500):
+            first = rnd.randrange(65536)
+            intervals.append((first, min(65535, first + rnd.randrange(2000)), k))
+        index = IntervalIndex(intervals)
+        for _ in range(200):
+            first = rnd.randrange(65536)
+            last = min(65535, first + rnd.randrange(500))
+            self.assertEqual(sorted(index.overlapping(first, last)),
+                             sorted(k for a, b, k in intervals if a <= last and first <= b))
+            self.assertEqual(sorted(index.containing(first, last)),
+                             sorted(k for a, b, k in intervals if a <= first and last <= b))
+        self.assertEqual(IntervalIndex([]).overlapping(0, 65535), [])
+
+    def test_catalog_matching(self):
+        catalog = ServiceCatalog({"SSH": 22, "RDP": 3389, "NetBIOS": "TCP 137-139"})
+        self.assertEqual(catalog.matching("TCP 1-65535"), ["SSH", "RDP", "NetBIOS"])
+        self.assertEqual(catalog.matching("138"), ["NetBIOS"])
+        self.assertEqual(catalog.matching("HTTPS"), [])
+        self.assertEqual(catalog.matching("Custom"), [])
+        self.assertEqual(catalog.describe("NetBIOS"), "TCP 137-139")
+
+    def test_catalog_with_thousands_of_services(self):
+        services = {f"App{k}": f"TCP {10000 + k * 10}-{10000 + k * 10 + 4}" for k in range(5000)}
+        catalog = ServiceCatalog(services)
+        start = time.perf_counter()
+        for k in range(2000):
+            catalog.matching(f"TCP {10000 + k * 25}-{10000 + k * 25 + 30}")
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertEqual(len(catalog.matching("TCP 1-65535")), 5000)
+        self.assertEqual(catalog.matching("TCP 10012-10021"), ["App1", "App2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
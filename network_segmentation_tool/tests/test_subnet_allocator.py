@@ -0,0 +1,56 @@
+# tests/test_subnet_allocator.py
+import ipaddress
+import unittest
+from subnet_allocator import SubnetAllocator
+
+class TestSubnetAllocator(unittest.TestCase):
+
+    def test_sequential_allocation_matches_old_order(self):
+        alloc = SubnetAllocator("10.0.0.0/16")
+        nets = [str(alloc.allocate(24)) for _ in range(3)]
+        self.assertEqual(nets, ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24"])
+
+    def test_released_block_is_reused_first(self):
+        alloc = SubnetAllocator("10.0.0.0/16")
+        for _ in range(3):
+            alloc.allocate(24)
+        self.assertTrue(alloc.release("10.0.1.0/24"))
+        self.assertEqual(str(alloc.allocate(24)), "10.0.1.0/24")
+
+    def test_release_coalesces_whole_range(self):
+        alloc = SubnetAllocator("192.168.0.0/16")
+        nets = [alloc.allocate(p) for p in (24, 26, 20, 30)]
+        for net in nets:
+            self.assertTrue(alloc.release(net))
+        self.assertEqual(alloc.free_blocks(), [ipaddress.ip_network("192.168.0.0/16")])
+
+    def test_reserve_skips_taken_blocks(self):
+        alloc = SubnetAllocator("10.0.0.0/16")
+        self.assertTrue(alloc.reserve("10.0.0.0/24"))
+        self.assertFalse(alloc.reserve("10.0.0.0/25"))      # уже занято
+        self.assertFalse(alloc.reserve("172.16.0.0/24"))    # вне диапазона
+        self.assertFalse(alloc.reserve("не сеть"))
+        self.assertEqual(str(alloc.allocate(24)), "10.0.1.0/24")
+
+    def test_exhaustion_and_unknown_release(self):
+        alloc = SubnetAllocator("10.0.0.0/23")
+        self.assertIsNotNone(alloc.allocate(24))
+        self.assertIsNotNone(alloc.allocate(24))
+        self.assertIsNone(alloc.allocate(24))
+        self.assertFalse(alloc.release("10.0.5.0/24"))
+        self.assertEqual(alloc.free_addresses(), 0)
+
+    def test_ipv6_range(self):
+        alloc = SubnetAllocator("fd00::/48")
+        self.assertEqual(str(alloc.allocate(64)), "fd00::/64")
+        self.assertEqual(str(alloc.allocate(64)), "fd00:0:0:1::/64")
+
+    def test_large_range_is_fast(self):
+        alloc = SubnetAllocator("172.16.0.0/12")
+        nets = [alloc.allocate(24) for _ in range(4096)]
+        self.assertEqual(str(nets[-1]), "172.31.255.0/24")
+        self.assertIsNone(alloc.allocate(24))
+
+
+if __name__ == '__main__':
+    unittest.main()
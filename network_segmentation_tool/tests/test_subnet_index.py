@@ -0,0 +1,61 @@
+# tests/test_subnet_index.py
+import ipaddress
+import time
+import unittest
+from subnet_index import SubnetIndex
+
+class TestSubnetIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SubnetIndex({
+            "Corp": "10.0.0.0/8",
+            "HR": "10.1.0.0/16",
+            "HR-Print": "10.1.2.0/24",
+            "Guest": "192.168.10.0/24",
+            "Empty": "",
+            "Broken": "не сеть",
+            "V6": "fd00::/48",
+            "V6-Lab": "fd00:0:0:5::/64",
+        })
+
+    def test_longest_prefix_match(self):
+        self.assertEqual(self.index.lookup("10.1.2.7"), "HR-Print")
+        self.assertEqual(self.index.lookup("10.1.3.7"), "HR")
+        self.assertEqual(self.index.lookup("10.2.0.1"), "Corp")
+        self.assertEqual(self.index.lookup("192.168.10.255"), "Guest")
+        self.assertIsNone(self.index.lookup("192.168.11.0"))
+        self.assertIsNone(self.index.lookup("0.0.0.0"))
+
+    def test_ipv6_and_address_types(self):
+        self.assertEqual(self.index.lookup("fd00:0:0:5::1"), "V6-Lab")
+        self.assertEqual(self.index.lookup(ipaddress.ip_address("fd00::1")), "V6")
+        self.assertIsNone(self.index.lookup("fd01::1"))
+        self.assertEqual(self.index.lookup(int(ipaddress.ip_address("10.1.2.1"))), "HR-Print")
+
+    def test_edges_of_whole_address_space(self):
+        index = SubnetIndex({"All": "0.0.0.0/0", "Top": "255.255.255.255/32"})
+        self.assertEqual(index.lookup("255.255.255.255"), "Top")
+        self.assertEqual(index.lookup("255.255.255.254"), "All")
+
+    def test_duplicate_subnet_first_declared_wins(self):
+        index = SubnetIndex({"A": "10.0.0.0/24", "B": "10.0.0.0/24"})
+        self.assertEqual(index.lookup("10.0.0.1"), "A")
+
+    def test_lookup_many_matches_lookup(self):
+        addresses = ["10.1.2.7", "fd00:0:0:5::1", "8.8.8.8", "10.200.0.1", "192.168.10.1"]
+        self.assertEqual(self.index.lookup_many(addresses),
+                         [self.index.lookup(a) for a in addresses])
+
+    def test_batch_lookup_on_large_index_is_fast(self):
+        subnets = {f"S{i}": f"10.{i >> 8 & 255}.{i & 255}.0/24" for i in range(50000)}
+        index = SubnetIndex(subnets)
+        addresses = [f"10.{i >> 8 & 255}.{i & 255}.17" for i in range(0, 50000, 5)]
+        start = time.perf_counter()
+        result = index.lookup_many(addresses)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(result[:3], ["S0", "S5", "S10"])
+        self.assertLess(elapsed, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+# tests/test_subnet_planner.py
+import time
+import unittest
+from subnet_planner import plan_subnets, prefix_for_hosts
+from validation import validate_subnets
+
+class TestSubnetPlanner(unittest.TestCase):
+
+    def test_prefix_for_hosts(self):
+        self.assertEqual(prefix_for_hosts(1), 30)
+        self.assertEqual(prefix_for_hosts(2), 30)
+        self.assertEqual(prefix_for_hosts(3), 29)
+        self.assertEqual(prefix_for_hosts(254), 24)
+        self.assertEqual(prefix_for_hosts(255), 23)
+        self.assertEqual(prefix_for_hosts(10, version=6), 64)
+
+    def test_plan_sized_by_equipment_largest_first(self):
+        segments = ["HR", "IT", "Guest"]
+        equipment = {"HR": {"Workstation": 20}, "IT": {"Server": 96, "Switch": 4}}
+        subnets, errors = plan_subnets(segments, equipment, "10.0.0.0/24", growth=0.25)
+        self.assertEqual(errors, [])
+        self.assertEqual(list(subnets), segments)
+        self.assertEqual(subnets["IT"], "10.0.0.0/25")    # 125 узлов
+        self.assertEqual(subnets["HR"], "10.0.0.128/27")  # 25 узлов
+        self.assertEqual(subnets["Guest"], "10.0.0.160/30")
+        self.assertEqual(validate_subnets(subnets), [])
+
+    def test_plan_reports_when_range_is_too_small(self):
+        equipment = {"A": {"Workstation": 200}, "B": {"Workstation": 200}}
+        subnets, errors = plan_subnets(["A", "B"], equipment, "192.168.0.0/24", growth=0)
+        self.assertEqual(subnets, {"A": "192.168.0.0/24"})
+        self.assertIn("вмещает 256 адресов", errors[0])
+        self.assertIn("Сегменту 'B'", errors[1])
+
+    def test_plan_thousands_of_segments_is_fast(self):
+        segments = [f"S{i}" for i in range(5000)]
+        equipment = {seg: {"Workstation": i % 300} for i, seg in enumerate(segments)}
+        start = time.perf_counter()
+        subnets, errors = plan_subnets(segments, equipment, "10.0.0.0/8")
+        elapsed = time.perf_counter() - start
+        self.assertEqual(errors, [])
+        self.assertEqual(len(subnets), 5000)
+        self.assertLess(elapsed, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 # tests/test_validation.py
+import time
 import unittest
-from validation import validate_subnets, validate_rules, validate_user_rules
+from validation import (CONTRADICTORY_RULE, DUPLICATE_RULE, INVALID_CIDR, SHADOWED_RULE, SUBNET_OVERLAP,
+                        USER_CONTRADICTORY, USER_REDUNDANT, ValidationIssue, iter_rule_errors, iter_subnet_errors,
+                        iter_user_rule_errors, iter_validation_errors, validate_subnets, validate_rules,
+                        validate_user_rules)
 
 class TestValidationEdgeCases(unittest.TestCase):
 
@@ -21,6 +25,28 @@ class TestValidationEdgeCases(unittest.TestCase):
         errors = validate_subnets(subnets)
         self.assertIn("Пересечение подсетей", errors[0])
 
+    def test_validate_subnets_reports_every_nested_pair(self):
+        subnets = {
+            "A": "10.0.0.0/16",
+            "B": "10.0.1.0/24",
+            "C": "10.0.1.128/25",
+            "D": "10.1.0.0/24",
+        }
+        errors = validate_subnets(subnets)
+        self.assertEqual(errors, [
+            "Пересечение подсетей: 'A' и 'B'",
+            "Пересечение подсетей: 'A' и 'C'",
+            "Пересечение подсетей: 'B' и 'C'",
+        ])
+
+    def test_validate_subnets_ipv4_and_ipv6_do_not_overlap(self):
+        subnets = {"A": "0.0.0.0/0", "B": "::/0", "C": "fd00::/64", "D": "bad"}
+        errors = validate_subnets(subnets)
+        self.assertEqual(errors, [
+            "Некорректный CIDR для сегмента 'D': bad",
+            "Пересечение подсетей: 'B' и 'C'",
+        ])
+
     # --- Глобальные правила ---
     def test_validate_rules_empty(self):
         errors = validate_rules([], ["HR", "IT"])
@@ -41,6 +67,16 @@ class TestValidationEdgeCases(unittest.TestCase):
         errors = validate_rules(rules, ["HR", "IT"])
         self.assertEqual(errors, [])  # Самодоступ разрешён
 
+    def test_validate_rules_shadowed_and_contradictory(self):
+        rules = [
+            ("Web", "HR", "IT", "HTTPS"),
+            ("Web", "HR", "IT", "443"),
+        ]
+        errors = validate_rules(rules, ["HR", "IT"])
+        self.assertEqual(len(errors), 2)
+        self.assertIn("перекрыто правилом 'Web'", errors[0])
+        self.assertIn("Противоречивое правило 'Web'", errors[1])
+
     # --- Пользовательские правила ---
     def test_validate_user_rules_empty(self):
         errors = validate_user_rules([], ["HR", "IT"])
@@ -56,6 +92,13 @@ class TestValidationEdgeCases(unittest.TestCase):
         errors = validate_user_rules(user_rules, ["HR", "IT"])
         self.assertIn("сегмент источника", errors[0])
 
+    def test_validate_user_rules_redundant_with_global(self):
+        user_rules = [("HR", "Иван", "Админ", "IT", "SSH")]
+        global_rules = [("R1", "HR", "IT", "SSH")]
+        errors = validate_user_rules(user_rules, ["HR", "IT"], global_rules)
+        self.assertEqual(errors, ["Избыточное правило для пользователя 'Иван': доступ HR → IT "
+                                  "по SSH уже открыт глобальным правилом 'R1'"])
+
     # --- Дубликаты правил ---
     def test_validate_rules_duplicate_with_custom(self):
         rules = [
@@ -84,6 +127,68 @@ class TestValidationEdgeCases(unittest.TestCase):
         self.assertEqual(errors, [])  # Не дубликат
 
 
+class TestStreamingValidation(unittest.TestCase):
+
+    def test_records_are_structured(self):
+        errors = list(iter_subnet_errors({"A": "10.0.0.0/24", "B": "10.0.0.0/25", "C": "x"}))
+        self.assertEqual(errors, [
+            ValidationIssue(INVALID_CIDR, "C", cidr="x"),
+            ValidationIssue(SUBNET_OVERLAP, "A", other="B"),
+        ])
+        self.assertEqual(errors[1].message, "Пересечение подсетей: 'A' и 'B'")
+
+    def test_rule_records_carry_index(self):
+        rules = [("R1", "HR", "IT", "SSH"), ("R2", "HR", "IT", "SSH")]
+        (error,) = iter_rule_errors(rules, ["HR", "IT"])
+        self.assertEqual((error.code, error.segment, error.rule_index), (DUPLICATE_RULE, "HR", 1))
+
+    def test_max_errors_stops_early(self):
+        # Генератор бесконечен: без раннего выхода проверка бы не завершилась
+        def endless_rules():
+            i = 0
+            while True:
+                yield (f"R{i}", "HR", "Nowhere", "SSH")
+                i += 1
+
+        errors = list(iter_validation_errors(["HR"], {}, endless_rules(), [], max_errors=3))
+        self.assertEqual([e.rule_index for e in errors], [0, 1, 2])
+
+    def test_generators_still_report_conflicts(self):
+        global_rules = [("Web", "HR", "IT", "HTTPS"), ("Web", "HR", "IT", "443"), ("Admin", "HR", "IT", "SSH")]
+        user_rules = [("HR", "Иван", "Админ", "IT", "SSH"), ("HR", "Иван", "Инженер", "IT", "SSH")]
+        expected = list(iter_validation_errors(["HR", "IT"], {}, global_rules, user_rules))
+        self.assertLessEqual({SHADOWED_RULE, CONTRADICTORY_RULE, USER_REDUNDANT, USER_CONTRADICTORY},
+                             {e.code for e in expected})
+        self.assertEqual(list(iter_validation_errors(["HR", "IT"], {}, iter(global_rules), iter(user_rules))),
+                         expected)
+        self.assertEqual(list(iter_rule_errors((rule for rule in global_rules), ["HR", "IT"])),
+                         list(iter_rule_errors(global_rules, ["HR", "IT"])))
+        self.assertEqual(list(iter_user_rule_errors(iter(user_rules), ["HR", "IT"], iter(global_rules))),
+                         list(iter_user_rule_errors(user_rules, ["HR", "IT"], global_rules)))
+
+    def test_fail_fast_skips_later_stages(self):
+        subnets = {"A": "bad", "B": "also bad"}
+        rules = [("R1", "HR", "Nowhere", "SSH")]
+        errors = list(iter_validation_errors(["HR"], subnets, rules, [], fail_fast=True))
+        self.assertEqual([e.code for e in errors], [INVALID_CIDR, INVALID_CIDR])
+        self.assertEqual(len(list(iter_validation_errors(["HR"], subnets, rules, []))), 3)
+
+
+class TestValidationPerformance(unittest.TestCase):
+
+    def test_validate_subnets_100k(self):
+        # 100 000 подсетей /24 из 10.0.0.0/8 и 172.16.0.0/12 плюс одно пересечение
+        subnets = {f"S{i}": f"10.{i >> 8 & 255}.{i & 255}.0/24" for i in range(65536)}
+        subnets.update({f"T{i}": f"172.{16 + (i >> 16)}.{i >> 8 & 255}.{i & 255}/32"
+                        for i in range(100000 - 65537)})
+        subnets["Overlap"] = "10.0.0.0/23"
+        start = time.perf_counter()
+        errors = validate_subnets(subnets)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(errors), 2)
+        self.assertLess(elapsed, 1.0)
+
+
 class TestSegmentNameValidationInGUI(unittest.TestCase):
     """
     Хотя основная валидация имён сегментов происходит в main.py,
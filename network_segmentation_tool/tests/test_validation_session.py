@@ -0,0 +1,129 @@
+# tests/test_validation_session.py
+import random
+import time
+import unittest
+from validation import validate_subnets, validate_rules, validate_user_rules
+from validation_session import ValidationSession
+
+
+def batch_errors(segments, subnets, global_rules, user_rules):
+    return (validate_subnets(subnets)
+            + validate_rules(global_rules, segments)
+            + validate_user_rules(user_rules, segments, global_rules))
+
+
+class TestValidationSession(unittest.TestCase):
+
+    def test_matches_batch_validation(self):
+        segments = ["HR", "IT"]
+        subnets = {"HR": "10.0.0.0/16", "IT": "10.0.1.0/24", "Bad": "x"}
+        global_rules = [("R1", "HR", "IT", "SSH"), ("R1", "HR", "IT", "22"), ("R2", "HR", "Nope", "SSH")]
+        user_rules = [("HR", "Иван", "Админ", "IT", "SSH"), ("HR", "Иван", "Инженер", "IT", "SSH")]
+        session = ValidationSession()
+        session.sync(segments, subnets, global_rules, user_rules)
+        self.assertEqual(session.validate(), batch_errors(segments, subnets, global_rules, user_rules))
+
+    def test_errors_follow_edits(self):
+        session = ValidationSession()
+        session.sync(["HR", "IT"], {"HR": "10.0.0.0/24", "IT": "10.0.0.0/25"}, [], [])
+        self.assertEqual(session.validate(), ["Пересечение подсетей: 'HR' и 'IT'"])
+        session.set_subnet("IT", "10.0.1.0/24")
+        self.assertEqual(session.validate(), [])
+        session.set_rule("a", ("R1", "HR", "Finance", "SSH"))
+        self.assertEqual(len(session.validate()), 1)
+        session.set_segments(["HR", "IT", "Finance"])
+        self.assertEqual(session.validate(), [])
+        session.remove_rule("a")
+        self.assertEqual(session.validate(), [])
+
+    def test_random_edits_match_batch(self):
+        self._check_random_edits(random.Random(7), ["SSH", "22", "HTTPS", "443", "Custom"])
+
+    def test_random_edits_with_port_ranges_match_batch(self):
+        self._check_random_edits(random.Random(11), ["SSH", "TCP 22", "TCP 1-1024", "TCP 20-25,443", "UDP 53",
+                                                     "HTTPS", "Custom"])
+
+    def _check_random_edits(self, rnd, svcs):
+        segs = ["HR", "IT", "Finance", "Guest"]
+        session = ValidationSession()
+        segments = list(segs[:3])
+        subnets, rules, users = {}, {}, {}
+        for step in range(300):
+            action = rnd.randrange(6)
+            if action == 0:
+                subnets[rnd.choice(segs)] = rnd.choice(
+                    ["10.0.0.0/16", "10.0.1.0/24", "10.0.1.128/25", "10.1.0.0/24", "", "bad"])
+            elif action == 1 and subnets:
+                del subnets[rnd.choice(list(subnets))]
+            elif action == 2:
+                rules[rnd.randrange(8)] = (rnd.choice("AB"), rnd.choice(segs), rnd.choice(segs), rnd.choice(svcs))
+            elif action == 3:
+                users[rnd.randrange(8)] = (rnd.choice(segs), rnd.choice(["Иван", "Пётр"]),
+                                           rnd.choice(["Админ", "Инженер"]), rnd.choice(segs), rnd.choice(svcs))
+            elif action == 4:
+                (rules if rnd.random() < 0.5 else users).pop(rnd.randrange(8), None)
+            else:
+                segments = rnd.sample(segs, rnd.randint(1, 4))
+            session.sync(segments, subnets, rules, users)
+            # Порядок ключей сеанса — порядок первого добавления
+            expected = batch_errors(
+                segments, {n: subnets[n] for n in sorted(subnets, key=lambda n: session._order[("subnet", n)])},
+                [rules[k] for k in sorted(rules, key=lambda k: session._order[("rule", k)])],
+                [users[k] for k in sorted(users, key=lambda k: session._order[("user", k)])])
+            self.assertEqual(session.validate(), expected, f"шаг {step}")
+
+    def test_single_edit_on_large_model_is_cheap(self):
+        segments = [f"S{i}" for i in range(2000)]
+        subnets = {seg: f"10.{i >> 8}.{i & 255}.0/24" for i, seg in enumerate(segments)}
+        rules = {i: (f"R{i}", segments[i % 2000], segments[(i + i // 2000 + 1) % 2000], "HTTPS") for i in range(20000)}
+        users = {i: (segments[i % 2000], f"U{i}", "Инженер", segments[(i + 1) % 2000], "SSH") for i in range(20000)}
+        session = ValidationSession()
+        session.sync(segments, subnets, rules, users)
+        session.validate()
+        session.set_rule(5, ("R5", "S5", "S6", "RDP"))
+        session.set_subnet("S7", "10.0.0.0/16")
+        start = time.perf_counter()
+        errors = session.validate()
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertEqual(len(errors), 255)
+
+    def test_edit_in_large_groups_is_cheap(self):
+        # Тысячи правил в одних группах дубликатов, порта и имени
+        segments = [f"S{i}" for i in range(5)]
+        rules = {i: (f"R{i % 100}", segments[i % 5], segments[(i + 1) % 5], "SSH") for i in range(20000)}
+        users = {i: (segments[i % 5], f"U{i % 50}", "Инженер" if i % 7 else "Админ", segments[(i + 2) % 5], "SSH")
+                 for i in range(20000)}
+        session = ValidationSession()
+        session.sync(segments, {}, rules, users)
+        session.validate()
+        for key, rule in ((0, ("R0", "S0", "S1", "RDP")), (3, ("R3", "S3", "S4", "SSH")), (0, rules[0])):
+            rules[key] = rule
+            session.set_rule(key, rule)
+            session.set_user_rule(key, ("S0", "U0", "Админ", "S3", "RDP"))
+            users[key] = ("S0", "U0", "Админ", "S3", "RDP")
+            start = time.perf_counter()
+            errors = session.validate()
+            self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertEqual(errors, batch_errors(segments, {}, list(rules.values()), list(users.values())))
+
+    def test_edit_in_pair_with_port_ranges_is_cheap(self):
+        # Тысячи правил одной пары сегментов и правило на все порты
+        segments = ["HR", "IT"]
+        rules = {i: (f"R{i}", "HR", "IT", "SSH" if i % 2 else f"TCP {1000 + i}") for i in range(2000)}
+        rules[2000] = ("All", "HR", "IT", "TCP 1-65535")
+        users = {i: ("HR", f"U{i}", "Инженер", "IT", "TCP 2000-2100") for i in range(200)}
+        session = ValidationSession()
+        session.sync(segments, {}, rules, users)
+        session.validate()
+        for key, rule in ((10, ("R10", "HR", "IT", "TCP 1-1024")), (2000, ("All", "HR", "IT", "TCP 2000-2050")),
+                          (1, ("R1", "HR", "IT", "RDP")), (10, rules[10])):
+            rules[key] = rule
+            session.set_rule(key, rule)
+            start = time.perf_counter()
+            errors = session.validate()
+            self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertEqual(errors, batch_errors(segments, {}, list(rules.values()), list(users.values())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# tests/test_what_if.py
+import random
+import time
+import unittest
+from collections import Counter
+from benchmark import generate_scenario
+from risk_analyzer import NO_RISKS, analyze_risks
+from what_if import WhatIfSimulator
+
+SEGMENTS = ["HR", "IT", "Finance", "Guest"]
+GLOBAL_RULES = [("Web", "HR", "IT", "HTTPS"), ("Admin", "IT", "Finance", "SSH")]
+USER_RULES = [("HR", "Иван", "Бухгалтер", "Finance", "SMB")]
+EQUIPMENT = {"HR": {"Workstation": 5}, "IT": {"Server": 2}, "Guest": {"Printer": 1}}
+
+
+def _full_risks(simulator):
+    return Counter(r for r in analyze_risks(simulator.segments, simulator.global_rules(), simulator.user_rules(),
+                                            simulator.segment_equipment) if r != NO_RISKS)
+
+
+class TestWhatIfSimulator(unittest.TestCase):
+
+    def test_add_and_revert(self):
+        sim = WhatIfSimulator(SEGMENTS, GLOBAL_RULES, USER_RULES, EQUIPMENT)
+        baseline = Counter(sim.current_risks())
+        result = sim.add_global_rule(("Guest Web", "Guest", "HR", "HTTPS"))
+        self.assertTrue(any("Guest" in r for r in result.new_risks))
+        self.assertEqual(result.reachable_gained, ["Finance", "HR", "IT"])
+        self.assertEqual(result.reachable_lost, [])
+        self.assertEqual(Counter(sim.current_risks()), _full_risks(sim))
+
+        undo = sim.revert()
+        self.assertEqual(Counter(undo.resolved_risks), Counter(result.new_risks))
+        self.assertEqual(undo.reachable_lost, result.reachable_gained)
+        self.assertEqual(Counter(sim.current_risks()), baseline)
+        self.assertIsNone(sim.revert())
+
+    def test_remove_cuts_transitive_path(self):
+        sim = WhatIfSimulator(SEGMENTS, GLOBAL_RULES + [("Guest Web", "Guest", "HR", "HTTPS")], USER_RULES, EQUIPMENT)
+        result = sim.remove_global_rule(("Web", "HR", "IT", "HTTPS"))
+        self.assertIn("IT", result.reachable_lost)
+        self.assertTrue(any("транзитивно" in r for r in result.resolved_risks))
+        self.assertEqual(Counter(sim.current_risks()), _full_risks(sim))
+
+    def test_policy_services_define_service_classes(self):
+        policy = {"services": {"MyDB": "TCP 22"}}
+        segments = ["Guest", "A", "B"]
+        equipment = {seg: {"Server": 1} for seg in segments}
+        sim = WhatIfSimulator(segments, [("DB", "Guest", "A", "MyDB")], [], equipment, policy)
+        sim.add_global_rule(("Admin", "A", "B", "SSH"))
+        full = Counter(r for r in analyze_risks(segments, sim.global_rules(), sim.user_rules(), equipment, policy)
+                       if r != NO_RISKS)
+        self.assertIn("Сегмент 'Guest' достигает B по SSH через A", full)
+        self.assertEqual(Counter(sim.current_risks()), full)
+
+    def test_remove_missing_rule(self):
+        sim = WhatIfSimulator(SEGMENTS, GLOBAL_RULES, USER_RULES, EQUIPMENT)
+        with self.assertRaises(ValueError):
+            sim.remove_user_rule(("IT", "Пётр", "Админ", "HR", "SSH"))
+        self.assertEqual(sim.pending, [])
+
+    def test_random_edits_match_full_analysis(self):
+        services = ["HTTP", "HTTPS", "SSH", "RDP", "SMB", "Telnet", "FTP"]
+        for seed in range(10):
+            rnd = random.Random(seed)
+            s = generate_scenario(8, 15, 10, 10, seed=seed)
+            sim = WhatIfSimulator(s["segments"], s["global_rules"], s["user_rules"], s["segment_equipment"])
+            baseline = Counter(sim.current_risks())
+            for step in range(25):
+                if rnd.random() < 0.5 and sim.global_rules():
+                    sim.remove_global_rule(rnd.choice(sim.global_rules()))
+                elif rnd.random() < 0.5 and sim.user_rules():
+                    sim.remove_user_rule(rnd.choice(sim.user_rules()))
+                elif rnd.random() < 0.5:
+                    src, dst = rnd.sample(s["segments"], 2)
+                    sim.add_global_rule((f"R{step}", src, dst, rnd.choice(services)))
+                else:
+                    seg, target = rnd.sample(s["segments"], 2)
+                    sim.add_user_rule((seg, f"User{rnd.randrange(5)}", "Инженер", target, rnd.choice(services)))
+                self.assertEqual(Counter(sim.current_risks()), _full_risks(sim), f"seed {seed}, step {step}")
+            sim.revert_all()
+            self.assertEqual(Counter(sim.current_risks()), baseline)
+
+    def test_edit_is_interactive_on_large_model(self):
+        s = generate_scenario(300, 20000, 20000, 300, seed=1)
+        sim = WhatIfSimulator(s["segments"], s["global_rules"], s["user_rules"], s["segment_equipment"])
+        start = time.perf_counter()
+        sim.add_global_rule(("Guest SSH", "Guest", s["segments"][1], "SSH"))
+        sim.revert()
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,57 +1,304 @@
 # validation.py
-import ipaddress
+from collections.abc import Sequence
+from itertools import islice
 
+from ip_utils import parse_cidr
+from model import GlobalRuleTable, UserRuleTable
+from rule_analyzer import CONTRADICTORY, REDUNDANT, SHADOWED, RuleIndex, find_user_conflicts
 
-def validate_subnets(subnets):
-    errors = []
+# Коды ошибок валидации
+INVALID_CIDR = "invalid_cidr"
+SUBNET_OVERLAP = "subnet_overlap"
+UNKNOWN_SEGMENT = "unknown_segment"
+DUPLICATE_RULE = "duplicate_rule"
+SHADOWED_RULE = "shadowed_rule"
+CONTRADICTORY_RULE = "contradictory_rule"
+USER_UNKNOWN_SOURCE = "user_unknown_source"
+USER_UNKNOWN_TARGET = "user_unknown_target"
+USER_DUPLICATE = "user_duplicate"
+USER_REDUNDANT = "user_redundant"
+USER_SHADOWED = "user_shadowed"
+USER_CONTRADICTORY = "user_contradictory"
+
+MESSAGES = {
+    INVALID_CIDR: "Некорректный CIDR для сегмента '{segment}': {cidr}",
+    SUBNET_OVERLAP: "Пересечение подсетей: '{segment}' и '{other}'",
+    UNKNOWN_SEGMENT: "Неизвестный сегмент в правиле '{name}': {segment} → {dst}",
+    DUPLICATE_RULE: "Дублирующее правило: {segment} → {dst} по {svc} (уже задано ранее)",
+    SHADOWED_RULE: "Правило '{name}' ({segment} → {dst} по {svc}) перекрыто правилом "
+                   "'{other_name}' по {other_svc}: порты пересекаются",
+    CONTRADICTORY_RULE: "Противоречивое правило '{name}': это имя уже задано для "
+                        "{other_src} → {other_dst} по {other_svc}",
+    USER_UNKNOWN_SOURCE: "Пользователь '{fio}': сегмент источника '{segment}' не объявлен",
+    USER_UNKNOWN_TARGET: "Пользователь '{fio}': недопустимый целевой сегмент '{target}'",
+    USER_DUPLICATE: "Дублирующее правило для пользователя '{fio}' в сегменте {segment}: "
+                    "доступ к {target} по {svc}",
+    USER_REDUNDANT: "Избыточное правило для пользователя '{fio}': доступ {segment} → {target} "
+                    "по {svc} уже открыт глобальным правилом '{other_name}'",
+    USER_SHADOWED: "Правило пользователя '{fio}' ({segment} → {target} по {svc}) перекрыто "
+                   "правилом по {other_svc}: порты пересекаются",
+    USER_CONTRADICTORY: "Противоречивые данные пользователя '{fio}' в сегменте {segment}: "
+                        "должность '{pos}' и '{other_pos}'",
+}
+
+
+class ValidationIssue:
+    """
+    Структурированная запись об ошибке валидации: код, сегмент, номер
+    правила и параметры сообщения. Текст сообщения формируется только
+    при обращении к message.
+    """
+    __slots__ = ("code", "segment", "rule_index", "params")
+
+    def __init__(self, code, segment=None, rule_index=None, **params):
+        self.code = code
+        self.segment = segment
+        self.rule_index = rule_index
+        self.params = params
+
+    @property
+    def message(self):
+        return MESSAGES[self.code].format(segment=self.segment, **self.params)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"ValidationIssue({self.code!r}, {self.segment!r}, {self.rule_index!r}, {self.params!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, ValidationIssue):
+            return NotImplemented
+        return (self.code, self.segment, self.rule_index, self.params) == \
+               (other.code, other.segment, other.rule_index, other.params)
+
+
+def iter_overlapping_subnets(net_objects):
+    """
+    Находит все пары пересекающихся подсетей (включая вложенные)
+    за один проход по подсетям, отсортированным по начальному адресу.
+    net_objects — список (имя, версия, первый адрес, последний адрес).
+    Выдаёт пары индексов (i, j), i < j, по мере обнаружения.
+    """
+    order = sorted(range(len(net_objects)),
+                   key=lambda k: (net_objects[k][1], net_objects[k][2], -net_objects[k][3]))
+    # Блоки CIDR либо не пересекаются, либо вложены друг в друга,
+    # поэтому «открытые» подсети образуют цепочку вложенности (стек).
+    stack = []
+    version = None
+    for k in order:
+        _, ver, start, end = net_objects[k]
+        if ver != version:
+            stack = []
+            version = ver
+        while stack and net_objects[stack[-1]][3] < start:
+            stack.pop()
+        for outer in stack:
+            yield (outer, k) if outer < k else (k, outer)
+        stack.append(k)
+
+
+def find_overlapping_subnets(net_objects):
+    """То же, что iter_overlapping_subnets, но пары упорядочены по исходному списку."""
+    return sorted(iter_overlapping_subnets(net_objects))
+
+
+def iter_subnet_errors(subnets):
+    """Выдаёт ошибки подсетей по мере обнаружения (пересечения — в порядке адресов)."""
     net_objects = []
     for name, cidr in subnets.items():
         if not cidr:
             continue
         try:
-            net = ipaddress.ip_network(cidr, strict=False)
-            net_objects.append((name, net))
+            version, start, end = parse_cidr(cidr)
+            net_objects.append((name, version, start, end))
         except ValueError:
-            errors.append(f"Некорректный CIDR для сегмента '{name}': {cidr}")
+            yield ValidationIssue(INVALID_CIDR, name, cidr=cidr)
 
-    for i in range(len(net_objects)):
-        for j in range(i + 1, len(net_objects)):
-            if net_objects[i][1].overlaps(net_objects[j][1]):
-                errors.append(f"Пересечение подсетей: '{net_objects[i][0]}' и '{net_objects[j][0]}'")
+    for i, j in iter_overlapping_subnets(net_objects):
+        yield ValidationIssue(SUBNET_OVERLAP, net_objects[i][0], other=net_objects[j][0])
 
-    return errors
 
+def _known_flags(segment_ids, all_segments):
+    """Флаги объявленных сегментов по идентификаторам таблицы интернирования."""
+    known = bytearray(len(segment_ids))
+    for seg in all_segments:
+        ident = segment_ids.get(seg)
+        if ident is not None:
+            known[ident] = 1
+    return known
 
-def validate_rules(rules, all_segments):
-    errors = []
+
+def _iter_table_rule_errors(rules, all_segments):
+    """Проверки по каждому правилу для GlobalRuleTable: сравниваются целые ключи, а не строки."""
+    known = _known_flags(rules.segments, all_segments)
+    n_seg = len(rules.segments)
+    n_svc = len(rules.services)
     seen = set()
-    for rule_name, src, dst, svc in rules:
-        if src not in all_segments or dst not in all_segments:
-            errors.append(f"Неизвестный сегмент в правиле '{rule_name}': {src} → {dst}")
+    for i, (src, dst, svc) in enumerate(zip(rules.src, rules.dst, rules.svc)):
+        if not (known[src] and known[dst]):
+            rule_name, src_name, dst_name, _ = rules[i]
+            yield ValidationIssue(UNKNOWN_SEGMENT, src_name, i, name=rule_name, dst=dst_name)
             continue
-        key = (src, dst, svc)
+        key = (src * n_seg + dst) * n_svc + svc
         if key in seen:
-            errors.append(f"Дублирующее правило: {src} → {dst} по {svc} (уже задано ранее)")
+            _, src_name, dst_name, svc_name = rules[i]
+            yield ValidationIssue(DUPLICATE_RULE, src_name, i, dst=dst_name, svc=svc_name)
         else:
             seen.add(key)
-    return errors
 
 
-def validate_user_rules(user_rules, all_segments):
-    errors = []
-    seen = set()  # Теперь ключ включает сегмент источника
-    for seg, fio, pos, target_seg, svc in user_rules:
-        if seg not in all_segments:
-            errors.append(f"Пользователь '{fio}': сегмент источника '{seg}' не объявлен")
-        if target_seg not in all_segments:
-            errors.append(f"Пользователь '{fio}': недопустимый целевой сегмент '{target_seg}'")
+def _collecting(rules, sink):
+    """Проходит по rules, сохраняя каждое правило в sink: итератор читается один раз."""
+    for rule in rules:
+        sink.append(rule)
+        yield rule
+
+
+def _is_indexable(rules):
+    return isinstance(rules, (Sequence, GlobalRuleTable, UserRuleTable))
+
 
-        # Ключ для дубликата: (сегмент_источника, ФИО, целевой_сегмент, сервис)
+def iter_rule_errors(rules, all_segments):
+    """
+    Выдаёт ошибки глобальных правил: сначала по каждому правилу, затем
+    конфликты. rules может быть итератором: правила сохраняются при
+    первом проходе, а ошибки по каждому правилу выдаются сразу.
+    """
+    if isinstance(rules, GlobalRuleTable):
+        yield from _iter_table_rule_errors(rules, all_segments)
+    else:
+        items = rules
+        if not _is_indexable(rules):
+            rules = []
+            items = _collecting(items, rules)
+        all_segments = set(all_segments)
+        seen = set()
+        for i, (rule_name, src, dst, svc) in enumerate(items):
+            if src not in all_segments or dst not in all_segments:
+                yield ValidationIssue(UNKNOWN_SEGMENT, src, i, name=rule_name, dst=dst)
+                continue
+            key = (src, dst, svc)
+            if key in seen:
+                yield ValidationIssue(DUPLICATE_RULE, src, i, dst=dst, svc=svc)
+            else:
+                seen.add(key)
+
+    for conflict in RuleIndex(rules).conflicts:
+        name, src, dst, svc = rules[conflict.index]
+        other_name, other_src, other_dst, other_svc = rules[conflict.other]
+        if conflict.kind == SHADOWED:
+            yield ValidationIssue(SHADOWED_RULE, src, conflict.index, name=name, dst=dst, svc=svc,
+                                  other_name=other_name, other_svc=other_svc)
+        elif conflict.kind == CONTRADICTORY:
+            yield ValidationIssue(CONTRADICTORY_RULE, src, conflict.index, name=name, other_src=other_src,
+                                  other_dst=other_dst, other_svc=other_svc)
+
+
+def _iter_table_user_rule_errors(user_rules, all_segments):
+    """Проверки по каждому правилу для UserRuleTable по целым идентификаторам."""
+    known = _known_flags(user_rules.segments, all_segments)
+    seen = set()
+    columns = zip(user_rules.seg, user_rules.fio, user_rules.target, user_rules.svc)
+    for i, (seg, fio, target_seg, svc) in enumerate(columns):
+        if not (known[seg] and known[target_seg]):
+            seg_name, fio_name, _, target_name, _ = user_rules[i]
+            if not known[seg]:
+                yield ValidationIssue(USER_UNKNOWN_SOURCE, seg_name, i, fio=fio_name)
+            if not known[target_seg]:
+                yield ValidationIssue(USER_UNKNOWN_TARGET, seg_name, i, fio=fio_name, target=target_name)
         user_key = (seg, fio, target_seg, svc)
         if user_key in seen:
-            errors.append(
-                f"Дублирующее правило для пользователя '{fio}' в сегменте {seg}: доступ к {target_seg} по {svc}")
+            seg_name, fio_name, _, target_name, svc_name = user_rules[i]
+            yield ValidationIssue(USER_DUPLICATE, seg_name, i, fio=fio_name, target=target_name, svc=svc_name)
         else:
             seen.add(user_key)
-    return errors
 
+
+def iter_user_rule_errors(user_rules, all_segments, global_rules=None):
+    """
+    Выдаёт ошибки правил пользователей: сначала по каждому правилу, затем
+    конфликты. user_rules и global_rules могут быть итераторами.
+    """
+    if isinstance(user_rules, UserRuleTable):
+        yield from _iter_table_user_rule_errors(user_rules, all_segments)
+    else:
+        items = user_rules
+        if not _is_indexable(user_rules):
+            user_rules = []
+            items = _collecting(items, user_rules)
+        all_segments = set(all_segments)
+        seen = set()  # Теперь ключ включает сегмент источника
+        for i, (seg, fio, pos, target_seg, svc) in enumerate(items):
+            if seg not in all_segments:
+                yield ValidationIssue(USER_UNKNOWN_SOURCE, seg, i, fio=fio)
+            if target_seg not in all_segments:
+                yield ValidationIssue(USER_UNKNOWN_TARGET, seg, i, fio=fio, target=target_seg)
+
+            # Ключ для дубликата: (сегмент_источника, ФИО, целевой_сегмент, сервис)
+            user_key = (seg, fio, target_seg, svc)
+            if user_key in seen:
+                yield ValidationIssue(USER_DUPLICATE, seg, i, fio=fio, target=target_seg, svc=svc)
+            else:
+                seen.add(user_key)
+
+    # Конфликты с глобальными правилами и между правилами пользователей
+    global_rules = global_rules if global_rules is None or _is_indexable(global_rules) else list(global_rules)
+    for conflict in find_user_conflicts(user_rules, RuleIndex(global_rules or [])):
+        seg, fio, pos, target_seg, svc = user_rules[conflict.index]
+        if conflict.kind == REDUNDANT:
+            yield ValidationIssue(USER_REDUNDANT, seg, conflict.index, fio=fio, target=target_seg, svc=svc,
+                                  other_name=global_rules[conflict.other][0])
+        elif conflict.kind == SHADOWED:
+            yield ValidationIssue(USER_SHADOWED, seg, conflict.index, fio=fio, target=target_seg, svc=svc,
+                                  other_svc=user_rules[conflict.other][4])
+        else:
+            yield ValidationIssue(USER_CONTRADICTORY, seg, conflict.index, fio=fio, pos=pos,
+                                  other_pos=user_rules[conflict.other][2])
+
+
+def iter_validation_errors(segments, subnets, global_rules, user_rules, max_errors=None, fail_fast=False):
+    """
+    Лениво проверяет всю модель: подсети, глобальные правила, правила
+    пользователей. max_errors ограничивает число выданных ошибок;
+    при fail_fast проверка останавливается после первого этапа,
+    на котором нашлись ошибки.
+    """
+    rule_stage_input = global_rules
+    if not _is_indexable(global_rules):
+        # Итератор глобальных правил нужен двум этапам: второй получает правила, сохранённые первым
+        collected = []
+        rule_stage_input, global_rules = _collecting(global_rules, collected), collected
+    stages = (
+        lambda: iter_subnet_errors(subnets),
+        lambda: iter_rule_errors(rule_stage_input, segments),
+        lambda: iter_user_rule_errors(user_rules, segments, global_rules),
+    )
+
+    def run():
+        for stage in stages:
+            failed = False
+            for error in stage():
+                failed = True
+                yield error
+            if failed and fail_fast:
+                return
+
+    return islice(run(), max_errors)
+
+
+def validate_subnets(subnets):
+    errors = list(iter_subnet_errors(subnets))
+    # Пересечения выводятся в порядке объявления сегментов
+    position = {name: i for i, name in enumerate(subnets)}
+    errors.sort(key=lambda e: (e.code == SUBNET_OVERLAP, position[e.segment],
+                               position.get(e.params.get("other"), 0)))
+    return [e.message for e in errors]
+
+
+def validate_rules(rules, all_segments):
+    return [e.message for e in iter_rule_errors(rules, all_segments)]
+
+
+def validate_user_rules(user_rules, all_segments, global_rules=None):
+    return [e.message for e in iter_user_rule_errors(user_rules, all_segments, global_rules)]
@@ -0,0 +1,645 @@
+# validation_session.py
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from math import isqrt
+
+from ip_utils import address_bits, parse_cidr
+from rule_analyzer import is_port_range, service_key
+from services import PortIndex, resolve_service, spec_contains, specs_overlap
+from validation import (CONTRADICTORY_RULE, DUPLICATE_RULE, INVALID_CIDR, SHADOWED_RULE, SUBNET_OVERLAP,
+                        UNKNOWN_SEGMENT, USER_CONTRADICTORY, USER_DUPLICATE, USER_REDUNDANT, USER_SHADOWED,
+                        USER_UNKNOWN_SOURCE, USER_UNKNOWN_TARGET, ValidationIssue)
+
+
+def _add_to_group(groups, group_key, key):
+    groups.setdefault(group_key, set()).add(key)
+
+
+def _remove_from_group(groups, group_key, key):
+    members = groups.get(group_key)
+    if members is not None:
+        members.discard(key)
+        if not members:
+            del groups[group_key]
+
+
+_NO_HEAD = object()
+
+
+class _HeadedGroups(dict):
+    """
+    Группы ключей правил: группа -> множество ключей. Для каждой группы
+    хранится голова — самый ранний ключ по порядку сеанса, поэтому
+    «первое правило группы» находится за O(1). После удаления головы она
+    пересчитывается при первом обращении.
+    """
+
+    def __init__(self, rank, track=True):
+        super().__init__()
+        self._rank = rank
+        self._heads = {}
+        self._track = track  # запоминать головы до изменений для changed_heads
+        self._before = {}    # группа -> голова до изменений текущего прохода
+
+    def head(self, group_key):
+        head = self._heads.get(group_key, _NO_HEAD)
+        if head is _NO_HEAD:
+            head = self._heads[group_key] = min(self[group_key], key=self._rank)
+        return head
+
+    def _note(self, group_key):
+        if self._track and group_key not in self._before:
+            self._before[group_key] = self.head(group_key) if group_key in self else _NO_HEAD
+
+    def add(self, group_key, key):
+        self._note(group_key)
+        members = self.get(group_key)
+        if members is None:
+            self[group_key] = {key}
+            self._heads[group_key] = key
+            return
+        members.add(key)
+        head = self._heads.get(group_key, _NO_HEAD)
+        if head is not _NO_HEAD and self._rank(key) < self._rank(head):
+            self._heads[group_key] = key
+
+    def remove(self, group_key, key):
+        members = self.get(group_key)
+        if members is None or key not in members:
+            return
+        self._note(group_key)
+        members.discard(key)
+        if not members:
+            del self[group_key]
+            self._heads.pop(group_key, None)
+        elif self._heads.get(group_key, _NO_HEAD) == key:
+            del self._heads[group_key]
+
+    def changed_heads(self, dirty):
+        """
+        Группы, изменённые с прошлого вызова, у которых сменилась голова
+        или сама голова — изменённое правило (ключ из dirty). Только их
+        остальным участникам нужна перепроверка.
+        """
+        changed = []
+        for group_key, before in self._before.items():
+            after = self.head(group_key) if group_key in self else _NO_HEAD
+            if after != before or after in dirty:
+                changed.append(group_key)
+        self._before = {}
+        return changed
+
+
+class _PortGroup:
+    """
+    Правила одной группы (например, пары сегментов), разложенные по записи
+    сервиса: by_svc — запись -> {ключи} с головой каждой записи. Записи
+    с известными портами индексируются PortIndex; запросы возвращают
+    записи, а самое раннее правило записи — её голова. Индекс строится по
+    снимку и короткому списку изменений после него и перестраивается,
+    когда изменений больше корня из числа записей.
+    """
+
+    def __init__(self, rank, track=True):
+        self.by_svc = _HeadedGroups(rank, track)
+        self._index = None
+        self._fresh = {}     # записи, появившиеся после снимка: запись -> ServiceSpec
+        self._stale = set()  # записи снимка, исчезавшие после него (вернувшиеся — в _fresh)
+
+    def __len__(self):
+        return len(self.by_svc)
+
+    def __iter__(self):
+        for keys in self.by_svc.values():
+            yield from keys
+
+    def add(self, key, svc):
+        if svc not in self.by_svc and self._index is not None:
+            spec = resolve_service(svc)
+            if spec is not None:
+                self._fresh[svc] = spec
+        self.by_svc.add(svc, key)
+
+    def remove(self, key, svc):
+        self.by_svc.remove(svc, key)
+        if svc not in self.by_svc and self._index is not None:
+            self._fresh.pop(svc, None)
+            self._stale.add(svc)
+
+    def _snapshot(self):
+        if self._index is None or len(self._fresh) + len(self._stale) > isqrt(len(self.by_svc)) + 16:
+            specs = ((resolve_service(svc), svc) for svc in self.by_svc)
+            self._index = PortIndex((spec, svc) for spec, svc in specs if spec is not None)
+            self._fresh = {}
+            self._stale = set()
+        return self._index
+
+    def overlapping(self, spec):
+        """Записи сервиса, у которых есть общий порт со spec."""
+        index = self._snapshot()
+        found = {svc for svc in index.overlapping(spec) if svc not in self._stale}
+        found.update(svc for svc, other in self._fresh.items() if specs_overlap(other, spec))
+        return found
+
+    def containing(self, spec):
+        """Записи сервиса, чьи порты покрывают все порты spec."""
+        index = self._snapshot()
+        found = {svc for svc in index.containing(spec) if svc not in self._stale}
+        found.update(svc for svc, other in self._fresh.items() if spec_contains(other, spec))
+        return found
+
+    def keys_overlapping(self, spec):
+        """Ключи всех правил, у которых есть общий порт со spec."""
+        found = set()
+        for svc in self.overlapping(spec):
+            found.update(self.by_svc[svc])
+        return found
+
+
+def _add_port(groups, group_key, key, svc, rank, track=True):
+    group = groups.get(group_key)
+    if group is None:
+        group = groups[group_key] = _PortGroup(rank, track)
+    group.add(key, svc)
+
+
+def _remove_port(groups, group_key, key, svc):
+    group = groups[group_key]
+    group.remove(key, svc)
+    if not group:
+        del groups[group_key]
+
+
+class ValidationSession:
+    """
+    Сеанс инкрементальной валидации модели.
+
+    Сеанс хранит индексы подсетей и правил между запусками и помнит,
+    какие сегменты и правила изменились («грязные»). validate()
+    перепроверяет только их, а правила из тех же групп (дубликаты, порты,
+    имена) — только если сменилось первое правило группы; ошибки
+    остальной модели берутся из предыдущего запуска.
+    Результат совпадает с validate_subnets + validate_rules +
+    validate_user_rules(..., global_rules) для той же модели.
+
+    Правила адресуются ключами, заданными вызывающим кодом (например,
+    идентификатором строки в GUI). Порядок правил — порядок первого
+    добавления ключа.
+    """
+
+    def __init__(self):
+        self._order = {}          # (вид, ключ) -> порядковый номер
+        self._counter = 0
+        self._segments = set()
+        self._seg_refs = {}       # сегмент -> {(вид, ключ)} правил, которые на него ссылаются
+
+        # Подсети
+        self._subnets = {}        # сегмент -> CIDR
+        self._parsed = {}         # сегмент -> (версия, начало, конец) для корректных CIDR
+        self._invalid = set()     # сегменты с некорректным CIDR
+        self._blocks = {}         # (версия, начало, конец) -> {сегменты}
+        self._starts = {4: [], 6: []}  # отсортированные (начало, конец) уникальных блоков
+        self._overlaps = {}       # сегмент -> {сегменты, с которыми пересекается}
+        self._dirty_subnets = set()
+
+        # Глобальные правила
+        self._rules = {}
+        self._indexed_rules = {}  # ключ -> (правило, группы), в которые оно попало при индексации
+        self._rule_rank = self._rank("rule")
+        self._rule_exact = _HeadedGroups(self._rule_rank)  # (src, dst, svc) -> {ключи} (с известными сегментами)
+        self._rule_port = _HeadedGroups(self._rule_rank)   # (src, dst, порт) -> {ключи}
+        self._rule_names = _HeadedGroups(self._rule_rank)  # имя -> {ключи}
+        self._rule_pairs = {}     # (src, dst) -> _PortGroup
+        self._ranged_rules = {}   # (src, dst) -> {ключи правил с диапазонами портов}
+        self._rule_errors = {}
+        self._rule_conflicts = {}
+        self._dirty_rules = set()
+
+        # Правила пользователей
+        self._users = {}
+        self._indexed_users = {}
+        self._user_rank = self._rank("user")
+        self._user_exact = _HeadedGroups(self._user_rank)   # (seg, fio, target, svc) -> {ключи}
+        self._user_port = _HeadedGroups(self._user_rank)    # (seg, fio, target, порт) -> {ключи}
+        self._user_person = _HeadedGroups(self._user_rank)  # (seg, fio) -> {ключи}
+        self._user_targets = {}   # (seg, fio, target) -> _PortGroup
+        self._user_by_pair = {}   # (seg, target, порт) -> {ключи}, для проверки избыточности
+        self._user_pairs = {}     # (seg, target) -> _PortGroup, избыточность по диапазонам
+        self._ranged_users = {}   # (seg, fio, target) -> {ключи правил с диапазонами портов}
+        self._user_errors = {}
+        self._user_conflicts = {}
+        self._dirty_users = set()
+
+    def _rank(self, kind):
+        order = self._order
+        return lambda key: order[(kind, key)]
+
+    # --- Изменение модели ---
+    def _touch(self, kind, key):
+        if (kind, key) not in self._order:
+            self._order[(kind, key)] = self._counter
+            self._counter += 1
+
+    def set_segments(self, segments):
+        """Задаёт список объявленных сегментов; правила, ссылающиеся на изменённые, становятся грязными."""
+        new_segments = set(segments)
+        for seg in new_segments ^ self._segments:
+            for kind, key in self._seg_refs.get(seg, ()):
+                (self._dirty_rules if kind == "rule" else self._dirty_users).add(key)
+        self._segments = new_segments
+
+    def set_subnet(self, name, cidr):
+        if self._subnets.get(name) != cidr or name not in self._subnets:
+            self._touch("subnet", name)
+            self._subnets[name] = cidr
+            self._dirty_subnets.add(name)
+
+    def remove_subnet(self, name):
+        if name in self._subnets:
+            del self._subnets[name]
+            self._dirty_subnets.add(name)
+
+    def set_rule(self, key, rule):
+        rule = tuple(rule)
+        if self._rules.get(key) != rule:
+            self._touch("rule", key)
+            self._rules[key] = rule
+            self._dirty_rules.add(key)
+
+    def remove_rule(self, key):
+        if key in self._rules:
+            del self._rules[key]
+            self._dirty_rules.add(key)
+
+    def set_user_rule(self, key, rule):
+        rule = tuple(rule)
+        if self._users.get(key) != rule:
+            self._touch("user", key)
+            self._users[key] = rule
+            self._dirty_users.add(key)
+
+    def remove_user_rule(self, key):
+        if key in self._users:
+            del self._users[key]
+            self._dirty_users.add(key)
+
+    def sync(self, segments, subnets, global_rules, user_rules):
+        """
+        Приводит сеанс к переданной модели. Правила можно передать списком
+        (ключ — позиция) или словарём ключ -> правило. Сравнение со
+        старой моделью дешёвое, перепроверяется только изменившееся.
+        """
+        self.set_segments(segments)
+        for name in [n for n in self._subnets if n not in subnets]:
+            self.remove_subnet(name)
+        for name, cidr in subnets.items():
+            self.set_subnet(name, cidr)
+
+        for items, current, setter, remover in (
+                (global_rules, self._rules, self.set_rule, self.remove_rule),
+                (user_rules, self._users, self.set_user_rule, self.remove_user_rule)):
+            if not isinstance(items, dict):
+                items = dict(enumerate(items))
+            for key in [k for k in current if k not in items]:
+                remover(key)
+            for key, rule in items.items():
+                setter(key, rule)
+
+    # --- Подсети ---
+    def _unindex_subnet(self, name):
+        self._invalid.discard(name)
+        for other in self._overlaps.pop(name, ()):
+            _remove_from_group(self._overlaps, other, name)
+        parsed = self._parsed.pop(name, None)
+        if parsed is None:
+            return
+        _remove_from_group(self._blocks, parsed, name)
+        if parsed not in self._blocks:
+            version, start, end = parsed
+            starts = self._starts[version]
+            del starts[bisect_left(starts, (start, end))]
+
+    def _index_subnet(self, name):
+        cidr = self._subnets.get(name)
+        if not cidr:
+            return
+        try:
+            parsed = parse_cidr(cidr)
+        except ValueError:
+            self._invalid.add(name)
+            return
+        version, start, end = parsed
+        self._parsed[name] = parsed
+        overlapping = set(self._blocks.get(parsed, ()))
+        # Объемлющие блоки: по одному кандидату на каждую длину префикса
+        bits = address_bits(version)
+        size_bits = (end - start + 1).bit_length() - 1
+        for host_bits in range(size_bits + 1, bits + 1):
+            outer_start = (start >> host_bits) << host_bits
+            overlapping.update(self._blocks.get((version, outer_start, outer_start + (1 << host_bits) - 1), ()))
+        # Вложенные блоки лежат подряд в отсортированном списке начал
+        starts = self._starts[version]
+        lo = bisect_left(starts, (start,))
+        hi = bisect_right(starts, (end, end))
+        for inner_start, inner_end in starts[lo:hi]:
+            if inner_end <= end:
+                overlapping.update(self._blocks.get((version, inner_start, inner_end), ()))
+        overlapping.discard(name)
+        for other in overlapping:
+            _add_to_group(self._overlaps, name, other)
+            _add_to_group(self._overlaps, other, name)
+
+        if parsed not in self._blocks:
+            insort(starts, (start, end))
+        _add_to_group(self._blocks, parsed, name)
+
+    def _revalidate_subnets(self):
+        for name in self._dirty_subnets:
+            self._unindex_subnet(name)
+        for name in self._dirty_subnets:
+            self._index_subnet(name)
+        for name in self._dirty_subnets:
+            if name not in self._subnets:
+                self._order.pop(("subnet", name), None)
+        self._dirty_subnets.clear()
+
+    # --- Глобальные правила ---
+    def _rule_groups(self, rule):
+        """Группы правила с головой: порт, имя и (при известных сегментах) дубликаты."""
+        name, src, dst, svc = rule
+        groups = [(self._rule_port, (src, dst, service_key(svc))), (self._rule_names, name)]
+        if src in self._segments and dst in self._segments:
+            groups.append((self._rule_exact, (src, dst, svc)))
+        return groups
+
+    def _revalidate_rules(self, dirty_users):
+        dirty = set(self._dirty_rules)
+        to_check = set(dirty)
+        ranged_before = {}  # пара -> были ли в ней диапазоны портов до изменений
+        for key in dirty:
+            indexed = self._indexed_rules.pop(key, None)
+            if indexed is not None:
+                old, old_groups = indexed
+                pair = (old[1], old[2])
+                self._unlink_refs("rule", key, pair)
+                for groups, group_key in old_groups:
+                    groups.remove(group_key, key)
+                ranged_before.setdefault(pair, pair in self._ranged_rules)
+                _remove_from_group(self._ranged_rules, pair, key)
+                _remove_port(self._rule_pairs, pair, key, old[3])
+            rule = self._rules.get(key)
+            if rule is None:
+                self._rule_errors.pop(key, None)
+                self._rule_conflicts.pop(key, None)
+                self._order.pop(("rule", key), None)
+                continue
+            pair = (rule[1], rule[2])
+            new_groups = self._rule_groups(rule)
+            self._indexed_rules[key] = (rule, new_groups)
+            self._link_refs("rule", key, pair)
+            for groups, group_key in new_groups:
+                groups.add(group_key, key)
+            ranged_before.setdefault(pair, pair in self._ranged_rules)
+            if is_port_range(rule[3]):
+                _add_to_group(self._ranged_rules, pair, key)
+            _add_port(self._rule_pairs, pair, key, rule[3], self._rule_rank)
+        self._dirty_rules.clear()
+
+        # Остальные участники группы перепроверяются, только если сменилась её голова
+        for groups in (self._rule_exact, self._rule_names):
+            for group_key in groups.changed_heads(dirty):
+                to_check.update(groups.get(group_key, ()))
+        for group_key in self._rule_port.changed_heads(dirty):
+            to_check.update(self._rule_port.get(group_key, ()))
+            # Голова группы порта — глобальное правило, покрывающее правила пользователей
+            dirty_users.update(self._user_by_pair.get(group_key, ()))
+
+        # Появление или исчезновение диапазонов в паре меняет проверку всей пары,
+        # иначе затронуты только правила с общими портами с записью, у которой
+        # сменилось самое раннее правило
+        for pair, before in ranged_before.items():
+            ports = self._rule_pairs.get(pair)
+            changed = ports.by_svc.changed_heads(()) if ports is not None else ()
+            if before != (pair in self._ranged_rules):
+                to_check.update(ports or ())
+                dirty_users.update(self._user_pairs.get(pair, ()))
+            elif before:
+                for svc in changed:
+                    spec = resolve_service(svc)
+                    if spec is None:
+                        continue
+                    to_check.update(ports.keys_overlapping(spec))
+                    if pair in self._user_pairs:
+                        dirty_users.update(self._user_pairs[pair].keys_overlapping(spec))
+
+        for key in to_check:
+            if key in self._rules:
+                self._check_rule(key)
+
+    def _first(self, kind, members):
+        order = self._order
+        return min(members, key=lambda k: order[(kind, k)])
+
+    def _first_overlapping(self, kind, rules, ports, key, svc_pos):
+        """
+        Самое раннее правило группы ports с другой записью сервиса и общими
+        портами, или None: кандидаты — головы пересекающихся записей.
+        """
+        svc = rules[key][svc_pos]
+        spec = resolve_service(svc)
+        if spec is None:
+            return None
+        order = self._order
+        own = order[(kind, key)]
+        heads = (ports.by_svc.head(other) for other in ports.overlapping(spec) if other != svc)
+        earlier = [other for other in heads if order[(kind, other)] < own]
+        return self._first(kind, earlier) if earlier else None
+
+    def _check_rule(self, key):
+        name, src, dst, svc = rule = self._rules[key]
+        errors = []
+        if src not in self._segments or dst not in self._segments:
+            errors.append(ValidationIssue(UNKNOWN_SEGMENT, src, key, name=name, dst=dst))
+        elif self._rule_exact.head((src, dst, svc)) != key:
+            errors.append(ValidationIssue(DUPLICATE_RULE, src, key, dst=dst, svc=svc))
+
+        conflicts = []
+        first = self._rule_port.head((src, dst, service_key(svc)))
+        if first == key or self._rules[first][3] == svc:
+            first = None
+            if (src, dst) in self._ranged_rules:
+                first = self._first_overlapping("rule", self._rules, self._rule_pairs[(src, dst)], key, 3)
+        if first is not None:
+            other_name, _, _, other_svc = self._rules[first]
+            conflicts.append(ValidationIssue(SHADOWED_RULE, src, key, name=name, dst=dst, svc=svc,
+                                             other_name=other_name, other_svc=other_svc))
+        first = self._rule_names.head(name)
+        if first != key and tuple(self._rules[first][1:]) != tuple(rule[1:]):
+            _, other_src, other_dst, other_svc = self._rules[first]
+            conflicts.append(ValidationIssue(CONTRADICTORY_RULE, src, key, name=name, other_src=other_src,
+                                             other_dst=other_dst, other_svc=other_svc))
+        self._store(self._rule_errors, key, errors)
+        self._store(self._rule_conflicts, key, conflicts)
+
+    # --- Правила пользователей ---
+    def _user_groups(self, rule):
+        """Группы правила с головой: дубликаты, порт, пользователь."""
+        seg, fio, pos, target, svc = rule
+        return [(self._user_exact, (seg, fio, target, svc)),
+                (self._user_port, (seg, fio, target, service_key(svc))),
+                (self._user_person, (seg, fio))]
+
+    def _revalidate_users(self, dirty_users):
+        dirty = set(self._dirty_users)
+        to_check = dirty_users | dirty
+        ranged_before = {}  # (seg, fio, target) -> были ли диапазоны до изменений
+        for key in dirty:
+            old = self._indexed_users.pop(key, None)
+            if old is not None:
+                seg, fio, _, target, svc = old
+                self._unlink_refs("user", key, (seg, target))
+                for groups, group_key in self._user_groups(old):
+                    groups.remove(group_key, key)
+                _remove_from_group(self._user_by_pair, (seg, target, service_key(svc)), key)
+                _remove_port(self._user_pairs, (seg, target), key, svc)
+                targets = (seg, fio, target)
+                ranged_before.setdefault(targets, targets in self._ranged_users)
+                _remove_from_group(self._ranged_users, targets, key)
+                _remove_port(self._user_targets, targets, key, svc)
+            rule = self._users.get(key)
+            if rule is None:
+                self._user_errors.pop(key, None)
+                self._user_conflicts.pop(key, None)
+                self._order.pop(("user", key), None)
+                continue
+            seg, fio, _, target, svc = rule
+            self._indexed_users[key] = rule
+            self._link_refs("user", key, (seg, target))
+            for groups, group_key in self._user_groups(rule):
+                groups.add(group_key, key)
+            _add_to_group(self._user_by_pair, (seg, target, service_key(svc)), key)
+            _add_port(self._user_pairs, (seg, target), key, svc, self._user_rank, track=False)
+            targets = (seg, fio, target)
+            ranged_before.setdefault(targets, targets in self._ranged_users)
+            if is_port_range(svc):
+                _add_to_group(self._ranged_users, targets, key)
+            _add_port(self._user_targets, targets, key, svc, self._user_rank)
+        self._dirty_users.clear()
+
+        for groups in (self._user_exact, self._user_port, self._user_person):
+            for group_key in groups.changed_heads(dirty):
+                to_check.update(groups.get(group_key, ()))
+        for targets, before in ranged_before.items():
+            ports = self._user_targets.get(targets)
+            changed = ports.by_svc.changed_heads(()) if ports is not None else ()
+            if before != (targets in self._ranged_users):
+                to_check.update(ports or ())
+            elif before:
+                for svc in changed:
+                    spec = resolve_service(svc)
+                    if spec is not None:
+                        to_check.update(ports.keys_overlapping(spec))
+
+        for key in to_check:
+            if key in self._users:
+                self._check_user(key)
+
+    def _check_user(self, key):
+        seg, fio, pos, target, svc = self._users[key]
+        errors = []
+        if seg not in self._segments:
+            errors.append(ValidationIssue(USER_UNKNOWN_SOURCE, seg, key, fio=fio))
+        if target not in self._segments:
+            errors.append(ValidationIssue(USER_UNKNOWN_TARGET, seg, key, fio=fio, target=target))
+        if self._user_exact.head((seg, fio, target, svc)) != key:
+            errors.append(ValidationIssue(USER_DUPLICATE, seg, key, fio=fio, target=target, svc=svc))
+
+        conflicts = []
+        port = service_key(svc)
+        covering = None
+        if (seg, target, port) in self._rule_port:
+            covering = self._rule_port.head((seg, target, port))
+        elif (seg, target) in self._ranged_rules:
+            spec = resolve_service(svc)
+            if spec is not None:
+                ports = self._rule_pairs[(seg, target)]
+                found = [ports.by_svc.head(other) for other in ports.containing(spec)]
+                covering = self._first("rule", found) if found else None
+        if covering is not None:
+            conflicts.append(ValidationIssue(USER_REDUNDANT, seg, key, fio=fio, target=target, svc=svc,
+                                             other_name=self._rules[covering][0]))
+        first = self._user_port.head((seg, fio, target, port))
+        if first == key or self._users[first][4] == svc:
+            first = None
+            if (seg, fio, target) in self._ranged_users:
+                first = self._first_overlapping("user", self._users, self._user_targets[(seg, fio, target)],
+                                                key, 4)
+        if first is not None:
+            conflicts.append(ValidationIssue(USER_SHADOWED, seg, key, fio=fio, target=target, svc=svc,
+                                             other_svc=self._users[first][4]))
+        first = self._user_person.head((seg, fio))
+        if first != key and self._users[first][2] != pos:
+            conflicts.append(ValidationIssue(USER_CONTRADICTORY, seg, key, fio=fio, pos=pos,
+                                             other_pos=self._users[first][2]))
+        self._store(self._user_errors, key, errors)
+        self._store(self._user_conflicts, key, conflicts)
+
+    # --- Общие вспомогательные методы ---
+    def _link_refs(self, kind, key, segments):
+        for seg in segments:
+            _add_to_group(self._seg_refs, seg, (kind, key))
+
+    def _unlink_refs(self, kind, key, segments):
+        for seg in segments:
+            _remove_from_group(self._seg_refs, seg, (kind, key))
+
+    @staticmethod
+    def _store(storage, key, errors):
+        if errors:
+            storage[key] = errors
+        else:
+            storage.pop(key, None)
+
+    def _sorted_issues(self, kind, storage):
+        order = self._order
+        for key in sorted(storage, key=lambda k: order[(kind, k)]):
+            yield from storage[key]
+
+    # --- Запуск ---
+    def revalidate(self):
+        """Перепроверяет части модели, изменившиеся с прошлого запуска."""
+        self._revalidate_subnets()
+        dirty_users = set()
+        self._revalidate_rules(dirty_users)
+        self._revalidate_users(dirty_users)
+
+    def iter_issues(self):
+        """
+        Выдаёт записи ValidationIssue для текущего состояния в том же
+        порядке, что и пакетные валидаторы. Вызывает revalidate().
+        """
+        self.revalidate()
+        order = self._order
+        for name in sorted(self._invalid, key=lambda n: order[("subnet", n)]):
+            yield ValidationIssue(INVALID_CIDR, name, cidr=self._subnets[name])
+        pairs = []
+        for name, others in self._overlaps.items():
+            for other in others:
+                a, b = order[("subnet", name)], order[("subnet", other)]
+                if a < b:
+                    pairs.append((a, b, name, other))
+        pairs.sort()
+        for _, _, name, other in pairs:
+            yield ValidationIssue(SUBNET_OVERLAP, name, other=other)
+
+        yield from self._sorted_issues("rule", self._rule_errors)
+        yield from self._sorted_issues("rule", self._rule_conflicts)
+        yield from self._sorted_issues("user", self._user_errors)
+        yield from self._sorted_issues("user", self._user_conflicts)
+
+    def validate(self, max_errors=None):
+        """
+        Перепроверяет изменившиеся части модели и возвращает тексты ошибок
+        (не более max_errors; форматируются только возвращаемые).
+        """
+        return [issue.message for issue in islice(self.iter_issues(), max_errors)]
@@ -4,8 +4,8 @@ import networkx as nx
 from PIL import Image
 import os
 import math
-from tkinter import filedialog
-import tkinter as tk
+from collections import namedtuple
+from model import GlobalRuleTable, UserRuleTable
 
 def generate_grid_positions(n, center_x, center_y, spacing=0.6):
     """Генерирует координаты для n элементов в сетке 3x3 (или больше)."""
@@ -38,6 +38,11 @@ EQUIPMENT_ICONS = {
 
 USER_ICON = "user.png"
 
+# Результат построения графа: сам граф, координаты узлов и отфильтрованные данные
+NetworkLayout = namedtuple("NetworkLayout", [
+    "graph", "pos", "equipment_nodes", "user_nodes", "users_by_segment", "user_rules", "segment_equipment",
+])
+
 
 def _load_icon(icon_name, size=(32, 32)):
     if not icon_name:
@@ -53,62 +58,42 @@ def _load_icon(icon_name, size=(32, 32)):
         return None
 
 
-def draw_and_save_network(segments, global_rules, user_rules, segment_equipment, parent_window=None, show_legend=True):
-    # --- Фильтрация данных ---
-    segments = [s.strip() for s in segments if s and isinstance(s, str) and s.strip()]
-    if not segments:
-        if not show_legend:
-            return None
-        fig, ax = plt.subplots(figsize=(8, 4))
-        ax.set_xlim(0, 1)
-        ax.set_ylim(0, 1)
-        ax.set_axis_off()
-        fig.text(0.5, 0.6, "Нет данных для визуализации", ha='center', va='center', fontsize=12, color='gray')
-        legend_lines = [
-            "Глобальное правило — сплошная тёмно-зелёная стрелка",
-            "Правило пользователя — пунктирная оранжевая стрелка",
-            "",
-            "Оборудование:"
-        ]
-        legend_lines += [f" • {name}" for name in EQUIPMENT_ICONS.keys()]
-        legend_lines.append(" • Пользователь x0")
-        fig.text(0.02, 0.02, "\n".join(legend_lines), fontsize=9,
-                 verticalalignment='bottom',
-                 bbox=dict(boxstyle="round,pad=0.4", facecolor="lightyellow", edgecolor="gray", alpha=0.9))
-
-        root = parent_window if parent_window else tk.Tk()
-        if not parent_window:
-            root.withdraw()
-        file_path = filedialog.asksaveasfilename(
-            parent=root,
-            title="Сохранить диаграмму сети",
-            defaultextension=".png",
-            filetypes=[("PNG files", "*.png"), ("PDF files", "*.pdf")]
-        )
-        if file_path:
-            plt.savefig(file_path, dpi=150, bbox_inches='tight')
-            plt.close(fig)
-            return file_path
-        else:
-            plt.close(fig)
-            return None
-
+def build_network_graph(segments, global_rules, user_rules, segment_equipment):
+    """
+    Строит граф сети и координаты узлов без отрисовки: фильтрует правила
+    и оборудование, добавляет узлы сегментов, оборудования и пользователей,
+    раскладывает их. segments — уже очищенный список имён сегментов.
+    """
     # Валидация правил
-    global_rules = [
-        (name.strip(), src.strip(), dst.strip(), svc.strip())
-        for (name, src, dst, svc) in global_rules
-        if all(isinstance(x, str) and x.strip() for x in (name, src, dst, svc))
-           and src in segments and dst in segments
-    ]
-    user_rules = [
-        (seg.strip(), fio.strip(), pos_val.strip(), target.strip(), svc.strip())
-        for (seg, fio, pos_val, target, svc) in user_rules
-        if all(isinstance(x, str) and x.strip() for x in (seg, fio, target, svc))
-           and seg in segments and target in segments
-    ]
+    segment_set = set(segments)
+    if isinstance(global_rules, GlobalRuleTable):
+        # Строки модели уже очищены и интернированы — остаётся проверить сегменты
+        global_rules = [
+            rule for rule in global_rules
+            if all(rule) and rule[1] in segment_set and rule[2] in segment_set
+        ]
+    else:
+        global_rules = [
+            (name.strip(), src.strip(), dst.strip(), svc.strip())
+            for (name, src, dst, svc) in global_rules
+            if all(isinstance(x, str) and x.strip() for x in (name, src, dst, svc))
+               and src in segment_set and dst in segment_set
+        ]
+    if isinstance(user_rules, UserRuleTable):
+        user_rules = [
+            rule for rule in user_rules
+            if rule[0] and rule[1] and rule[3] and rule[4] and rule[0] in segment_set and rule[3] in segment_set
+        ]
+    else:
+        user_rules = [
+            (seg.strip(), fio.strip(), pos_val.strip(), target.strip(), svc.strip())
+            for (seg, fio, pos_val, target, svc) in user_rules
+            if all(isinstance(x, str) and x.strip() for x in (seg, fio, target, svc))
+               and seg in segment_set and target in segment_set
+        ]
     clean_equipment = {}
     for seg, eq_dict in segment_equipment.items():
-        if seg in segments and isinstance(eq_dict, dict):
+        if seg in segment_set and isinstance(eq_dict, dict):
             clean_eq = {eq: cnt for eq, cnt in eq_dict.items() if eq and isinstance(cnt, int) and cnt > 0}
             if clean_eq:
                 clean_equipment[seg] = clean_eq
@@ -193,6 +178,65 @@ def draw_and_save_network(segments, global_rules, user_rules, segment_equipment,
                 G.add_node(extra_label_node, type='extra_label', segment=seg, count=len(user_ids) - 16)
                 pos[extra_label_node] = (last_x + 0.3, last_y)
 
+    return NetworkLayout(G, pos, equipment_nodes, user_nodes, users_by_segment, user_rules, segment_equipment)
+
+
+def _save_figure(fig, file_path=None, parent_window=None):
+    """Сохраняет рисунок в file_path; без пути спрашивает его в диалоге Tk."""
+    if file_path is None:
+        # tkinter импортируется только для диалога: пакетный режим работает без него
+        import tkinter as tk
+        from tkinter import filedialog
+        root = parent_window if parent_window else tk.Tk()
+        if not parent_window:
+            root.withdraw()
+        file_path = filedialog.asksaveasfilename(
+            parent=root,
+            title="Сохранить диаграмму сети",
+            defaultextension=".png",
+            filetypes=[("PNG files", "*.png"), ("PDF files", "*.pdf")]
+        )
+    if file_path:
+        fig.savefig(file_path, dpi=150, bbox_inches='tight')
+        plt.close(fig)
+        return file_path
+    else:
+        plt.close(fig)
+        return None
+
+
+def draw_and_save_network(segments, global_rules, user_rules, segment_equipment, parent_window=None, show_legend=True,
+                          file_path=None):
+    # --- Фильтрация данных ---
+    segments = [s.strip() for s in segments if s and isinstance(s, str) and s.strip()]
+    if not segments:
+        if not show_legend:
+            return None
+        fig, ax = plt.subplots(figsize=(8, 4))
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        ax.set_axis_off()
+        fig.text(0.5, 0.6, "Нет данных для визуализации", ha='center', va='center', fontsize=12, color='gray')
+        legend_lines = [
+            "Глобальное правило — сплошная тёмно-зелёная стрелка",
+            "Правило пользователя — пунктирная оранжевая стрелка",
+            "",
+            "Оборудование:"
+        ]
+        legend_lines += [f" • {name}" for name in EQUIPMENT_ICONS.keys()]
+        legend_lines.append(" • Пользователь x0")
+        fig.text(0.02, 0.02, "\n".join(legend_lines), fontsize=9,
+                 verticalalignment='bottom',
+                 bbox=dict(boxstyle="round,pad=0.4", facecolor="lightyellow", edgecolor="gray", alpha=0.9))
+
+        return _save_figure(fig, file_path, parent_window)
+
+    layout = build_network_graph(segments, global_rules, user_rules, segment_equipment)
+    G, pos = layout.graph, layout.pos
+    equipment_nodes, user_nodes = layout.equipment_nodes, layout.user_nodes
+    users_by_segment = layout.users_by_segment
+    user_rules, segment_equipment = layout.user_rules, layout.segment_equipment
+
     # --- Автоматический масштаб ---
     all_x = [pos[n][0] for n in pos]
     all_y = [pos[n][1] for n in pos]
@@ -334,19 +378,4 @@ def draw_and_save_network(segments, global_rules, user_rules, segment_equipment,
     ax.set_axis_off()
 
     # --- Сохранение ---
-    root = parent_window if parent_window else tk.Tk()
-    if not parent_window:
-        root.withdraw()
-    file_path = filedialog.asksaveasfilename(
-        parent=root,
-        title="Сохранить диаграмму сети",
-        defaultextension=".png",
-        filetypes=[("PNG files", "*.png"), ("PDF files", "*.pdf")]
-    )
-    if file_path:
-        plt.savefig(file_path, dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        return file_path
-    else:
-        plt.close(fig)
-        return None
+    return _save_figure(fig, file_path, parent_window)
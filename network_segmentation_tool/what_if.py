@@ -0,0 +1,165 @@
+# what_if.py
+from collections import Counter, namedtuple
+
+from example_data import STANDARD_SERVICES
+from reachability import ReachabilityIndex
+from risk_analyzer import NO_RISKS, analyze_risks, merge_policy, transitive_exposure_warnings
+
+GLOBAL = "global"
+USER = "user"
+
+# new_risks / resolved_risks — изменение списка рисков;
+# reachable_gained / reachable_lost — сегменты, которые Guest-сегмент
+# стал / перестал достигать (по любым сервисам)
+WhatIfResult = namedtuple("WhatIfResult", ["new_risks", "resolved_risks", "reachable_gained", "reachable_lost"])
+
+
+class WhatIfSimulator:
+    """
+    Режим «что если»: гипотетические добавления и удаления правил без
+    изменения сценария. Правки складываются в стек и отменяются revert().
+
+    Правила — кортежи в том же виде, что собирает collect_data_for_analysis.
+    При правке пересчитываются только риски сегментов на концах правила
+    (по правилам, которые их касаются) и строки замыкания достижимости,
+    зависящие от изменённого ребра.
+    """
+
+    def __init__(self, segments, global_rules, user_rules, segment_equipment, policy=None):
+        self.policy = merge_policy(policy)
+        self.segments = list(segments)
+        self.segment_equipment = segment_equipment
+        marker = self.policy["guest_marker"].lower()
+        self.guest_segment = next((s for s in self.segments if marker in s.lower()), None)
+        self._untrusted = [s for s in self.segments if marker in s.lower()]
+        self._transitive = self.policy["checks"]["transitive_exposure"]
+        self._local_policy = merge_policy({**self.policy, "checks": {
+            name: dict(options, enabled=options["enabled"] and name != "transitive_exposure")
+            for name, options in self.policy["checks"].items()}})
+
+        self._rules = {GLOBAL: Counter(), USER: Counter()}
+        self._incident = {}  # сегмент -> Counter((вид, правило)) правил, которые его касаются
+        # Классы сервисов — с учётом сервисов политики, как в TransitiveExposureCheck
+        self.reachability = ReachabilityIndex(self.segments, [],
+                                              services={**STANDARD_SERVICES, **self.policy["services"]})
+        for rule in global_rules:
+            self._insert(GLOBAL, tuple(rule))
+        for rule in user_rules:
+            self._insert(USER, tuple(rule))
+        self.risks = Counter(r for r in analyze_risks(self.segments, list(self._rules[GLOBAL].elements()),
+                                                      list(self._rules[USER].elements()), segment_equipment,
+                                                      self.policy) if r != NO_RISKS)
+        self._applied = []  # стек правок: (действие, вид, правило)
+
+    # --- Хранение правил ---
+
+    @staticmethod
+    def _endpoints(kind, rule):
+        return (rule[1], rule[2]) if kind == GLOBAL else (rule[0], rule[3])
+
+    def _insert(self, kind, rule):
+        self._rules[kind][rule] += 1
+        src, dst = self._endpoints(kind, rule)
+        for seg in {src, dst}:
+            self._incident.setdefault(seg, Counter())[(kind, rule)] += 1
+        self.reachability.add_rule(src, dst, rule[-1])
+
+    def _delete(self, kind, rule):
+        if not self._rules[kind][rule]:
+            raise ValueError(f"Правило не найдено: {rule}")
+        self._rules[kind][rule] -= 1
+        if not self._rules[kind][rule]:
+            del self._rules[kind][rule]
+        src, dst = self._endpoints(kind, rule)
+        for seg in {src, dst}:
+            incident = self._incident[seg]
+            incident[(kind, rule)] -= 1
+            if not incident[(kind, rule)]:
+                del incident[(kind, rule)]
+        self.reachability.remove_rule(src, dst, rule[-1])
+
+    # --- Оценка рисков ---
+
+    def _local_risks(self, affected):
+        """Риски, зависящие от сегментов affected: их правила и сами сегменты."""
+        rules = Counter()
+        for seg in affected:
+            for item in self._incident.get(seg, ()):
+                rules[item] = self._rules[item[0]][item[1]]
+        global_rules = [rule for (kind, rule), n in rules.items() if kind == GLOBAL for _ in range(n)]
+        user_rules = [rule for (kind, rule), n in rules.items() if kind == USER for _ in range(n)]
+        segments = [s for s in self.segments if s in affected or s in self._untrusted]
+        return Counter(r for r in analyze_risks(segments, global_rules, user_rules, self.segment_equipment,
+                                                self._local_policy) if r != NO_RISKS)
+
+    def _transitive_risks(self):
+        if self.guest_segment is None or not self._transitive["enabled"]:
+            return Counter()
+        return Counter(transitive_exposure_warnings(self.reachability, self.guest_segment,
+                                                    self._transitive["services"]))
+
+    def _reachable(self):
+        if self.guest_segment is None:
+            return set()
+        return set(self.reachability.reachable_from(self.guest_segment))
+
+    def _apply(self, action, kind, rule):
+        rule = tuple(rule)
+        affected = set(self._endpoints(kind, rule))
+        before = self._local_risks(affected) + self._transitive_risks()
+        reachable_before = self._reachable()
+        if action == "add":
+            self._insert(kind, rule)
+        else:
+            self._delete(kind, rule)
+        after = self._local_risks(affected) + self._transitive_risks()
+        reachable_after = self._reachable()
+        self.risks.subtract(before)
+        self.risks.update(after)
+        self.risks = +self.risks
+        return WhatIfResult(list((after - before).elements()), list((before - after).elements()),
+                            sorted(reachable_after - reachable_before), sorted(reachable_before - reachable_after))
+
+    def _push(self, action, kind, rule):
+        result = self._apply(action, kind, rule)
+        self._applied.append((action, kind, tuple(rule)))
+        return result
+
+    # --- Гипотетические правки ---
+
+    def add_global_rule(self, rule):
+        return self._push("add", GLOBAL, rule)
+
+    def remove_global_rule(self, rule):
+        return self._push("remove", GLOBAL, rule)
+
+    def add_user_rule(self, rule):
+        return self._push("add", USER, rule)
+
+    def remove_user_rule(self, rule):
+        return self._push("remove", USER, rule)
+
+    def revert(self):
+        """Отменяет последнюю правку и возвращает изменение рисков при отмене."""
+        if not self._applied:
+            return None
+        action, kind, rule = self._applied.pop()
+        return self._apply("remove" if action == "add" else "add", kind, rule)
+
+    def revert_all(self):
+        while self._applied:
+            self.revert()
+
+    @property
+    def pending(self):
+        """Применённые правки: список (действие, вид, правило)."""
+        return list(self._applied)
+
+    def current_risks(self):
+        return list(self.risks.elements())
+
+    def global_rules(self):
+        return list(self._rules[GLOBAL].elements())
+
+    def user_rules(self):
+        return list(self._rules[USER].elements())